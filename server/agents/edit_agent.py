@@ -0,0 +1,74 @@
+"""
+edit_agent.py
+
+Incremental edits: existing diagram IR + instruction → `DiagramPatch`, so output
+tokens scale with the size of the edit instead of the size of the diagram.
+The patch is applied by services/patcher.py.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import PromptTemplate
+
+from server.config.variables import EDIT_MODEL_ID
+from server.prompts.edit_prompt import EDIT_PATCH_PROMPT, EDIT_TYPE_HINTS
+from server.schemas.compact import compact_schema
+from server.schemas.diagram import Diagram
+from server.schemas.patch import DiagramPatch
+from server.services.model_bedrock import get_bedrock_model
+from server.services.model_router import ModelRouter, model_config
+from server.utils.logger import get_logger
+from server.utils.metrics import timed_stage
+
+logger = get_logger(os.path.basename(__file__))
+
+
+class DiagramEditor:
+
+    def __init__(self, model_id=EDIT_MODEL_ID):
+        logger.info("[DiagramEditor] Initializing with model_id: %s", model_id)
+        self.model = get_bedrock_model(model_id=model_id)
+        self.parser = PydanticOutputParser(pydantic_object=DiagramPatch)
+        llm = ModelRouter("edit", model_id)
+        self.chains: Dict[str, object] = {}
+        for diagram_type, hints in EDIT_TYPE_HINTS.items():
+            prompt = PromptTemplate(
+                template=EDIT_PATCH_PROMPT,
+                input_variables=["diagram", "instruction"],
+                partial_variables={
+                    "diagram_type": diagram_type,
+                    "schema": compact_schema(DiagramPatch),
+                    "time_hint": " (and/or time)" if diagram_type == "timeline" else "",
+                    "type_hints": hints,
+                },
+            )
+            self.chains[diagram_type] = prompt | llm | self.parser
+
+    def _inputs(self, diagram: Diagram, instruction: str) -> Dict[str, str]:
+        if diagram.type not in self.chains:
+            raise ValueError(f"Editing {diagram.type} diagrams is not supported")
+        # Compact JSON: the diagram is most of the prompt
+        ir = json.dumps(
+            diagram.model_dump(exclude_defaults=True), separators=(",", ":"), ensure_ascii=False
+        )
+        return {"diagram": ir, "instruction": instruction}
+
+    @timed_stage("edit")
+    def edit(
+        self, diagram: Diagram, instruction: str, model_id: Optional[str] = None
+    ) -> DiagramPatch:
+        logger.info("[DiagramEditor] Generating patch...")
+        inputs = self._inputs(diagram, instruction)
+        return self.chains[diagram.type].invoke(inputs, model_config(model_id))
+
+    @timed_stage("edit")
+    async def aedit(
+        self, diagram: Diagram, instruction: str, model_id: Optional[str] = None
+    ) -> DiagramPatch:
+        """Async variant of `edit`."""
+        logger.info("[DiagramEditor] Generating patch (async)...")
+        inputs = self._inputs(diagram, instruction)
+        return await self.chains[diagram.type].ainvoke(inputs, model_config(model_id))
@@ -0,0 +1,66 @@
+"""
+fused_generation_agent.py
+
+Single-call generation: user text → Diagram IR in one Bedrock round-trip,
+skipping the separate intent and visual-structure stages.
+"""
+
+import os
+from typing import AsyncIterator, Optional
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from server.config.variables import DIAGRAM_TYPES, FUSED_MODEL_ID
+from server.prompts.fused_prompt import FUSED_GENERATION_PROMPT
+from server.schemas.diagram import Diagram
+from server.services.model_bedrock import get_bedrock_model
+from server.services.model_router import ModelRouter, model_config
+from server.utils.logger import get_logger
+from server.utils.metrics import stage_timer, timed_stage
+
+logger = get_logger(os.path.basename(__file__))
+
+
+class FusedGenerator:
+
+    def __init__(self, model_id=FUSED_MODEL_ID):
+        logger.info("[FusedGenerator] Initializing with model_id: %s", model_id)
+        self.model = get_bedrock_model(model_id=model_id)
+        self.parser = PydanticOutputParser(pydantic_object=Diagram)
+        self.prompt = PromptTemplate(
+            template=FUSED_GENERATION_PROMPT,
+            input_variables=["user_text"],
+            partial_variables={
+                "format_instructions": self.parser.get_format_instructions(),
+                "diagram_types": ", ".join(DIAGRAM_TYPES),
+            },
+        )
+        # Use RunnableSequence pipeline: prompt | llm | output_parser
+        # The model is picked per call (see services/model_router.py)
+        llm = ModelRouter("fused", model_id)
+        self.chain = self.prompt | llm | self.parser
+        # Raw-text variant for token streaming; parse the joined text with self.parser
+        self.text_chain = self.prompt | llm | StrOutputParser()
+
+    @timed_stage("fused")
+    def generate(self, text: str, model_id: Optional[str] = None) -> Diagram:
+        logger.info("[FusedGenerator] Generating IR in a single call...")
+        return self.chain.invoke({"user_text": text}, model_config(model_id))
+
+    @timed_stage("fused")
+    async def agenerate(self, text: str, model_id: Optional[str] = None) -> Diagram:
+        """Async variant of `generate`."""
+        logger.info("[FusedGenerator] Generating IR in a single call (async)...")
+        return await self.chain.ainvoke({"user_text": text}, model_config(model_id))
+
+    async def astream_text(
+        self, text: str, model_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the raw IR completion token by token."""
+        with stage_timer("fused"):
+            async for chunk in self.text_chain.astream(
+                {"user_text": text}, model_config(model_id)
+            ):
+                yield chunk
@@ -1,21 +1,46 @@
 import os
+from typing import AsyncIterator, Optional
+
 from server.utils.logger import get_logger
 from server.agents.visual_structure_agent import VisualStructureExtractor
+from server.schemas.compact import TYPE_DATA_MODELS, compact_ir_schema
 from server.schemas.diagram import Diagram
-from server.config.variables import MODEL_ID
+from server.config.variables import IR_MODEL_ID, IR_TYPED_PROMPTS_ENABLED
 
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
-from server.prompts.ir_generation_prompt import IR_GENERATION_PROMPT
-from server.services.model_bedrock import BedrockModel
+from langchain_core.output_parsers import StrOutputParser
+from server.prompts.ir_generation_prompt import (
+    IR_GENERATION_PROMPT,
+    IR_TYPE_EXAMPLES,
+    IR_TYPE_HINTS,
+    TYPED_IR_GENERATION_PROMPT,
+)
+from server.services.model_bedrock import get_bedrock_model
+from server.services.model_router import ModelRouter, model_config
+from server.utils.metrics import stage_timer
 
 logger = get_logger(os.path.basename(__file__))
 
 
+def typed_ir_prompt(diagram_type: str) -> PromptTemplate:
+    """Compact IR prompt for one diagram type (see schemas/compact.py)."""
+    return PromptTemplate(
+        template=TYPED_IR_GENERATION_PROMPT,
+        input_variables=["visual_structure"],
+        partial_variables={
+            "diagram_type": diagram_type,
+            "schema": compact_ir_schema(diagram_type),
+            "type_hints": IR_TYPE_HINTS.get(diagram_type, ""),
+            "example": IR_TYPE_EXAMPLES[diagram_type],
+        },
+    )
+
+
 class IRGenerator:
-    def __init__(self, model_id=MODEL_ID):
+    def __init__(self, model_id=IR_MODEL_ID, typed_prompts: bool = IR_TYPED_PROMPTS_ENABLED):
         logger.info("Initializing with model_id: %s", model_id)
-        self.visual_extractor = VisualStructureExtractor(model_id=model_id)
+        self.visual_extractor = VisualStructureExtractor()
         self.parser = PydanticOutputParser(pydantic_object=Diagram)
         self.prompt = PromptTemplate(
             template=IR_GENERATION_PROMPT,
@@ -24,15 +49,89 @@ class IRGenerator:
                 "format_instructions": self.parser.get_format_instructions()
             },
         )
-        self.model = BedrockModel(model_id=model_id)
+        self.model = get_bedrock_model(model_id=model_id)
+        # The model is picked per call (see services/model_router.py)
+        llm = ModelRouter("ir", model_id)
         # Use RunnableSequence pipeline: prompt | llm | output_parser
-        self.chain = self.prompt | self.model.llm | self.parser
+        self.chain = self.prompt | llm | self.parser
+        # Raw-text variant for token streaming; parse the joined text with self.parser
+        self.text_chain = self.prompt | llm | StrOutputParser()
+        # Per-type compact prompts; the output is still parsed as a Diagram
+        self.typed_prompts = typed_prompts
+        self.typed_chains = {}
+        self.typed_text_chains = {}
+        for diagram_type in TYPE_DATA_MODELS:
+            prompt = typed_ir_prompt(diagram_type)
+            self.typed_chains[diagram_type] = prompt | llm | self.parser
+            self.typed_text_chains[diagram_type] = prompt | llm | StrOutputParser()
+
+    def chain_for(self, diagram_type: Optional[str], text: bool = False):
+        """Type-specific chain when the type is known, else the generic one."""
+        chains = self.typed_text_chains if text else self.typed_chains
+        if self.typed_prompts and diagram_type in chains:
+            return chains[diagram_type]
+        return self.text_chain if text else self.chain
+
+    @staticmethod
+    def diagram_type(intent_fields, visual_structure) -> Optional[str]:
+        """Diagram type from the intent result, else from the extracted structure."""
+        if isinstance(intent_fields, dict):
+            diagram_type = intent_fields.get("diagram_type")
+        else:
+            diagram_type = getattr(intent_fields, "diagram_type", None)
+        if not diagram_type and isinstance(visual_structure, dict):
+            diagram_type = visual_structure.get("type")
+        return diagram_type
 
-    def generate_ir(self, text: str, intent_fields: dict) -> dict:
+    def generate_ir(
+        self,
+        text: str,
+        intent_fields: dict,
+        model_id: Optional[str] = None,
+        visual_structure: Optional[dict] = None,
+    ) -> dict:
         logger.info("Generating IR for text")
-        # Step 1: Extract visual structure (dict)
-        visual_structure = self.visual_extractor.extract(text, intent_fields)
+        # Step 1: Extract visual structure (dict), unless the caller already has it
+        if visual_structure is None:
+            visual_structure = self.visual_extractor.extract(text, intent_fields)
         # Step 2: Convert to Pydantic Diagram model
-        result = self.chain.invoke({"visual_structure": visual_structure})
+        chain = self.chain_for(self.diagram_type(intent_fields, visual_structure))
+        with stage_timer("ir"):
+            result = chain.invoke(
+                {"visual_structure": visual_structure}, model_config(model_id)
+            )
         logger.info("IR result:\n%s", result)
         return result
+
+    async def agenerate_ir(
+        self,
+        text: str,
+        intent_fields: dict,
+        model_id: Optional[str] = None,
+        visual_structure: Optional[dict] = None,
+    ) -> dict:
+        """Async variant of `generate_ir`."""
+        logger.info("Generating IR for text (async)")
+        if visual_structure is None:
+            visual_structure = await self.visual_extractor.aextract(text, intent_fields)
+        chain = self.chain_for(self.diagram_type(intent_fields, visual_structure))
+        with stage_timer("ir"):
+            result = await chain.ainvoke(
+                {"visual_structure": visual_structure}, model_config(model_id)
+            )
+        logger.info("IR result:\n%s", result)
+        return result
+
+    async def astream_text(
+        self,
+        visual_structure: dict,
+        diagram_type: Optional[str] = None,
+        model_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the raw IR completion token by token."""
+        chain = self.chain_for(diagram_type, text=True)
+        with stage_timer("ir"):
+            async for chunk in chain.astream(
+                {"visual_structure": visual_structure}, model_config(model_id)
+            ):
+                yield chunk
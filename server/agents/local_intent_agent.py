@@ -0,0 +1,151 @@
+"""
+local_intent_agent.py
+
+Rule-based fast path for intent classification. Scores each of DIAGRAM_TYPES from
+cheap lexical features (dates, conditionals, comparison words, explicit requests),
+turns the scores into a softmax confidence, and returns an IntentOutput in
+microseconds. IntentClassifier only calls the LLM when this confidence is below
+INTENT_FAST_PATH_THRESHOLD.
+"""
+
+import math
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from server.config.variables import DIAGRAM_TYPES
+from server.schemas.intent_output import IntentOutput
+from server.utils.metrics import (
+    INTENT_FAST_PATH_AGREED,
+    INTENT_FAST_PATH_COMPARED,
+    INTENT_REQUESTS,
+)
+
+# (pattern, weight, cap): each match adds `weight`, counted at most `cap` times
+FEATURES: Dict[str, List[Tuple[re.Pattern, float, int]]] = {
+    "timeline": [
+        (re.compile(r"\btime ?line\b|\bchronolog", re.I), 4.0, 1),
+        (re.compile(r"\bhistory of\b|\bover the (years|decades|centuries)\b", re.I), 2.0, 1),
+        (re.compile(r"\b(1[0-9]{3}|20[0-9]{2})s?\b"), 0.8, 6),
+        (
+            re.compile(
+                r"\b(jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|june?|july?|aug(ust)?"
+                r"|sep(tember)?|oct(ober)?|nov(ember)?|dec(ember)?)\b\.?\s+\d",
+                re.I,
+            ),
+            0.8,
+            4,
+        ),
+        (re.compile(r"\b(century|decade|era|BC|AD|BCE|CE)\b"), 0.7, 3),
+    ],
+    "flowchart": [
+        (re.compile(r"\bflow ?chart\b|\bworkflow\b|\bprocess\b|\bprocedure\b", re.I), 1.5, 2),
+        (re.compile(r"\bif\b.{1,80}\b(then|otherwise|else)\b", re.I | re.S), 2.5, 2),
+        (re.compile(r"\b(else|otherwise)\b", re.I), 1.0, 2),
+        (re.compile(r"\b(step|first|next|then|finally|followed by|after that)\b", re.I), 0.5, 6),
+        (re.compile(r"->|→"), 0.8, 4),
+    ],
+    "mind_map": [
+        (re.compile(r"\bmind ?map\b|\bbrainstorm", re.I), 4.0, 1),
+        (re.compile(r"\b(concepts?|ideas?|topics?|aspects?|branches|categories)\b", re.I), 0.6, 4),
+        (re.compile(r"\b(types|kinds|components|overview) of\b", re.I), 1.0, 2),
+    ],
+    "table": [
+        (re.compile(r"\btable\b|\bspreadsheet\b|\bcolumns?\b|\brows?\b", re.I), 2.0, 2),
+        (re.compile(r"\bcompar(e|ison|ing)\b|\bversus\b|\bvs\.?\b|\bpros and cons\b", re.I), 1.5, 2),
+        (re.compile(r"^.*\|.*\|.*$", re.M), 1.0, 3),
+    ],
+}
+
+INTENTS = {
+    "flowchart": "describe process",
+    "timeline": "show timeline",
+    "mind_map": "organize ideas",
+    "table": "compare items",
+}
+
+# Softmax temperature: lower means a given score gap yields higher confidence
+TEMPERATURE = 1.0
+
+
+class LocalIntentClassifier:
+
+    def score(self, text: str) -> Dict[str, float]:
+        scores = {}
+        for diagram_type in DIAGRAM_TYPES:
+            total = 0.0
+            for pattern, weight, cap in FEATURES.get(diagram_type, []):
+                hits = 0
+                for _ in pattern.finditer(text):
+                    hits += 1
+                    if hits >= cap:
+                        break
+                total += weight * hits
+            scores[diagram_type] = total
+        return scores
+
+    def classify(self, text: str) -> IntentOutput:
+        """Best diagram type with a softmax confidence (uniform when there is no evidence)."""
+        scores = self.score(text)
+        exps = {t: math.exp(s / TEMPERATURE) for t, s in scores.items()}
+        norm = sum(exps.values())
+        best = max(scores, key=scores.get)
+        confidence = exps[best] / norm
+        return IntentOutput(
+            intent=INTENTS.get(best, "visualize"),
+            diagram_type=best,
+            confidence=round(confidence, 4),
+            explanation=f"Local fast-path classifier (scores: {scores}).",
+        )
+
+
+class FastPathStats:
+    """Counters for how often the fast path answers and how well it agrees with the LLM.
+
+    Agreement is measured on inputs that went to the LLM while the local
+    classifier had some evidence (score > 0) for its guess.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fast_path = 0
+        self.llm = 0
+        self.compared = 0
+        self.agreed = 0
+
+    def record_fast_path(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.fast_path += 1
+        INTENT_REQUESTS.labels("fast_path").inc()
+
+    def record_llm(self, local_type: str, llm_type: str) -> None:
+        with self._lock:
+            self.requests += 1
+            self.llm += 1
+            if local_type:
+                self.compared += 1
+                self.agreed += int(local_type == llm_type)
+        INTENT_REQUESTS.labels("llm").inc()
+        if local_type:
+            INTENT_FAST_PATH_COMPARED.inc()
+            if local_type == llm_type:
+                INTENT_FAST_PATH_AGREED.inc()
+
+    def record_other(self) -> None:
+        """A request answered without the fast path or the LLM (e.g. memo hit)."""
+        with self._lock:
+            self.requests += 1
+        INTENT_REQUESTS.labels("other").inc()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "fast_path": self.fast_path,
+                "llm": self.llm,
+                "hit_rate": self.fast_path / self.requests if self.requests else 0.0,
+                "compared": self.compared,
+                "agreement": self.agreed / self.compared if self.compared else 0.0,
+            }
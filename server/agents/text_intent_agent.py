@@ -3,28 +3,47 @@ intent.py
 
 This module provides intent understanding for user input text.
 It uses Bedrock LLMs (via model_bedrock.py) to classify the intent and map to a visual type.
+Obvious inputs are answered by a local rule-based classifier (local_intent_agent.py)
+without an LLM call.
 """
 
+import asyncio
 import os
-from server.services.model_bedrock import BedrockModel
+from typing import Optional, Tuple
+
+from server.agents.local_intent_agent import FastPathStats, LocalIntentClassifier
+from server.services.cache import ResultCache, make_key, normalize_text, prompt_hash
+from server.services.model_bedrock import get_bedrock_model
+from server.services.model_router import ModelRouter, model_config
 
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 
 from server.prompts.intent_prompt import INTENT_EXTRACTION_PROMPT
 from server.schemas.intent_output import IntentOutput
-from server.config.variables import MODEL_ID, DIAGRAM_TYPES
-from server.utils.helper import measure_execution_time
+from server.config.variables import (
+    DIAGRAM_TYPES,
+    INTENT_FAST_PATH_ENABLED,
+    INTENT_FAST_PATH_THRESHOLD,
+    INTENT_MODEL_ID,
+    STAGE_MEMO_ENABLED,
+)
 from server.utils.logger import get_logger, pretty_log
+from server.utils.metrics import timed_stage
 
 logger = get_logger(os.path.basename(__file__))
 
 
 class IntentClassifier:
 
-    def __init__(self, model_id=MODEL_ID):
+    def __init__(
+        self,
+        model_id=INTENT_MODEL_ID,
+        fast_path_threshold: float = INTENT_FAST_PATH_THRESHOLD,
+        fast_path_enabled: bool = INTENT_FAST_PATH_ENABLED,
+    ):
         logger.info("[IntentClassifier] Initializing with model_id: %s", model_id)
-        self.model = BedrockModel(model_id=model_id)
+        self.model = get_bedrock_model(model_id=model_id)
         self.parser = PydanticOutputParser(pydantic_object=IntentOutput)
         # Prepare prompt with format instructions injected
         self.prompt = PromptTemplate(
@@ -36,12 +55,86 @@ class IntentClassifier:
             },
         )
         # Use RunnableSequence pipeline: prompt | llm | output_parser
-        self.chain = self.prompt | self.model.llm | self.parser
+        # The model is picked per call (see services/model_router.py)
+        self.chain = self.prompt | ModelRouter("intent", model_id) | self.parser
+        # Memo keyed on this stage's inputs and prompt only, so edits to later
+        # stages never invalidate it
+        self.memo = ResultCache(namespace="intent", enabled=STAGE_MEMO_ENABLED)
+        self.prompt_version = prompt_hash(self.prompt)
+        self.local = LocalIntentClassifier()
+        self.fast_path_threshold = fast_path_threshold
+        self.fast_path_enabled = fast_path_enabled
+        self.stats = FastPathStats()
+
+    def memo_key(self, text: str, model_id: Optional[str] = None) -> str:
+        return make_key(
+            "intent",
+            normalize_text(text),
+            model_id or self.model.model_id,
+            self.prompt_version,
+        )
+
+    def fast_path(self, text: str) -> Tuple[Optional[IntentOutput], Optional[str]]:
+        """Return (confident local result or None, local guess for agreement stats)."""
+        if not self.fast_path_enabled:
+            return None, None
+        local = self.local.classify(text)
+        if local.confidence >= self.fast_path_threshold:
+            logger.info(
+                "[IntentClassifier] Fast path: %s (confidence %.2f)",
+                local.diagram_type,
+                local.confidence,
+            )
+            self.stats.record_fast_path()
+            return local, local.diagram_type
+        # Uniform confidence means no evidence at all; don't count it as a guess
+        has_evidence = local.confidence > 1.0 / len(DIAGRAM_TYPES)
+        return None, local.diagram_type if has_evidence else None
+
+    def provisional(self, text: str) -> IntentOutput:
+        """Local guess for starting later stages before the real intent is known.
 
-    @measure_execution_time
-    def classify(self, text: str) -> dict:
+        Without any local evidence the guess has no diagram type.
+        """
+        local = self.local.classify(text)
+        if local.confidence > 1.0 / len(DIAGRAM_TYPES):
+            return local
+        return IntentOutput(intent="visualize")
+
+    @timed_stage("intent")
+    def classify(self, text: str, model_id: Optional[str] = None) -> dict:
         """Classify user text to intent and diagram type, with context fields."""
         logger.info("[IntentClassifier] Classifying text...")
-        result = self.chain.invoke({"user_text": text})
+        local, guess = self.fast_path(text)
+        if local is not None:
+            return local
+        key = self.memo_key(text, model_id)
+        cached = self.memo.get(key)
+        if cached is not None:
+            logger.info("[IntentClassifier] Memo hit")
+            self.stats.record_other()
+            return IntentOutput(**cached)
+        result = self.chain.invoke({"user_text": text}, model_config(model_id))
+        pretty_log(logger, "[IntentClassifier] Classification result", result)
+        self.stats.record_llm(guess, result.diagram_type)
+        self.memo.set(key, result.model_dump())
+        return result
+
+    @timed_stage("intent")
+    async def aclassify(self, text: str, model_id: Optional[str] = None) -> dict:
+        """Async variant of `classify`."""
+        logger.info("[IntentClassifier] Classifying text (async)...")
+        local, guess = self.fast_path(text)
+        if local is not None:
+            return local
+        key = self.memo_key(text, model_id)
+        cached = await asyncio.to_thread(self.memo.get, key)
+        if cached is not None:
+            logger.info("[IntentClassifier] Memo hit")
+            self.stats.record_other()
+            return IntentOutput(**cached)
+        result = await self.chain.ainvoke({"user_text": text}, model_config(model_id))
         pretty_log(logger, "[IntentClassifier] Classification result", result)
+        self.stats.record_llm(guess, result.diagram_type)
+        await asyncio.to_thread(self.memo.set, key, result.model_dump())
         return result
@@ -6,38 +6,85 @@ This module extracts a structured, but not yet Pydantic-validated, visual repres
 - Step 2 (in ir_generator.py): convert this to a Pydantic Diagram model.
 """
 
+import asyncio
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers.json import JsonOutputParser
-from langchain.chains.llm import LLMChain
-from server.services.model_bedrock import BedrockModel
+from server.services.cache import ResultCache, make_key, normalize_text, prompt_hash
+from server.services.model_bedrock import get_bedrock_model
+from server.services.model_router import ModelRouter, model_config
 from server.prompts.visual_structure_prompt import VISUAL_STRUCTURE_PROMPT
-from server.config.variables import MODEL_ID
-from server.utils.helper import measure_execution_time
+from server.config.variables import STAGE_MEMO_ENABLED, STRUCTURE_MODEL_ID
 from server.utils.logger import get_logger, pretty_log
+from server.utils.metrics import timed_stage
 
 logger = get_logger(os.path.basename(__file__))
 
 
 class VisualStructureExtractor:
 
-    def __init__(self, model_id=MODEL_ID):
-        print(f"[VisualStructureExtractor] Initializing with model_id: {model_id}")
-        self.model = BedrockModel(model_id=model_id)
+    def __init__(self, model_id=STRUCTURE_MODEL_ID):
+        logger.info("[VisualStructureExtractor] Initializing with model_id: %s", model_id)
+        self.model = get_bedrock_model(model_id=model_id)
         self.parser = JsonOutputParser()
         self.prompt = PromptTemplate(
             template=VISUAL_STRUCTURE_PROMPT,
             input_variables=["user_text", "intent_fields"],
         )
         # Use RunnableSequence pipeline: prompt | llm | output_parser
-        self.chain = self.prompt | self.model.llm | self.parser
+        # The model is picked per call (see services/model_router.py)
+        self.chain = self.prompt | ModelRouter("structure", model_id) | self.parser
+        # Keyed on the intent output (not the intent prompt), so only a change
+        # in what the intent stage returns invalidates this stage
+        self.memo = ResultCache(namespace="structure", enabled=STAGE_MEMO_ENABLED)
+        self.prompt_version = prompt_hash(self.prompt)
 
-    @measure_execution_time
-    def extract(self, user_text: str, intent_fields: dict) -> Dict:
+    def memo_key(
+        self, user_text: str, intent_fields, model_id: Optional[str] = None
+    ) -> str:
+        if hasattr(intent_fields, "model_dump"):
+            intent_fields = intent_fields.model_dump()
+        return make_key(
+            "structure",
+            normalize_text(user_text),
+            intent_fields,
+            model_id or self.model.model_id,
+            self.prompt_version,
+        )
+
+    @timed_stage("structure")
+    def extract(
+        self, user_text: str, intent_fields: dict, model_id: Optional[str] = None
+    ) -> Dict:
+        key = self.memo_key(user_text, intent_fields, model_id)
+        cached = self.memo.get(key)
+        if cached is not None:
+            logger.info("[VisualStructureExtractor] Memo hit")
+            return cached
         result = self.chain.invoke(
-            {"user_text": user_text, "intent_fields": intent_fields}
+            {"user_text": user_text, "intent_fields": intent_fields},
+            model_config(model_id),
+        )
+        pretty_log(logger, "[VisualStructureExtractor] Extraction result", result)
+        self.memo.set(key, result)
+        return result
+
+    @timed_stage("structure")
+    async def aextract(
+        self, user_text: str, intent_fields: dict, model_id: Optional[str] = None
+    ) -> Dict:
+        """Async variant of `extract`."""
+        key = self.memo_key(user_text, intent_fields, model_id)
+        cached = await asyncio.to_thread(self.memo.get, key)
+        if cached is not None:
+            logger.info("[VisualStructureExtractor] Memo hit")
+            return cached
+        result = await self.chain.ainvoke(
+            {"user_text": user_text, "intent_fields": intent_fields},
+            model_config(model_id),
         )
         pretty_log(logger, "[VisualStructureExtractor] Extraction result", result)
+        await asyncio.to_thread(self.memo.set, key, result)
         return result
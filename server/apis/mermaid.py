@@ -1,11 +1,175 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Taken before any other import so cold-start numbers include import time
+_STARTED_AT = time.perf_counter()
+
+import asyncio
+import hmac
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from server.graphs.workflow import Workflow
+from server.config.variables import (
+    ADMIN_TOKEN,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_ITEMS,
+    REQUEST_DEADLINE_SECONDS,
+    WARMUP_ON_STARTUP,
+    WARMUP_PRIME_CACHES,
+)
+from server.schemas.generation import GenerationOptions
+from server.services import hedging
+from server.services.cache import UnknownCacheIdError, prompt_version
+from server.services.model_bedrock import configure_executor
+from server.services.resilience import BedrockUnavailable, deadline
+from server.services.validator import validate
+from server.tools.svg import to_svg
+from server.utils.logger import get_logger
+from server.utils.metrics import (
+    CONTENT_TYPE_LATEST,
+    IN_FLIGHT_REQUESTS,
+    METRICS_AVAILABLE,
+    STARTUP_SECONDS,
+    generate_latest,
+)
 import uvicorn
 
-app = FastAPI()
+if TYPE_CHECKING:
+    from server.graphs.workflow import Workflow
+
+logger = get_logger(os.path.basename(__file__))
+
+# The Workflow pulls in the langchain/langchain_aws stacks and creates the
+# Bedrock clients, so it is built lazily (or by the background warm-up) rather
+# than at import time; /health answers immediately either way.
+_workflow: Optional["Workflow"] = None
+_workflow_lock = threading.Lock()
+startup_state = {"ready": False, "warmup_seconds": None, "first_request_seconds": None}
+
+
+def get_workflow() -> "Workflow":
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                from server.graphs.workflow import Workflow
+
+                _workflow = Workflow()
+    return _workflow
+
+
+async def aget_workflow() -> "Workflow":
+    """Like `get_workflow`, but builds off the event loop if still cold."""
+    if _workflow is not None:
+        return _workflow
+    return await asyncio.to_thread(get_workflow)
+
+
+def warm_up() -> None:
+    start = time.perf_counter()
+    workflow = get_workflow()
+    if WARMUP_PRIME_CACHES:
+        prompt_version()
+        workflow.cache.get("warmup")
+        workflow.intent.local.classify("warm up")
+    startup_state["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    startup_state["ready"] = True
+    STARTUP_SECONDS.labels("warmup").set(startup_state["warmup_seconds"])
+    logger.info("Warm-up finished in %.3fs", startup_state["warmup_seconds"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_executor()
+    if WARMUP_ON_STARTUP:
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    else:
+        startup_state["ready"] = True
+    yield
+
+
+class ColdStartTracker:
+    """ASGI middleware recording time from app import to the first served request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and startup_state["first_request_seconds"] is None:
+            elapsed = round(time.perf_counter() - _STARTED_AT, 3)
+            startup_state["first_request_seconds"] = elapsed
+            STARTUP_SECONDS.labels("first_request").set(elapsed)
+            logger.info("Cold start to first served request: %.3fs", elapsed)
+
+
+class InFlightTracker:
+    """ASGI middleware keeping a per-endpoint gauge of requests being served.
+
+    Only paths the app routes are used as labels, so scans of random URLs
+    can't blow up the metric's cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self._paths is None:
+            self._paths = {getattr(route, "path", None) for route in app.routes}
+        path = scope["path"] if scope["path"] in self._paths else "other"
+        gauge = IN_FLIGHT_REQUESTS.labels(path)
+        gauge.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gauge.dec()
+
+
+class RequestDeadline:
+    """ASGI middleware bounding a request's Bedrock calls, retries included, to
+    REQUEST_DEADLINE_SECONDS (services/resilience.py).
+
+    Batch and segment requests are exempt: `Workflow.arun_many` gives each item
+    its own deadline instead of sharing one across the batch.
+    """
+
+    EXEMPT_PATHS = {"/generate_mermaid/batch", "/generate_mermaid/segments"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+        with deadline(REQUEST_DEADLINE_SECONDS):
+            await self.app(scope, receive, send)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestDeadline)
+app.add_middleware(ColdStartTracker)
+app.add_middleware(InFlightTracker)
+
+
+@app.exception_handler(BedrockUnavailable)
+async def bedrock_unavailable(request, exc: BedrockUnavailable):
+    """Throttled / circuit open / deadline: 429 or 503 with Retry-After, not a 500."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": exc.retry_after_header()},
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,22 +180,241 @@ app.add_middleware(
 )
 
 
-class TextRequest(BaseModel):
+class TextRequest(GenerationOptions):
     text: str
 
+    def options(self) -> GenerationOptions:
+        return GenerationOptions(**self.model_dump(exclude={"text"}))
+
+
+class BatchRequest(GenerationOptions):
+    texts: List[str]
+    concurrency: int = BATCH_CONCURRENCY
+
+    def options(self) -> GenerationOptions:
+        return GenerationOptions(**self.model_dump(exclude={"texts", "concurrency"}))
+
+
+class RenderRequest(BaseModel):
+    # Diagram IR as returned by the pipeline: {"type", "data", "meta"}
+    type: str
+    data: Dict[str, Any]
+    meta: Dict[str, Any] = {}
+
+
+class EditRequest(GenerationOptions):
+    instruction: str
+    # The diagram to edit: its IR, or the cache_id of an earlier response
+    ir: Optional[RenderRequest] = None
+    cache_id: Optional[str] = None
+
+    def options(self) -> GenerationOptions:
+        return GenerationOptions(
+            **self.model_dump(exclude={"instruction", "ir", "cache_id"})
+        )
 
-workflow = Workflow()
+
+class InvalidateRequest(BaseModel):
+    # Exactly one of these, or neither to clear the whole result cache
+    text: Optional[str] = None
+    cache_id: Optional[str] = None
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    if not startup_state["ready"]:
+        return JSONResponse(status_code=503, content=startup_state)
+    return startup_state
 
 
 @app.post("/generate_mermaid")
-def generate_mermaid(req: TextRequest):
+async def generate_mermaid(req: TextRequest):
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Text input required.")
+    try:
+        workflow = await aget_workflow()
+        result = await workflow.agenerate(req.text, req.options())
+        return {
+            "mermaid": result.mermaid,
+            "cached": result.cached,
+            "cache_id": result.cache_id,
+            "pages": [p.model_dump() for p in result.pages],
+            **result.meta,
+        }
+    except BedrockUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/generate_mermaid/batch")
+async def generate_mermaid_batch(req: BatchRequest):
+    if not req.texts:
+        raise HTTPException(status_code=400, detail="At least one text is required.")
+    if len(req.texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items."
+        )
+    concurrency = min(max(1, req.concurrency), BATCH_MAX_CONCURRENCY)
+    workflow = await aget_workflow()
+    results = await workflow.arun_many(req.texts, req.options(), concurrency)
+    return {"results": [r.model_dump() for r in results]}
+
+
+@app.post("/generate_mermaid/segments")
+async def generate_mermaid_segments(req: TextRequest):
+    """Split the text into topics and return one diagram per topic, in order."""
     if not req.text.strip():
         raise HTTPException(status_code=400, detail="Text input required.")
+    workflow = await aget_workflow()
+    segments = await workflow.arun_segments(req.text, req.options())
+    return {
+        "diagrams": [
+            {"text": segment, **result.model_dump()} for segment, result in segments
+        ]
+    }
+
+
+@app.post("/generate_mermaid/stream")
+async def generate_mermaid_stream(req: TextRequest):
+    """Server-Sent Events: one event per completed stage, plus partial Mermaid."""
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Text input required.")
+
+    async def events():
+        try:
+            workflow = await aget_workflow()
+            async for event in workflow.astream(req.text, req.options()):
+                yield _sse(event["event"], event["data"])
+        except BedrockUnavailable as e:
+            yield _sse(
+                "error",
+                {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after},
+            )
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/edit_diagram")
+async def edit_diagram(req: EditRequest):
+    """Patch an existing diagram from an edit instruction instead of regenerating it."""
+    if not req.instruction.strip():
+        raise HTTPException(status_code=400, detail="Edit instruction required.")
+    if (req.ir is None) == (req.cache_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of ir or cache_id.")
+    workflow = await aget_workflow()
     try:
-        mermaid_str = workflow.run(req.text)
-        return {"mermaid": mermaid_str}
+        result = await workflow.aedit(
+            req.instruction,
+            req.ir.model_dump() if req.ir is not None else None,
+            req.cache_id,
+            req.options(),
+        )
+    except UnknownCacheIdError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, TypeError, AssertionError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except BedrockUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "mermaid": result.mermaid,
+        "cached": result.cached,
+        "cache_id": result.cache_id,
+        "diagram": result.diagram.model_dump() if result.diagram else None,
+        "pages": [p.model_dump() for p in result.pages],
+        **result.meta,
+    }
+
+
+@app.post("/generate_svg")
+async def generate_svg(req: TextRequest):
+    """Like /generate_mermaid, but answers with an SVG rendered server-side."""
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Text input required.")
+    workflow = await aget_workflow()
+    try:
+        result = await workflow.agenerate(req.text, req.options())
+    except BedrockUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        svg = await asyncio.to_thread(to_svg, result.diagram)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _svg_response(
+        svg, {"X-Cache-Id": result.cache_id or "", "X-Cached": str(result.cached).lower()}
+    )
+
+
+@app.post("/render_svg")
+async def render_svg(req: RenderRequest):
+    """Render a Diagram IR (e.g. a cached or edited one) to SVG, no LLM involved."""
+    try:
+        diagram = validate(req.model_dump())
+        svg = await asyncio.to_thread(to_svg, diagram)
+    except (ValueError, TypeError, AssertionError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _svg_response(svg)
+
+
+def _svg_response(svg: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=svg, media_type="image/svg+xml", headers=headers)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/stats")
+def stats():
+    workflow = get_workflow()
+    return {
+        "intent_fast_path": workflow.intent.stats.snapshot(),
+        "speculation": workflow.speculation.snapshot(),
+        "hedging": hedging.snapshot(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    if not METRICS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="prometheus_client is not installed.")
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.delete("/admin/cache")
+def invalidate_cache(
+    req: InvalidateRequest, x_admin_token: Optional[str] = Header(default=None)
+):
+    # Fail closed: without a configured token the endpoint is disabled
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN unset)."
+        )
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    workflow = get_workflow()
+    key = req.cache_id or (workflow.cache_key(req.text) if req.text else None)
+    removed = workflow.cache.invalidate(key)
+    if key is None:
+        workflow.semantic.clear()
+    else:
+        workflow.semantic.discard(key)
+    return {"invalidated": removed}
 
 
 if __name__ == "__main__":
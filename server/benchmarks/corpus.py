@@ -0,0 +1,165 @@
+"""
+corpus.py
+
+Inputs for the offline benchmarks: representative request texts for each diagram
+type, the Mermaid files under docs/examples (parsed back into Diagram IR), and
+synthetic graphs of arbitrary size for scaling runs.
+"""
+
+import glob
+import os
+import random
+import re
+from typing import List, Tuple
+
+from server.schemas.diagram import Diagram
+
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "docs", "examples"
+)
+
+CORPUS_TEXTS = [
+    "After process A, process B happens, followed by process C. If C is successful, "
+    "then process D happens; otherwise, process E happens.",
+    "Show the process of water boiling. Water is poured into a kettle. The kettle is "
+    "switched on. The water heats up. Bubbles form and the water boils.",
+    "Timeline of major world wars. World War I started in 1914 and ended in 1918. "
+    "World War II started in 1939 and ended in 1945.",
+    "The history of computing: in 1936 Turing described the universal machine, in "
+    "1946 ENIAC was unveiled, in 1971 the microprocessor arrived, and in 1991 the web went public.",
+    "Brainstorm ideas for a team offsite. Outdoor activities. Workshops. Food and drinks. "
+    "Team building games. Travel logistics.",
+    "Give an overview of machine learning concepts: supervised learning, unsupervised "
+    "learning, reinforcement learning, and deep learning.",
+    "Compare Python vs Java vs Go in a table by typing discipline, performance, and "
+    "concurrency model.",
+    "Explain how a user signs up: they enter an email, we send a verification link, "
+    "they click it, and if the token is valid the account is activated, otherwise an error is shown.",
+]
+
+_REFUND = (
+    "When a customer requests a refund, support looks up the order and checks the payment. "
+    "If the item was returned, support approves the refund, the finance team issues it to the "
+    "original card and the customer gets a confirmation email."
+)
+_PIPELINE = (
+    "The build pipeline checks out the code, installs dependencies, runs the unit tests and "
+    "deploys the artifact to staging."
+)
+
+# Labelled input pairs for calibrating the semantic cache threshold
+# (benchmarks/semantic.py): True when one result serves both, False when the
+# subject, scope or numbers differ.
+SEMANTIC_PAIRS: List[Tuple[str, str, bool]] = [
+    ("timeline of WW2", "World War II timeline", True),
+    ("Timeline of World War II", "World War II timeline", True),
+    ("timeline of the French Revolution", "French Revolution timeline", True),
+    ("history of Apple 1976-2000", "Apple history 1976-2000", True),
+    ("flowchart of the user signup process", "user signup process flowchart", True),
+    ("how does photosynthesis work", "explain photosynthesis", True),
+    ("explain how photosynthesis works", "how photosynthesis works", True),
+    ("mind map of machine learning concepts", "machine learning concepts mind map", True),
+    ("compare Python and Java", "Python vs Java comparison", True),
+    ("compare Python and Java in a table", "table comparing Python and Java", True),
+    ("steps to bake bread", "bread baking steps", True),
+    ("the water cycle", "water cycle", True),
+    ("draw the water cycle", "show me the water cycle", True),
+    ("stages of the software development lifecycle", "software development lifecycle stages", True),
+    ("TCP three-way handshake", "the three-way handshake in TCP", True),
+    ("order fulfillment workflow", "workflow for order fulfillment", True),
+    ("timeline of the Apollo program", "Apollo program timeline", True),
+    ("key events of the Cold War", "Cold War key events", True),
+    ("git branching workflow", "workflow for git branching", True),
+    ("causes of World War I", "World War I causes", True),
+    ("World War I", "World War II", False),
+    ("timeline of WW1", "timeline of WW2", False),
+    ("causes of World War I", "causes of World War II", False),
+    ("history of Apple 1976-2000", "history of Apple 2000-2020", False),
+    ("US presidents 1900-1950", "US presidents 1950-2000", False),
+    ("Windows 10 installation steps", "Windows 11 installation steps", False),
+    ("compare Python and Java", "compare Python and Go", False),
+    ("compare Python and Java", "compare Java and Rust", False),
+    ("timeline of the French Revolution", "timeline of the American Revolution", False),
+    ("timeline of the Apollo program", "timeline of the Gemini program", False),
+    ("history of Apple", "history of Microsoft", False),
+    ("the water cycle", "the carbon cycle", False),
+    ("the water cycle", "the nitrogen cycle", False),
+    ("user signup process", "user login process", False),
+    ("order fulfillment workflow", "order return workflow", False),
+    ("how photosynthesis works", "how respiration works", False),
+    ("TCP three-way handshake", "TLS handshake", False),
+    ("steps to bake bread", "steps to bake a cake", False),
+    ("machine learning concepts", "deep learning concepts", False),
+    ("git branching workflow", "git rebase workflow", False),
+    # Paragraphs: same topic and wording, different actions
+    ("user signup process with email verification", "user signup process with phone verification", False),
+    (_REFUND, _REFUND.replace("approves the refund", "rejects the refund").replace(
+        "the finance team issues it to the original card", "the agent closes the ticket"), False),
+    (_REFUND, _REFUND.replace("issues it to the original card", "issues store credit"), False),
+    (_REFUND, _REFUND.replace("a confirmation email", "an SMS"), False),
+    (_PIPELINE, "The build pipeline checks out the code, installs dependencies, runs the linters "
+     "and publishes the package to the registry.", False),
+    ("New employees sign the contract, receive a laptop, meet their manager and complete the "
+     "security training in the first week.", "New employees sign the contract, receive a laptop, "
+     "shadow a senior colleague and present a demo project in the first week.", False),
+    # Paragraphs: reworded, same process
+    (_REFUND, _REFUND.replace("When a customer requests", "When a customer asks for"), True),
+    (_PIPELINE, "Our build pipeline checks out the code, installs the dependencies, runs unit tests, "
+     "then deploys the artifact to staging.", True),
+    (_REFUND, "When a customer asks for a refund, support finds the order and verifies the payment. "
+     "If the item came back, support approves the refund, finance issues it to the original card "
+     "and the customer receives an email confirmation.", True),
+]
+
+_NODE = re.compile(r'^\s*([A-Za-z0-9_]+)\["(.*)"\]\s*$')
+_EDGE = re.compile(
+    r'^\s*([A-Za-z0-9_]+)\s*-->\s*(?:\|"?(.*?)"?\|\s*)?([A-Za-z0-9_]+)\s*$'
+)
+
+
+def parse_mermaid_flowchart(text: str) -> Diagram:
+    """Minimal parser for the `id["label"]` / `a -->|label| b` subset we emit."""
+    lines = text.strip().splitlines()
+    header = lines[0].split()
+    direction = header[1] if len(header) > 1 else "TD"
+    nodes, edges = [], []
+    for line in lines[1:]:
+        match = _NODE.match(line)
+        if match:
+            nodes.append({"id": match.group(1), "label": match.group(2)})
+            continue
+        match = _EDGE.match(line)
+        if match:
+            edge = {"source": match.group(1), "target": match.group(3)}
+            if match.group(2):
+                edge["label"] = match.group(2)
+            edges.append(edge)
+    return Diagram(
+        type="flowchart",
+        data={"nodes": nodes, "edges": edges},
+        meta={"direction": direction},
+    )
+
+
+def load_examples() -> List[Tuple[str, Diagram]]:
+    examples = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, "*.mmd"))):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text.lstrip().startswith("flowchart"):
+            examples.append((os.path.basename(path), parse_mermaid_flowchart(text)))
+    return examples
+
+
+def synthetic_flowchart(num_nodes: int, edges_per_node: float = 2.0, seed: int = 0) -> Diagram:
+    """Random connected flowchart with roughly `edges_per_node * num_nodes` edges."""
+    rng = random.Random(seed)
+    nodes = [{"id": f"n{i}", "label": f"Step {i}"} for i in range(num_nodes)]
+    edges = [
+        {"source": f"n{rng.randrange(i)}", "target": f"n{i}"} for i in range(1, num_nodes)
+    ]
+    extra = int(num_nodes * edges_per_node) - len(edges)
+    for _ in range(max(0, extra)):
+        a, b = rng.randrange(num_nodes), rng.randrange(num_nodes)
+        edges.append({"source": f"n{a}", "target": f"n{b}", "label": "maybe"})
+    return Diagram(type="flowchart", data={"nodes": nodes, "edges": edges})
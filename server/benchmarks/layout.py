@@ -0,0 +1,57 @@
+"""
+layout.py
+
+Benchmark for the server-side SVG renderer (tools/svg.py): layered layout time
+against graph size, and the cost of redrawing once the layout is cached.
+
+Usage (from the repo root):
+    python -m server.benchmarks.layout --sizes 50 200 1000 5000 --edges-per-node 1.5
+"""
+
+import argparse
+import sys
+import time
+
+from server.benchmarks.corpus import synthetic_flowchart
+from server.tools.svg import LayoutCache, layout_diagram, to_svg
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[50, 200, 1000, 5000])
+    parser.add_argument("--edges-per-node", type=float, default=1.5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'nodes':>7s} {'edges':>7s} {'layout ms':>10s} {'us/node':>8s} "
+        f"{'svg ms':>8s} {'cached ms':>10s} {'svg KiB':>8s}"
+    )
+    for n in args.sizes:
+        diagram = synthetic_flowchart(n, edges_per_node=args.edges_per_node)
+        diagram.typed_data()
+        edges = len(diagram.data["edges"])
+        # A fresh cache per run, so every call lays the graph out again
+        layout_s = best_of(lambda: layout_diagram(diagram, LayoutCache()), args.repeat)
+        cold_s = best_of(lambda: to_svg(diagram, LayoutCache()), args.repeat)
+        warm = LayoutCache()
+        svg = to_svg(diagram, warm)
+        cached_s = best_of(lambda: to_svg(diagram, warm), args.repeat)
+        print(
+            f"{n:7d} {edges:7d} {layout_s * 1000:10.1f} {layout_s * 1e6 / n:8.0f} "
+            f"{cold_s * 1000:8.1f} {cached_s * 1000:10.1f} {len(svg) / 1024:8.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
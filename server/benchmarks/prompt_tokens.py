@@ -0,0 +1,76 @@
+"""
+prompt_tokens.py
+
+Size report for the IR prompt variants: the generic Diagram-schema prompt versus
+the compact per-type prompts (agents/ir_generation_agent.py).
+
+Token counts use fake_llm.estimate_tokens (~4 characters per token), which is
+close enough to compare variants; absolute numbers are approximate.
+
+Usage (from the repo root):
+    python -m server.benchmarks.prompt_tokens
+"""
+
+import sys
+
+from server.schemas.compact import TYPE_DATA_MODELS
+from server.services.fake_llm import estimate_tokens
+
+# Representative visual structures, one per type, as the structure stage returns them
+SAMPLE_STRUCTURES = {
+    "flowchart": {
+        "type": "flowchart",
+        "nodes": [{"id": "a", "label": "Start"}, {"id": "b", "label": "Check"}],
+        "edges": [{"source": "a", "target": "b"}],
+    },
+    "timeline": {
+        "type": "timeline",
+        "events": [{"id": "e1", "label": "WWI", "time": "1914"}],
+    },
+    "mind_map": {
+        "type": "mind_map",
+        "root": {"id": "root", "label": "ML"},
+        "children": [{"id": "c1", "label": "Supervised"}],
+        "edges": [{"source": "root", "target": "c1"}],
+    },
+    "table": {"type": "table", "headers": ["A", "B"], "rows": [["1", "2"]]},
+}
+
+
+def report():
+    from server.agents.ir_generation_agent import typed_ir_prompt
+    from server.prompts.ir_generation_prompt import IR_GENERATION_PROMPT
+    from server.schemas.diagram import Diagram
+    from langchain.output_parsers import PydanticOutputParser
+    from langchain.prompts import PromptTemplate
+
+    generic = PromptTemplate(
+        template=IR_GENERATION_PROMPT,
+        input_variables=["visual_structure"],
+        partial_variables={
+            "format_instructions": PydanticOutputParser(
+                pydantic_object=Diagram
+            ).get_format_instructions()
+        },
+    )
+    rows = []
+    for diagram_type in TYPE_DATA_MODELS:
+        structure = SAMPLE_STRUCTURES[diagram_type]
+        generic_tokens = estimate_tokens(generic.format(visual_structure=structure))
+        typed_tokens = estimate_tokens(
+            typed_ir_prompt(diagram_type).format(visual_structure=structure)
+        )
+        rows.append((diagram_type, generic_tokens, typed_tokens))
+    return rows
+
+
+def main() -> int:
+    print(f"{'type':12s} {'generic':>8s} {'typed':>8s} {'saved':>7s}")
+    for diagram_type, generic_tokens, typed_tokens in report():
+        saved = 1 - typed_tokens / generic_tokens
+        print(f"{diagram_type:12s} {generic_tokens:8d} {typed_tokens:8d} {saved:7.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
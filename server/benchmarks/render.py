@@ -0,0 +1,66 @@
+"""
+render.py
+
+Micro-benchmark for the Mermaid renderer on large flowcharts: nodes per second
+and peak memory of `to_mermaid` (whole string) and `write_mermaid` (streamed to
+a sink), from a Diagram whose typed data is already parsed (as after `validate`).
+
+Usage (from the repo root):
+    python -m server.benchmarks.render --sizes 1000 10000 50000 --edges-per-node 5
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from server.benchmarks.corpus import synthetic_flowchart
+from server.tools.mermaid import to_mermaid, write_mermaid
+
+
+class _Sink:
+    """Text stream that discards what it is given."""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 50000])
+    parser.add_argument("--edges-per-node", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'nodes':>8s} {'edges':>8s} {'renderer':>14s} {'nodes/s':>12s} {'ms':>9s} {'peak MiB':>9s}")
+    for n in args.sizes:
+        diagram = synthetic_flowchart(n, edges_per_node=args.edges_per_node)
+        diagram.typed_data()
+        edges = len(diagram.data["edges"])
+        for name, fn in (
+            ("to_mermaid", lambda: to_mermaid(diagram)),
+            ("write_mermaid", lambda: write_mermaid(diagram, _Sink())),
+        ):
+            seconds, peak = measure(fn, args.repeat)
+            print(
+                f"{n:8d} {edges:8d} {name:>14s} {n / seconds:12.0f} "
+                f"{seconds * 1000:9.1f} {peak / 2**20:9.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
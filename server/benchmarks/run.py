@@ -0,0 +1,262 @@
+"""
+run.py
+
+Offline performance benchmarks: no Bedrock calls, no cost.
+
+Every model in the registry is replaced by services/fake_llm.FakeChatModel with a
+configurable simulated latency, and caches are disabled, so the numbers measure
+the pipeline itself plus a known, fixed LLM cost.
+
+Measures:
+- per-stage latency (intent, structure, ir, validate, render) over the corpus
+- end-to-end `Workflow.arun` latency, LLM calls per run and the non-LLM overhead
+- throughput of `Workflow.arun_many` at a given concurrency
+- `validate` / `to_mermaid` throughput on docs/examples and synthetic graphs
+
+Usage (from the repo root):
+    python -m server.benchmarks.run --output bench.json
+    python -m server.benchmarks.run --baseline bench.json --threshold 0.2
+
+With --baseline the process exits 1 if any metric regresses by more than
+--threshold (relative). Metrics ending in `_ms` are lower-is-better, metrics
+ending in `_per_s` are higher-is-better, and any increase in `.errors` fails.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Benchmarks must never read or write the real caches; set before config import
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+from server.benchmarks.corpus import CORPUS_TEXTS, load_examples, synthetic_flowchart
+from server.services.fake_llm import fake_model_factory
+from server.services.model_bedrock import (
+    configure_executor,
+    registered_models,
+    set_model_factory,
+)
+
+STAGES = ("intent", "structure", "ir")
+
+
+def _summary(prefix: str, samples_s: List[float]) -> Dict[str, float]:
+    ms = sorted(s * 1000 for s in samples_s)
+    return {
+        f"{prefix}.p50_ms": round(statistics.median(ms), 3),
+        f"{prefix}.p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        f"{prefix}.mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+
+def _ops_per_s(fn: Callable[[], object], min_time: float = 0.2) -> float:
+    count, start = 0, time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return round(count / elapsed, 2)
+
+
+def build_workflow(args):
+    from server.graphs.workflow import Workflow
+    from server.services.cache import ResultCache
+
+    set_model_factory(fake_model_factory(latency=args.latency, jitter=args.jitter))
+    workflow = Workflow(cache=ResultCache(enabled=False))
+    workflow.intent.memo.enabled = False
+    workflow.ir_generator.visual_extractor.memo.enabled = False
+    workflow.intent.fast_path_enabled = not args.no_fast_path
+    return workflow
+
+
+def fake_llm_calls(workflow) -> int:
+    # Every stage model comes from the registry, whichever stage it serves
+    return sum(model.llm.calls for model in registered_models())
+
+
+async def bench_stages(workflow, texts: List[str]) -> Dict[str, float]:
+    from server.services.validator import validate
+    from server.tools.mermaid import to_mermaid
+
+    samples = {name: [] for name in STAGES + ("validate", "render")}
+    for text in texts:
+        t0 = time.perf_counter()
+        intent = await workflow.intent.aclassify(text)
+        t1 = time.perf_counter()
+        structure = await workflow.ir_generator.visual_extractor.aextract(text, intent)
+        t2 = time.perf_counter()
+        # The typed prompt production picks for this input (generic if the type is unknown)
+        generator = workflow.ir_generator
+        chain = generator.chain_for(generator.diagram_type(intent, structure))
+        ir = await chain.ainvoke({"visual_structure": structure})
+        t3 = time.perf_counter()
+        diagram = validate(ir)
+        t4 = time.perf_counter()
+        to_mermaid(diagram)
+        t5 = time.perf_counter()
+        for name, value in zip(
+            STAGES + ("validate", "render"), (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)
+        ):
+            samples[name].append(value)
+    metrics = {}
+    for name, values in samples.items():
+        metrics.update(_summary(f"stage.{name}", values))
+    return metrics
+
+
+async def bench_end_to_end(workflow, texts: List[str], iterations: int, latency: float):
+    samples = []
+    calls_before = fake_llm_calls(workflow)
+    for _ in range(iterations):
+        for text in texts:
+            start = time.perf_counter()
+            await workflow.arun(text)
+            samples.append(time.perf_counter() - start)
+    llm_calls = fake_llm_calls(workflow) - calls_before
+    metrics = _summary("e2e", samples)
+    metrics["e2e.llm_calls_per_run"] = round(llm_calls / len(samples), 3)
+    # What the pipeline adds on top of the simulated LLM time
+    simulated_ms = llm_calls * latency * 1000 / len(samples)
+    metrics["e2e.overhead_mean_ms"] = round(metrics["e2e.mean_ms"] - simulated_ms, 3)
+    return metrics
+
+
+async def bench_throughput(workflow, texts: List[str], total: int, concurrency: int):
+    # Suffix each text so batch de-duplication does not collapse the load
+    batch = [f"{texts[i % len(texts)]} (#{i})" for i in range(total)]
+    start = time.perf_counter()
+    results = await workflow.arun_many(batch, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for r in results if r.error)
+    return {
+        "throughput.items_per_s": round(total / elapsed, 2),
+        "throughput.errors": errors,
+    }
+
+
+def bench_cpu(sizes: List[int]) -> Dict[str, float]:
+    from server.services.validator import validate
+    from server.tools.mermaid import to_mermaid
+
+    metrics = {}
+    cases = [(name.rsplit(".", 1)[0], d) for name, d in load_examples()]
+    cases += [(f"synthetic_{n}", synthetic_flowchart(n)) for n in sizes]
+    for name, diagram in cases:
+        payload = diagram.model_dump()
+        validated = validate(diagram.model_copy(deep=True))
+        metrics[f"validate.{name}.ops_per_s"] = _ops_per_s(
+            lambda: validate(json.loads(json.dumps(payload)))
+        )
+        metrics[f"render.{name}.ops_per_s"] = _ops_per_s(lambda: to_mermaid(validated))
+    return metrics
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], threshold: float):
+    """Return human-readable regressions beyond `threshold` (relative)."""
+    regressions = []
+    for name, old in baseline.items():
+        new = current.get(name)
+        if name.endswith(".errors") and new is not None:
+            if new > old:
+                regressions.append(f"{name}: {old} -> {new}")
+            continue
+        if new is None or not old:
+            continue
+        if name.endswith("_ms"):
+            change = (new - old) / old
+        elif name.endswith("_per_s"):
+            change = (old - new) / old
+        else:
+            continue
+        if change > threshold:
+            regressions.append(f"{name}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> Dict[str, float]:
+    # As in the API: LLM calls run on the default executor, sized to the pool
+    configure_executor()
+    workflow = build_workflow(args)
+    texts = list(CORPUS_TEXTS)
+    metrics = {}
+    metrics.update(await bench_stages(workflow, texts))
+    metrics.update(
+        await bench_end_to_end(workflow, texts, args.iterations, args.latency)
+    )
+    metrics.update(
+        await bench_throughput(workflow, texts, args.batch_size, args.concurrency)
+    )
+    metrics.update(bench_cpu(args.sizes))
+    return metrics
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency jitter, e.g. 0.2")
+    parser.add_argument("--iterations", type=int, default=3, help="end-to-end passes over the corpus")
+    parser.add_argument("--batch-size", type=int, default=200, help="items for the throughput run")
+    parser.add_argument("--concurrency", type=int, default=32, help="throughput run concurrency")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000], help="synthetic graph sizes")
+    parser.add_argument("--no-fast-path", action="store_true", help="always call the (fake) LLM for intent")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    # The pipeline logs and prints per call; keep the report readable
+    logging.disable(logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        metrics = asyncio.run(run(args))
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "metrics": metrics,
+    }
+    for name, value in metrics.items():
+        print(f"{name:45s} {value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:", *regressions, sep="\n  ")
+            return 1
+        print("\nNo regressions beyond threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
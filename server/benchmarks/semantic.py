@@ -0,0 +1,57 @@
+"""
+semantic.py
+
+Calibration of the semantic cache threshold (services/semantic_cache.py) on the
+labelled pairs in corpus.SEMANTIC_PAIRS: for each threshold, how many true
+paraphrases hit and how many different inputs would wrongly share a result,
+with and without the key-term guard.
+
+Usage (from the repo root):
+    python -m server.benchmarks.semantic --thresholds 0.6 0.7 0.75 0.8 0.85
+"""
+
+import argparse
+import sys
+
+from server.benchmarks.corpus import SEMANTIC_PAIRS
+from server.services.semantic_cache import embed, key_terms, terms_match
+
+
+def score_pairs():
+    """(similarity, guard passed, label) per labelled pair."""
+    scored = []
+    for a, b, same in SEMANTIC_PAIRS:
+        similarity = float(embed(a) @ embed(b))
+        scored.append((similarity, terms_match(key_terms(a), key_terms(b)), same))
+    return scored
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--thresholds", type=float, nargs="*", default=[0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9]
+    )
+    parser.add_argument("--pairs", action="store_true", help="print every pair's score")
+    args = parser.parse_args(argv)
+
+    scored = score_pairs()
+    positives = sum(1 for _, _, same in scored if same)
+    negatives = len(scored) - positives
+    if args.pairs:
+        for (a, b, _), (similarity, guard, same) in zip(SEMANTIC_PAIRS, scored):
+            print(f"{similarity:6.3f} {'guard' if guard else 'BLOCK'} {str(same):5s}  {a!r} ~ {b!r}")
+        print()
+    print(f"{positives} paraphrase pairs, {negatives} different pairs")
+    print(f"{'threshold':>9s} {'hits':>6s} {'false':>6s} {'hits+guard':>11s} {'false+guard':>12s}")
+    for threshold in args.thresholds:
+        hits = [same for similarity, _, same in scored if similarity >= threshold]
+        guarded = [same for similarity, guard, same in scored if similarity >= threshold and guard]
+        print(
+            f"{threshold:9.2f} {sum(hits):3d}/{positives:<2d} {len(hits) - sum(hits):3d}/{negatives:<2d}"
+            f" {sum(guarded):8d}/{positives:<2d} {len(guarded) - sum(guarded):9d}/{negatives:<2d}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+
 MODEL_ID = "us.anthropic.claude-opus-4-20250514-v1:0"
 # anthropic.claude-v2
 # anthropic.claude-opus-4
@@ -22,3 +24,167 @@ DIAGRAM_TYPES = ["flowchart", "timeline", "mind_map", "table"]
 # - **Bubble Chart**: Visualizes relationships among three numeric variables.
 # - **Heatmap**: Represents data intensity or frequency with color variations.
 # - **Network Diagram**: Displays relationships and interactions between entities.
+
+# Bedrock HTTP client tuning, shared by every agent (services/model_bedrock.py)
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", "128"))
+BEDROCK_CONNECT_TIMEOUT = float(os.environ.get("BEDROCK_CONNECT_TIMEOUT", "5"))
+BEDROCK_READ_TIMEOUT = float(os.environ.get("BEDROCK_READ_TIMEOUT", "120"))
+
+# Resilience around every Bedrock call (services/resilience.py): per-model AIMD
+# concurrency limit, jittered retries within the request deadline, circuit breaker.
+# botocore's own retries are turned off while it is on, so throttling reaches the limiter.
+RESILIENCE_ENABLED = os.environ.get("RESILIENCE_ENABLED", "true").lower() == "true"
+BEDROCK_SDK_MAX_ATTEMPTS = int(
+    os.environ.get("BEDROCK_SDK_MAX_ATTEMPTS", "1" if RESILIENCE_ENABLED else "3")
+)
+BEDROCK_CONCURRENCY_INITIAL = int(os.environ.get("BEDROCK_CONCURRENCY_INITIAL", "32"))
+BEDROCK_CONCURRENCY_MIN = int(os.environ.get("BEDROCK_CONCURRENCY_MIN", "1"))
+BEDROCK_CONCURRENCY_MAX = int(
+    os.environ.get("BEDROCK_CONCURRENCY_MAX", str(BEDROCK_MAX_POOL_CONNECTIONS))
+)
+# Calls waiting for a slot, per model, before new ones are turned away (429)
+BEDROCK_MAX_QUEUE = int(os.environ.get("BEDROCK_MAX_QUEUE", "512"))
+BEDROCK_RETRY_ATTEMPTS = int(os.environ.get("BEDROCK_RETRY_ATTEMPTS", "4"))
+BEDROCK_RETRY_BASE_SECONDS = float(os.environ.get("BEDROCK_RETRY_BASE_SECONDS", "0.25"))
+BEDROCK_RETRY_MAX_SECONDS = float(os.environ.get("BEDROCK_RETRY_MAX_SECONDS", "8"))
+# Consecutive failed calls (after throttling/5xx/timeouts) that open a model's
+# circuit, and how long it stays open before a probe call is let through
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "10"))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "30"))
+# Wall-clock budget of an API request across all its Bedrock calls (0: none)
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "120"))
+
+# Record/replay of Bedrock responses (services/cassette.py)
+# mode: "off" | "record" | "replay"; on miss (replay only): "error" | "passthrough" | "synthetic"
+BEDROCK_CASSETTE_MODE = os.environ.get("BEDROCK_CASSETTE_MODE", "off")
+BEDROCK_CASSETTE_ON_MISS = os.environ.get("BEDROCK_CASSETTE_ON_MISS", "error")
+BEDROCK_CASSETTE_DIR = os.environ.get(
+    "BEDROCK_CASSETTE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cassettes"),
+)
+
+# Hedged calls (services/hedging.py): when a stage's call is slower than this
+# percentile of its recent latency, send a duplicate (optionally to another model
+# or region) and keep whichever answers first. Each hedge is an extra call.
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_STAGES = set(
+    filter(None, os.environ.get("HEDGE_STAGES", "intent,structure,ir").split(","))
+)
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+# Latencies kept per (stage, model), and how many are needed before hedging
+HEDGE_WINDOW = int(os.environ.get("HEDGE_WINDOW", "500"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("HEDGE_MIN_DELAY_SECONDS", "0.05"))
+# Most of the last HEDGE_WINDOW calls that may be hedged: the losing call isn't
+# stopped (it runs to completion on its thread and is billed), so each hedge is
+# a full extra Bedrock call
+HEDGE_MAX_RATE = float(os.environ.get("HEDGE_MAX_RATE", "0.1"))
+# Where the duplicate goes: empty means the same model / region as the original
+HEDGE_MODEL_ID = os.environ.get("HEDGE_MODEL_ID", "")
+HEDGE_REGION = os.environ.get("HEDGE_REGION", "")
+
+# Per-stage Bedrock models (GenerationOptions.models overrides per request).
+# Intent is a four-way classification, so it defaults to a small fast model.
+INTENT_MODEL_ID = os.environ.get(
+    "INTENT_MODEL_ID", "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+)
+STRUCTURE_MODEL_ID = os.environ.get("STRUCTURE_MODEL_ID", MODEL_ID)
+IR_MODEL_ID = os.environ.get("IR_MODEL_ID", MODEL_ID)
+FUSED_MODEL_ID = os.environ.get("FUSED_MODEL_ID", MODEL_ID)
+# Incremental edits (/edit_diagram): instruction → small patch of an existing IR
+EDIT_MODEL_ID = os.environ.get("EDIT_MODEL_ID", MODEL_ID)
+STAGE_MODELS = {
+    "intent": INTENT_MODEL_ID,
+    "structure": STRUCTURE_MODEL_ID,
+    "ir": IR_MODEL_ID,
+    "fused": FUSED_MODEL_ID,
+    "edit": EDIT_MODEL_ID,
+}
+# "Escalate" policy: a stage whose output fails to parse or validate is retried
+# once on this model (skipped when the stage already ran on it)
+ESCALATION_MODEL_ID = os.environ.get("ESCALATION_MODEL_ID", MODEL_ID)
+ESCALATION_ENABLED = os.environ.get("ESCALATION_ENABLED", "false").lower() == "true"
+# Models a request may ask for; defaults to the configured ones
+ALLOWED_MODEL_IDS = set(
+    filter(None, os.environ.get("ALLOWED_MODEL_IDS", "").split(","))
+) or {*STAGE_MODELS.values(), ESCALATION_MODEL_ID}
+
+# Local fast-path intent classifier: skip the LLM when its confidence is at least this
+INTENT_FAST_PATH_ENABLED = os.environ.get("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+INTENT_FAST_PATH_THRESHOLD = float(os.environ.get("INTENT_FAST_PATH_THRESHOLD", "0.9"))
+
+# "pipeline" (intent → structure → IR) or "fused" (single call, pipeline fallback)
+DEFAULT_GENERATION_MODE = os.environ.get("GENERATION_MODE", "pipeline")
+# Pipeline: start structure extraction alongside intent classification, on the
+# local classifier's guess; re-run it when the real intent's diagram type differs
+SPECULATIVE_STRUCTURE_ENABLED = (
+    os.environ.get("SPECULATIVE_STRUCTURE_ENABLED", "false").lower() == "true"
+)
+
+# IR stage: use the compact per-type prompt when the diagram type is known
+# (falls back to the generic Diagram-schema prompt otherwise)
+IR_TYPED_PROMPTS_ENABLED = os.environ.get("IR_TYPED_PROMPTS_ENABLED", "true").lower() == "true"
+
+# Oversized flowcharts (services/partition.py): "off" | "subgraphs" (one diagram,
+# communities as subgraphs) | "pages" (overview + one detail diagram per community).
+# Applies to graphs with more than PARTITION_MAX_CLUSTER_SIZE nodes.
+PARTITION_MODE = os.environ.get("PARTITION_MODE", "off")
+PARTITION_MAX_CLUSTER_SIZE = int(os.environ.get("PARTITION_MAX_CLUSTER_SIZE", "40"))
+PARTITION_MAX_ITERATIONS = int(os.environ.get("PARTITION_MAX_ITERATIONS", "20"))
+
+# Server-side SVG rendering (tools/svg.py): in-process LRU of layouts by IR hash
+SVG_LAYOUT_CACHE_SIZE = int(os.environ.get("SVG_LAYOUT_CACHE_SIZE", "256"))
+
+# Single-flight (services/singleflight.py): identical concurrent generations share
+# one pipeline run; cancel it once every waiting request has gone away
+SINGLEFLIGHT_ENABLED = os.environ.get("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+SINGLEFLIGHT_CANCEL_ORPHANS = (
+    os.environ.get("SINGLEFLIGHT_CANCEL_ORPHANS", "true").lower() == "true"
+)
+
+# Batch generation: default / maximum in-flight pipelines per batch, and batch size cap
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "64"))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+
+# Document segmentation (services/segmenter.py): one diagram per topic segment
+SEGMENT_MAX_CHARS = int(os.environ.get("SEGMENT_MAX_CHARS", "4000"))
+SEGMENT_MIN_CHARS = int(os.environ.get("SEGMENT_MIN_CHARS", "200"))
+SEGMENT_SIMILARITY_THRESHOLD = float(os.environ.get("SEGMENT_SIMILARITY_THRESHOLD", "0.2"))
+SEGMENT_MAX_SEGMENTS = int(os.environ.get("SEGMENT_MAX_SEGMENTS", "12"))
+
+# Startup: build the Workflow (imports, Bedrock clients) in the background at
+# startup instead of on the first request; /ready reports when it is done.
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "true").lower() == "true"
+WARMUP_PRIME_CACHES = os.environ.get("WARMUP_PRIME_CACHES", "true").lower() == "true"
+
+# Result cache (see services/cache.py)
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+CACHE_DIR = os.environ.get(
+    "CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
+)
+# Small, short-lived in-process tier; the on-disk tier is shared across workers.
+CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get("CACHE_MEMORY_MAX_ENTRIES", "1024"))
+CACHE_MEMORY_TTL_SECONDS = int(os.environ.get("CACHE_MEMORY_TTL_SECONDS", "300"))
+CACHE_DISK_TTL_SECONDS = int(os.environ.get("CACHE_DISK_TTL_SECONDS", str(7 * 24 * 3600)))
+# Per-stage memoization of intent / visual-structure outputs
+STAGE_MEMO_ENABLED = (
+    CACHE_ENABLED and os.environ.get("STAGE_MEMO_ENABLED", "true").lower() == "true"
+)
+# Semantic cache (services/semantic_cache.py): reuse the result of a near-duplicate
+# input when the cosine similarity of their embeddings is at least the threshold
+# (GenerationOptions.semantic_threshold overrides it per request; 1 disables it).
+# A sample of hits is regenerated in the background to measure hit quality.
+# Calibrated with `python -m server.benchmarks.semantic`: paragraphs that differ in
+# a single action score up to 0.92, so with the key-term guard 0.93 is the lowest
+# threshold with no false match. Off by default: a wrong hit is a wrong diagram.
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_DIR = os.environ.get("SEMANTIC_CACHE_DIR", os.path.join(CACHE_DIR, "semantic"))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.93"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_DIM = int(os.environ.get("SEMANTIC_CACHE_DIM", "512"))
+# Exact search up to this many entries per scope, LSH-narrowed search beyond it
+SEMANTIC_CACHE_BRUTE_FORCE_MAX = int(os.environ.get("SEMANTIC_CACHE_BRUTE_FORCE_MAX", "4096"))
+SEMANTIC_CACHE_SAMPLE_RATE = float(os.environ.get("SEMANTIC_CACHE_SAMPLE_RATE", "0.02"))
+# Shared secret for /admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
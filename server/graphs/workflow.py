@@ -4,47 +4,802 @@ workflow.py
 This module orchestrates the backend workflow using LangChain/LangGraph patterns.
 Steps:
 1. Intent understanding (text → intent/type)
-2. IR generation (type → IR)
-3. Mermaid rendering (IR → Mermaid string)
+2. IR generation (type → IR); with `speculative`, its structure extraction
+   starts alongside step 1 on the local classifier's guess and is re-run only
+   when the real intent's diagram type differs
+3. Mermaid rendering (IR → Mermaid string); oversized flowcharts are optionally
+   partitioned first (services/partition.py) into subgraphs or overview + pages
+
+Existing diagrams can be edited incrementally (`aedit`): the model only returns
+a patch, which is applied locally, re-validated and re-rendered.
+
+Long documents can be segmented into topics first (`arun_segments`), with one
+diagram per topic generated concurrently.
+
+Results are cached by content address (see services/cache.py), so repeated
+inputs skip every LLM call; near-duplicate inputs reuse a result through the
+semantic cache (services/semantic_cache.py). In "fused" mode steps 1-2 collapse into a single
+LLM call, with the 3-step path as fallback when its output fails validation.
 
 Observability hooks (LangSmith) can be added for each step.
 """
 
+import asyncio
 import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
 from server.agents.text_intent_agent import IntentClassifier
+from server.config.variables import (
+    BATCH_CONCURRENCY,
+    ESCALATION_MODEL_ID,
+    REQUEST_DEADLINE_SECONDS,
+    SEMANTIC_CACHE_SAMPLE_RATE,
+    SINGLEFLIGHT_CANCEL_ORPHANS,
+    SINGLEFLIGHT_ENABLED,
+)
+from server.schemas.diagram import Diagram
+from server.schemas.generation import (
+    BatchItemResult,
+    DiagramPage,
+    GenerationOptions,
+    GenerationResult,
+)
+from server.services.partition import cluster_diagram, paginate_diagram
+from server.services.segmenter import segment_text
+from server.services.cache import (
+    ResultCache,
+    UnknownCacheIdError,
+    make_key,
+    normalize_text,
+    prompt_version,
+)
+from server.services.patcher import apply_patch
+from server.services.resilience import deadline
+from server.services.semantic_cache import SemanticCache, record_hit_quality
+from server.services.singleflight import SingleFlight
 
 from server.services.validator import validate
 from server.tools.mermaid import to_mermaid
 from server.agents.ir_generation_agent import IRGenerator
+from server.agents.fused_generation_agent import FusedGenerator
+from server.agents.edit_agent import DiagramEditor
 
 
 from server.utils.logger import get_logger
+from server.utils.metrics import (
+    CACHE_REQUESTS,
+    ESCALATIONS,
+    IN_FLIGHT_GENERATIONS,
+    SPECULATION_SAVED_SECONDS,
+    SPECULATIONS,
+    stage_timer,
+)
+from server.utils.partial_json import IncrementalJsonScanner
 
 logger = get_logger(os.path.basename(__file__))
 
+# Receives the progress events of a streamed generation (see `Workflow.astream`)
+Emit = Callable[[Dict[str, Any]], None]
+
+# What a rejected LLM output raises: OutputParserException and pydantic's
+# ValidationError are ValueErrors, the validator also raises the others
+REJECTED_OUTPUT_ERRORS = (ValueError, AssertionError, TypeError, KeyError)
+
+
+class SpeculationStats:
+    """How often speculative structure extraction is kept, and the latency it saves.
+
+    The saving of a kept speculation is estimated as the overlap of the two
+    stages: min(intent time, structure time).
+    """
 
-class Workflow:
     def __init__(self):
+        self._lock = threading.Lock()
+        self.kept = 0
+        self.rerun = 0
+        self.saved_seconds = 0.0
+
+    def record_kept(self, saved_seconds: float) -> None:
+        with self._lock:
+            self.kept += 1
+            self.saved_seconds += saved_seconds
+        SPECULATIONS.labels("kept").inc()
+        SPECULATION_SAVED_SECONDS.inc(saved_seconds)
+
+    def record_rerun(self) -> None:
+        with self._lock:
+            self.rerun += 1
+        SPECULATIONS.labels("rerun").inc()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.kept + self.rerun
+            return {
+                "speculations": total,
+                "kept": self.kept,
+                "rerun": self.rerun,
+                "rerun_rate": self.rerun / total if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "avg_saved_seconds": self.saved_seconds / self.kept if self.kept else 0.0,
+            }
+
+
+class Workflow:
+    def __init__(
+        self, cache: Optional[ResultCache] = None, semantic: Optional[SemanticCache] = None
+    ):
         logger.info("Initializing Workflow components...")
         self.intent = IntentClassifier()
         self.ir_generator = IRGenerator()
+        self.fused = FusedGenerator()
+        self.editor = DiagramEditor()
+        self.cache = cache if cache is not None else ResultCache()
+        self.semantic = semantic if semantic is not None else SemanticCache()
+        self.inflight = SingleFlight("generate", cancel_orphans=SINGLEFLIGHT_CANCEL_ORPHANS)
+        # Hit-quality samples running in the background (kept referenced until done)
+        self._samples: set = set()
+        self.speculation = SpeculationStats()
 
-    def run(self, text: str) -> str:
-        logger.info("Received input")
+    def cache_key(self, text: str, options: Optional[GenerationOptions] = None) -> str:
+        """Content address of a request: normalized text, models, prompt version and options."""
+        options = options or GenerationOptions()
+        return make_key(
+            "result",
+            normalize_text(text),
+            options.stage_models(),
+            prompt_version(),
+            _options_key(options),
+        )
 
-        logger.info("\n\n%s\nStep 1: Intent understanding...\n%s", "=" * 20, "=" * 20)
-        intent_result = self.intent.classify(text)
+    def semantic_scope(self, options: GenerationOptions) -> str:
+        """Everything in the cache key but the text: near-duplicates only match within it."""
+        return make_key(
+            "semantic",
+            options.stage_models(),
+            prompt_version(),
+            _options_key(options),
+        )[:16]
 
-        logger.info("\n\n%s\nStep 2: IR generation...\n%s", "=" * 20, "=" * 20)
-        ir = self.ir_generator.generate_ir(text, intent_result)
-        # logger.info("IR: %s", ir)
-        diagram = validate(ir)
-        logger.info("Validated diagram: %s", diagram)
+    def run(self, text: str, options: Optional[GenerationOptions] = None) -> str:
+        return self.generate(text, options).mermaid
+
+    async def arun(self, text: str, options: Optional[GenerationOptions] = None) -> str:
+        """Async variant of `run`.
+
+        Every LLM round-trip is awaited via the chains' `ainvoke`, so a single
+        worker can keep many generations in flight without holding a thread each.
+        """
+        return (await self.agenerate(text, options)).mermaid
+
+    def generate(
+        self, text: str, options: Optional[GenerationOptions] = None
+    ) -> GenerationResult:
+        """Sync entry point; must not be called from inside a running event loop."""
+        return asyncio.run(self.agenerate(text, options))
+
+    async def agenerate(
+        self, text: str, options: Optional[GenerationOptions] = None
+    ) -> GenerationResult:
+        """Run the pipeline behind the result cache.
+
+        On an exact miss, the result of a near-duplicate input is reused when the
+        semantic cache finds one (meta["semantic"] has the similarity). Concurrent
+        calls with the same cache key share one pipeline run
+        (services/singleflight.py); their results carry meta["coalesced"].
+        """
+        options = options or GenerationOptions()
+        key = self.cache_key(text, options)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info("Result cache hit: %s", key)
+            return GenerationResult(
+                mermaid=cached["mermaid"],
+                diagram=cached["diagram"],
+                cached=True,
+                cache_id=key,
+                meta=cached.get("meta", {}),
+                pages=cached.get("pages", []),
+            )
+        similar = await self._semantic_lookup(text, options, key)
+        if similar is not None:
+            return similar
+        if not SINGLEFLIGHT_ENABLED:
+            return await self._agenerate(text, options, key)
+        result, shared = await self.inflight.do(
+            key, lambda: self._agenerate(text, options, key)
+        )
+        if shared:
+            # Each waiter gets its own copy of the leader's result
+            result = result.model_copy(update={"meta": {**result.meta, "coalesced": True}})
+        return result
+
+    async def _agenerate(
+        self,
+        text: str,
+        options: GenerationOptions,
+        key: str,
+        emit: Optional[Emit] = None,
+    ) -> GenerationResult:
+        """Cache miss: run the pipeline, render and store the result under `key`.
+
+        With `emit`, the IR is streamed and each stage's event is passed to it.
+        """
+        escalated: List[str] = []
+        IN_FLIGHT_GENERATIONS.inc()
+        try:
+            if options.mode == "fused":
+                diagram, path = await self._afused(text, options, escalated, emit)
+            else:
+                diagram = await self._apipeline(text, options, escalated, emit)
+                path = "pipeline"
+        finally:
+            IN_FLIGHT_GENERATIONS.dec()
+        if emit is not None:
+            emit(_event("validated", **diagram.model_dump()))
 
         logger.info("\n\n%s\nStep 3: Mermaid rendering...\n%s", "=" * 20, "=" * 20)
-        mermaid_code = to_mermaid(diagram)
+        mermaid_code, pages = self.render(diagram, options)
         logger.info("Mermaid code generated.")
-        return mermaid_code
+
+        meta = {"path": path}
+        if escalated:
+            meta["escalated"] = escalated
+        if diagram.repairs:
+            meta["repairs"] = diagram.repairs
+        await asyncio.to_thread(
+            self.cache.set,
+            key,
+            {
+                "mermaid": mermaid_code,
+                "diagram": diagram.model_dump(),
+                "meta": meta,
+                "pages": [p.model_dump() for p in pages],
+            },
+        )
+        await asyncio.to_thread(self.semantic.add, text, self.semantic_scope(options), key)
+        return GenerationResult(
+            mermaid=mermaid_code,
+            diagram=diagram,
+            cached=False,
+            cache_id=key,
+            meta=meta,
+            pages=pages,
+        )
+
+    async def _semantic_lookup(
+        self, text: str, options: GenerationOptions, key: str
+    ) -> Optional[GenerationResult]:
+        """The cached result of the nearest past input, if similar enough."""
+        threshold = options.semantic_threshold
+        if not self.semantic.enabled or (threshold is not None and threshold >= 1):
+            return None
+        match = await asyncio.to_thread(
+            self.semantic.lookup, text, self.semantic_scope(options), threshold
+        )
+        if match is None:
+            return None
+        matched, similarity = match
+        cached = await asyncio.to_thread(self.cache.get, matched)
+        if cached is None:
+            # The result it points at expired or was invalidated
+            CACHE_REQUESTS.labels("semantic", "stale").inc()
+            await asyncio.to_thread(self.semantic.discard, matched)
+            return None
+        logger.info("Semantic cache hit: %s (similarity %.3f)", matched, similarity)
+        if random.random() < SEMANTIC_CACHE_SAMPLE_RATE:
+            task = asyncio.ensure_future(
+                self._sample_hit_quality(text, options, key, cached["diagram"])
+            )
+            self._samples.add(task)
+            task.add_done_callback(self._samples.discard)
+        return GenerationResult(
+            mermaid=cached["mermaid"],
+            diagram=cached["diagram"],
+            cached=True,
+            cache_id=matched,
+            meta={
+                **cached.get("meta", {}),
+                "semantic": {"similarity": round(similarity, 4), "matched": matched},
+            },
+            pages=cached.get("pages", []),
+        )
+
+    async def _sample_hit_quality(
+        self, text: str, options: GenerationOptions, key: str, served: Dict[str, Any]
+    ) -> None:
+        """Generate `text` for real and score the diagram a semantic hit served for it.
+
+        The fresh result is cached under its own key, so the sample isn't wasted.
+        """
+        try:
+            fresh, _ = await self.inflight.do(
+                key, lambda: self._agenerate(text, options, key)
+            )
+        except Exception as e:
+            logger.warning("Semantic hit-quality sample failed: %s", e)
+            return
+        quality = record_hit_quality(served, fresh.diagram)
+        logger.info("Semantic hit quality for %s: %.2f", key[:12], quality)
+
+    def render(
+        self, diagram: Diagram, options: GenerationOptions
+    ) -> Tuple[str, List[DiagramPage]]:
+        """Mermaid for a validated diagram, partitioned per `options.partition`.
+
+        Returns the main diagram (the overview for "pages") and the detail pages.
+        """
+        if options.partition == "off" or diagram.type != "flowchart":
+            return to_mermaid(diagram), []
+        with stage_timer("partition"):
+            if options.partition == "subgraphs":
+                diagram, details = cluster_diagram(diagram, options.max_cluster_size), []
+            else:
+                diagram, details = paginate_diagram(diagram, options.max_cluster_size)
+        pages = [
+            DiagramPage(id=d.meta["page"], title=d.meta["title"], mermaid=to_mermaid(d))
+            for d in details
+        ]
+        return to_mermaid(diagram), pages
+
+    async def aedit(
+        self,
+        instruction: str,
+        ir: Optional[Dict[str, Any]] = None,
+        cache_id: Optional[str] = None,
+        options: Optional[GenerationOptions] = None,
+    ) -> GenerationResult:
+        """Apply an edit instruction to an existing diagram (its IR or cache id).
+
+        The edit model returns a small patch (schemas/patch.py) that is applied
+        locally, re-validated and re-rendered; the result is cached under its
+        own key, derived from the base diagram and the normalized instruction.
+        Raises UnknownCacheIdError for an unknown cache id and ValueError for a
+        patch that doesn't apply.
+        """
+        options = options or GenerationOptions()
+        if ir is None:
+            cached = await asyncio.to_thread(self.cache.get, cache_id) if cache_id else None
+            if cached is None:
+                raise UnknownCacheIdError(f"No cached diagram for id {cache_id}")
+            ir = cached["diagram"]
+        base = validate(ir)
+        key = make_key(
+            "edit",
+            base.model_dump(),
+            normalize_text(instruction),
+            options.stage_models()["edit"],
+            prompt_version(),
+            _options_key(options),
+        )
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info("Edit cache hit: %s", key)
+            return GenerationResult(
+                mermaid=cached["mermaid"],
+                diagram=cached["diagram"],
+                cached=True,
+                cache_id=key,
+                meta=cached.get("meta", {}),
+                pages=cached.get("pages", []),
+            )
+
+        escalated: List[str] = []
+        applied: List[str] = []
+
+        async def edit(model_id: str) -> Diagram:
+            patch = await self.editor.aedit(base, instruction, model_id)
+            patched, ops = apply_patch(base, patch)
+            applied[:] = ops
+            return validate(patched)
+
+        IN_FLIGHT_GENERATIONS.inc()
+        try:
+            diagram = await self._escalating("edit", options, escalated, edit)
+        finally:
+            IN_FLIGHT_GENERATIONS.dec()
+        mermaid_code, pages = self.render(diagram, options)
+
+        meta = {"path": "edit", "patch": applied}
+        if cache_id:
+            meta["parent"] = cache_id
+        if escalated:
+            meta["escalated"] = escalated
+        if diagram.repairs:
+            meta["repairs"] = diagram.repairs
+        await asyncio.to_thread(
+            self.cache.set,
+            key,
+            {
+                "mermaid": mermaid_code,
+                "diagram": diagram.model_dump(),
+                "meta": meta,
+                "pages": [p.model_dump() for p in pages],
+            },
+        )
+        return GenerationResult(
+            mermaid=mermaid_code,
+            diagram=diagram,
+            cached=False,
+            cache_id=key,
+            meta=meta,
+            pages=pages,
+        )
+
+    def run_many(
+        self,
+        texts: List[str],
+        options: Optional[GenerationOptions] = None,
+        concurrency: int = BATCH_CONCURRENCY,
+    ) -> List[BatchItemResult]:
+        """Sync entry point for `arun_many`."""
+        return asyncio.run(self.arun_many(texts, options, concurrency))
+
+    async def arun_many(
+        self,
+        texts: List[str],
+        options: Optional[GenerationOptions] = None,
+        concurrency: int = BATCH_CONCURRENCY,
+    ) -> List[BatchItemResult]:
+        """Generate many diagrams with at most `concurrency` pipelines in flight.
+
+        Identical inputs (same cache key) run once; every item gets its own
+        result and a failing item never fails the batch. All items share this
+        workflow's agents and therefore its Bedrock clients. Each item gets its
+        own REQUEST_DEADLINE_SECONDS, counted from when it starts running.
+        """
+        options = options or GenerationOptions()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(text: str) -> GenerationResult:
+            async with semaphore:
+                with deadline(REQUEST_DEADLINE_SECONDS):
+                    return await self.agenerate(text, options)
+
+        keys: List[Optional[str]] = []
+        tasks: Dict[str, asyncio.Task] = {}
+        for text in texts:
+            if not text or not text.strip():
+                keys.append(None)
+                continue
+            key = self.cache_key(text, options)
+            keys.append(key)
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(run_one(text))
+        logger.info(
+            "Batch of %d items (%d unique), concurrency %d",
+            len(texts),
+            len(tasks),
+            concurrency,
+        )
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        results = []
+        for index, key in enumerate(keys):
+            if key is None:
+                results.append(BatchItemResult(index=index, error="Text input required."))
+                continue
+            task = tasks[key]
+            if task.exception() is not None:
+                results.append(BatchItemResult(index=index, error=str(task.exception())))
+                continue
+            result = task.result()
+            results.append(
+                BatchItemResult(
+                    index=index,
+                    mermaid=result.mermaid,
+                    cached=result.cached,
+                    cache_id=result.cache_id,
+                    meta=result.meta,
+                    pages=result.pages,
+                )
+            )
+        return results
+
+    def run_segments(
+        self, text: str, options: Optional[GenerationOptions] = None
+    ) -> List[Tuple[str, BatchItemResult]]:
+        """Sync entry point for `arun_segments`."""
+        return asyncio.run(self.arun_segments(text, options))
+
+    async def arun_segments(
+        self, text: str, options: Optional[GenerationOptions] = None
+    ) -> List[Tuple[str, BatchItemResult]]:
+        """Split a document into topics and build one diagram per topic.
+
+        Segmentation is local (services/segmenter.py); segments then run
+        concurrently, so latency is bounded by the slowest segment.
+        """
+        segments = segment_text(text)
+        logger.info("Segmented input into %d topic(s)", len(segments))
+        results = await self.arun_many(segments, options, concurrency=len(segments))
+        return list(zip(segments, results))
+
+    async def astream(
+        self, text: str, options: Optional[GenerationOptions] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run the pipeline, yielding an event as each stage completes.
+
+        Events, in order: intent, structure, partial (zero or more progressive
+        Mermaid snapshots while the IR streams in), ir, validated, rendered;
+        "escalated" precedes a stage re-run on ESCALATION_MODEL_ID and "fallback"
+        a rejected fused output. The bookkeeping is `agenerate`'s: an exact or
+        semantic cache hit yields a single rendered event, and a stream joining a
+        generation already in flight for the same key only gets the final
+        rendered event (meta["coalesced"]).
+        """
+        options = options or GenerationOptions()
+        key = self.cache_key(text, options)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            yield _event(
+                "rendered",
+                mermaid=cached["mermaid"],
+                cached=True,
+                cache_id=key,
+                pages=cached.get("pages", []),
+                **cached.get("meta", {}),
+            )
+            return
+        similar = await self._semantic_lookup(text, options, key)
+        if similar is not None:
+            yield _rendered(similar)
+            return
+
+        events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+        async def generate() -> Tuple[GenerationResult, bool]:
+            run = lambda: self._agenerate(text, options, key, emit=events.put_nowait)
+            if not SINGLEFLIGHT_ENABLED:
+                return await run(), False
+            return await self.inflight.do(key, run)
+
+        call = asyncio.ensure_future(generate())
+        try:
+            while not call.done():
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, call}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            while not events.empty():
+                yield events.get_nowait()
+            result, shared = call.result()
+        finally:
+            # Consumer gone: singleflight cancels the run once no caller is left
+            call.cancel()
+        if shared:
+            result = result.model_copy(update={"meta": {**result.meta, "coalesced": True}})
+        yield _rendered(result)
+
+    async def _astream_ir(
+        self,
+        chunks: AsyncIterator[str],
+        parser: Any,
+        diagram_type: Optional[str],
+        emit: Emit,
+    ) -> Any:
+        """Consume a token stream, emitting partial Mermaid as elements complete.
+
+        Returns the parsed IR, after emitting it as the "ir" event.
+        """
+        scanner = IncrementalJsonScanner()
+        collected = {"nodes": [], "edges": [], "events": []}
+        async for chunk in chunks:
+            found = scanner.feed(chunk)
+            if not found:
+                continue
+            for array_key, obj in found:
+                collected[array_key].append(obj)
+            diagram_type = diagram_type or _sniff_type(scanner.text)
+            partial = _partial_mermaid(diagram_type, collected)
+            if partial:
+                counts = {k: len(v) for k, v in collected.items()}
+                emit(_event("partial", mermaid=partial, **counts))
+        ir = parser.parse(scanner.text)
+        emit(_event("ir", **_dump(ir)))
+        return ir
+
+    async def _apipeline(
+        self,
+        text: str,
+        options: GenerationOptions,
+        escalated: List[str],
+        emit: Optional[Emit] = None,
+    ) -> Diagram:
+        """Intent → structure → IR, each on its configured model.
+
+        With `options.escalate`, a stage whose output is rejected is retried
+        once on ESCALATION_MODEL_ID; escalated stages are appended to `escalated`.
+        With `emit`, the IR is streamed (see `_astream_ir`).
+        """
+        logger.info("Received input")
+
+        with stage_timer("intent_structure"):
+            if options.speculative:
+                intent_result, structure = await self._aspeculate(
+                    text, options, escalated, emit
+                )
+                if emit is not None:
+                    emit(_event("intent", **_dump(intent_result)))
+            else:
+                logger.info("\n\n%s\nStep 1: Intent understanding...\n%s", "=" * 20, "=" * 20)
+                intent_result = await self._escalating(
+                    "intent",
+                    options,
+                    escalated,
+                    lambda model_id: self.intent.aclassify(text, model_id),
+                    emit,
+                )
+                if emit is not None:
+                    emit(_event("intent", **_dump(intent_result)))
+                logger.info("\n\n%s\nStep 2: IR generation...\n%s", "=" * 20, "=" * 20)
+                structure = await self._aextract(text, intent_result, options, escalated, emit)
+        if emit is not None:
+            emit(_event("structure", **_dump(structure)))
+
+        async def generate_ir(model_id: str) -> Diagram:
+            if emit is None:
+                ir = await self.ir_generator.agenerate_ir(
+                    text, intent_result, model_id, visual_structure=structure
+                )
+            else:
+                diagram_type = self.ir_generator.diagram_type(intent_result, structure)
+                ir = await self._astream_ir(
+                    self.ir_generator.astream_text(structure, diagram_type, model_id),
+                    self.ir_generator.parser,
+                    diagram_type,
+                    emit,
+                )
+            return validate(ir)
+
+        diagram = await self._escalating("ir", options, escalated, generate_ir, emit)
+        logger.info("Validated diagram: %s", diagram)
+        return diagram
+
+    async def _aextract(
+        self,
+        text: str,
+        intent_result: Any,
+        options: GenerationOptions,
+        escalated: List[str],
+        emit: Optional[Emit] = None,
+    ) -> Dict[str, Any]:
+        return await self._escalating(
+            "structure",
+            options,
+            escalated,
+            lambda model_id: self.ir_generator.visual_extractor.aextract(
+                text, intent_result, model_id
+            ),
+            emit,
+        )
+
+    async def _aspeculate(
+        self,
+        text: str,
+        options: GenerationOptions,
+        escalated: List[str],
+        emit: Optional[Emit] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Intent and structure concurrently, the structure on a provisional intent.
+
+        The speculative structure is kept when the real intent agrees on the
+        diagram type (with no local guess, when the structure's own type agrees),
+        else it is cancelled or discarded and extracted again on the real intent.
+        """
+        logger.info(
+            "\n\n%s\nSteps 1-2: intent and structure (speculative)...\n%s", "=" * 20, "=" * 20
+        )
+        provisional = self.intent.provisional(text)
+        guessed = provisional.diagram_type
+        speculative_escalated: List[str] = []
+        start = time.perf_counter()
+        finished: Dict[str, float] = {}
+        speculation = asyncio.ensure_future(
+            self._aextract(text, provisional, options, speculative_escalated)
+        )
+        speculation.add_done_callback(lambda _: finished.setdefault("at", time.perf_counter()))
+        try:
+            intent_result = await self._escalating(
+                "intent",
+                options,
+                escalated,
+                lambda model_id: self.intent.aclassify(text, model_id),
+                emit,
+            )
+        except BaseException:
+            speculation.cancel()
+            raise
+        intent_seconds = time.perf_counter() - start
+        diagram_type = self.ir_generator.diagram_type(intent_result, None)
+
+        structure = None
+        if guessed is not None and guessed != diagram_type:
+            if speculation.done() and not speculation.cancelled():
+                speculation.exception()  # discarded either way; mark it retrieved
+            speculation.cancel()
+        else:
+            try:
+                structure = await speculation
+            except REJECTED_OUTPUT_ERRORS as e:
+                logger.warning("Speculative structure rejected (%s); re-running", e)
+            if guessed is None and isinstance(structure, dict):
+                if structure.get("type") not in (None, diagram_type):
+                    structure = None
+
+        if structure is not None:
+            escalated.extend(speculative_escalated)
+            structure_seconds = finished["at"] - start
+            self.speculation.record_kept(min(intent_seconds, structure_seconds))
+            return intent_result, structure
+        logger.info(
+            "Speculative structure discarded (guessed %s, intent %s); re-running",
+            guessed,
+            diagram_type,
+        )
+        self.speculation.record_rerun()
+        return intent_result, await self._aextract(
+            text, intent_result, options, escalated, emit
+        )
+
+    async def _escalating(
+        self,
+        stage: str,
+        options: GenerationOptions,
+        escalated: List[str],
+        call: Callable[[str], Awaitable[Any]],
+        emit: Optional[Emit] = None,
+    ) -> Any:
+        """Run `call(model_id)` on the stage's model, escalating rejected output."""
+        model_id = options.stage_models()[stage]
+        try:
+            return await call(model_id)
+        except REJECTED_OUTPUT_ERRORS as e:
+            if not options.escalate or model_id == ESCALATION_MODEL_ID:
+                raise
+            logger.warning(
+                "%s output from %s rejected (%s); escalating to %s",
+                stage,
+                model_id,
+                e,
+                ESCALATION_MODEL_ID,
+            )
+            ESCALATIONS.labels(stage).inc()
+            escalated.append(stage)
+            if emit is not None:
+                emit(_event("escalated", stage=stage, model_id=ESCALATION_MODEL_ID, reason=str(e)))
+            return await call(ESCALATION_MODEL_ID)
+
+    async def _afused(
+        self,
+        text: str,
+        options: GenerationOptions,
+        escalated: List[str],
+        emit: Optional[Emit] = None,
+    ) -> Tuple[Diagram, str]:
+        """Single-call generation; falls back to the 3-stage pipeline on bad output."""
+        logger.info("\n\n%s\nFused generation...\n%s", "=" * 20, "=" * 20)
+        model_id = options.stage_models()["fused"]
+        try:
+            if emit is None:
+                ir = await self.fused.agenerate(text, model_id)
+            else:
+                ir = await self._astream_ir(
+                    self.fused.astream_text(text, model_id), self.fused.parser, None, emit
+                )
+            diagram = validate(ir)
+            logger.info("Validated diagram: %s", diagram)
+            return diagram, "fused"
+        except REJECTED_OUTPUT_ERRORS as e:
+            logger.warning("Fused output rejected (%s); falling back to pipeline", e)
+            if emit is not None:
+                emit(_event("fallback", reason=str(e)))
+            return await self._apipeline(text, options, escalated, emit), "fused_fallback"
 
     def run_example(self, text: str) -> str:
         return """
@@ -79,3 +834,58 @@ class Workflow:
         traditional_coding --> merge_code
         core_architecture --> merge_code
         merge_code --> end_node"""
+
+
+def _options_key(options: GenerationOptions) -> Dict[str, Any]:
+    """The options part of a cache key: those that change the output (a lookup
+    threshold doesn't)."""
+    return options.model_dump(exclude={"semantic_threshold"})
+
+
+def _event(name: str, **data) -> Dict[str, Any]:
+    return {"event": name, "data": data}
+
+
+def _dump(obj: Any) -> Dict[str, Any]:
+    return obj.model_dump() if hasattr(obj, "model_dump") else dict(obj)
+
+
+def _rendered(result: GenerationResult) -> Dict[str, Any]:
+    return _event(
+        "rendered",
+        mermaid=result.mermaid,
+        cached=result.cached,
+        cache_id=result.cache_id,
+        pages=[_dump(p) for p in result.pages],
+        **result.meta,
+    )
+
+
+_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"(\w+)"')
+
+
+def _sniff_type(text: str) -> Optional[str]:
+    """Best-effort diagram type from a partial IR completion (top-level key first)."""
+    match = _TYPE_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def _partial_mermaid(diagram_type: Optional[str], collected: Dict[str, list]) -> Optional[str]:
+    """Render what has streamed in so far; only flowcharts and timelines grow incrementally."""
+    if diagram_type == "flowchart":
+        nodes = collected["nodes"]
+        ids = {n.get("id") for n in nodes}
+        edges = [
+            e
+            for e in collected["edges"]
+            if e.get("source") in ids and e.get("target") in ids
+        ]
+        data = {"nodes": nodes, "edges": edges}
+    elif diagram_type == "timeline":
+        data = {"events": collected["events"]}
+    else:
+        return None
+    try:
+        return to_mermaid(Diagram(type=diagram_type, data=data))
+    except (ValueError, TypeError):
+        return None
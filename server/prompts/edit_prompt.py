@@ -0,0 +1,36 @@
+"""
+Prompt for incremental edits: existing diagram IR + instruction → a small patch
+(schemas/patch.py) that services/patcher.py applies locally.
+"""
+
+EDIT_PATCH_PROMPT = """
+You are a diagram patch generator. Given an existing {diagram_type} diagram IR and an edit instruction, output only the changes, as JSON with exactly this shape ("?" marks optional fields):
+{schema}
+
+Operations:
+- add_node: a new unique id and its label; `after` is the id to insert it after (default: at the end)
+- update_node: id and the new label{time_hint}
+- remove_node: id (its edges are removed with it)
+- add_edge, update_edge, remove_edge: source and target ids; label for add_edge and update_edge
+{type_hints}
+Guidelines:
+- Reference existing nodes by id. Change only what the instruction asks for; never restate unchanged nodes or edges.
+- To insert a step between A and B: remove_edge A→B, add_node, then add_edge A→new and add_edge new→B.
+- To change diagram-level settings, add "meta": {{"direction": "LR"}} or {{"title": "..."}} next to "ops".
+- Output only the JSON object, with double-quoted keys and strings.
+
+Example:
+Diagram: {{"type": "flowchart", "meta": {{}}, "data": {{"nodes": [{{"id": "draft", "label": "Draft"}}, {{"id": "publish", "label": "Publish"}}], "edges": [{{"source": "draft", "target": "publish"}}]}}}}
+Instruction: add a review step between Draft and Publish
+Output: {{"ops": [{{"op": "remove_edge", "source": "draft", "target": "publish"}}, {{"op": "add_node", "id": "review", "label": "Review", "after": "draft"}}, {{"op": "add_edge", "source": "draft", "target": "review"}}, {{"op": "add_edge", "source": "review", "target": "publish"}}]}}
+
+Diagram: {diagram}
+Instruction: {instruction}
+Output:
+"""
+
+EDIT_TYPE_HINTS = {
+    "flowchart": "",
+    "timeline": "- Nodes are the timeline's events: add_node and update_node also take `time`; there are no edges.\n",
+    "mind_map": "- Nodes are the mind map's children; link each new child from its parent (\"root\" for the root) with add_edge.\n",
+}
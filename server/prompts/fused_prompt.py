@@ -0,0 +1,30 @@
+"""
+Prompt for single-call ("fused") generation: user text → diagram IR in one round-trip.
+Built from the visual-structure and IR prompt guidelines so the stages stay in sync.
+"""
+
+from server.prompts.ir_generation_prompt import IR_GENERATION_GUIDELINES
+from server.prompts.visual_structure_prompt import VISUAL_STRUCTURE_GUIDELINES
+
+FUSED_GENERATION_PROMPT = (
+    """
+You are an expert diagram generator. Given the user's request, do all of the following in one step:
+1. Decide the user's intent and choose the diagram type from {diagram_types}.
+2. Extract the structure (nodes, edges, events, or topics) that best tells the story.
+3. Output the final diagram IR as valid JSON matching this Pydantic schema:
+{format_instructions}
+
+Structure """
+    + VISUAL_STRUCTURE_GUIDELINES
+    + """
+IR """
+    + IR_GENERATION_GUIDELINES
+    + """
+Few-shot example:
+User request: Water is heated until it boils.
+Output: {{"type": "flowchart", "meta": {{}}, "data": {{"nodes": [{{"id": "heat", "label": "Heat water"}}, {{"id": "boil", "label": "Water boils"}}], "edges": [{{"source": "heat", "target": "boil"}}]}}}}
+
+User request: {user_text}
+Output:
+"""
+)
@@ -2,16 +2,22 @@
 Prompt for IR (diagram) generation from structured visual representation, with format instructions placeholder.
 """
 
-IR_GENERATION_PROMPT = """
-You are a diagram IR generator. Given a structured visual representation, output a valid JSON IR matching this Pydantic schema:
-{format_instructions}
-
-Guidelines:
+# Shared with the fused single-call prompt (fused_prompt.py)
+IR_GENERATION_GUIDELINES = """Guidelines:
 - Ensure the output matches the schema exactly.
 - Use clear, descriptive labels for nodes, edges, and events.
 - If any required field is missing, use an empty list or null as appropriate.
 - Follow best practices for clarity, minimalism, and accessibility.
+"""
 
+IR_GENERATION_PROMPT = (
+    """
+You are a diagram IR generator. Given a structured visual representation, output a valid JSON IR matching this Pydantic schema:
+{format_instructions}
+
+"""
+    + IR_GENERATION_GUIDELINES
+    + """
 Few-shot example:
 Input: {{'type': 'flowchart', 'meta': {{}}, 'data': {{'nodes': [{{'id': 'A', 'label': 'Start'}}, {{'id': 'B', 'label': 'End'}}], 'edges': [{{'source': 'A', 'target': 'B'}}]}}}}
 Output: {{'type': 'flowchart', 'meta': {{}}, 'data': {{'nodes': [{{'id': 'A', 'label': 'Start'}}, {{'id': 'B', 'label': 'End'}}], 'edges': [{{'source': 'A', 'target': 'B'}}]}}}}
@@ -19,3 +25,38 @@ Output: {{'type': 'flowchart', 'meta': {{}}, 'data': {{'nodes': [{{'id': 'A', 'l
 Input: {visual_structure}
 Output:
 """
+)
+
+# Type-specific variant used once the intent stage has picked the diagram type;
+# {schema} is the compact shape from schemas/compact.py instead of the full
+# Diagram JSON Schema, so the prompt is shorter and says exactly what to emit.
+TYPED_IR_GENERATION_PROMPT = (
+    """
+You are a diagram IR generator. Given a structured visual representation, output a valid JSON IR for a {diagram_type} diagram with exactly this shape ("?" marks optional fields):
+{schema}
+{type_hints}
+"""
+    + IR_GENERATION_GUIDELINES
+    + """- Output only the JSON object, with double-quoted keys and strings.
+
+Example output:
+{example}
+
+Input: {visual_structure}
+Output:
+"""
+)
+
+IR_TYPE_HINTS = {
+    "flowchart": "- Every edge source/target must be the id of a node; put branch conditions in the edge label.",
+    "timeline": "- One event per point in time, in chronological order; `time` is the date or period as text.",
+    "mind_map": "- `children` holds every non-root node; each edge links a parent id (\"root\" for the root) to a child id.",
+    "table": "- Every row has exactly one cell per header, all cells as strings.",
+}
+
+IR_TYPE_EXAMPLES = {
+    "flowchart": '{"type": "flowchart", "meta": {}, "data": {"nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "End"}], "edges": [{"source": "A", "target": "B"}]}}',
+    "timeline": '{"type": "timeline", "meta": {}, "data": {"events": [{"id": "e1", "label": "WWI begins", "time": "1914"}, {"id": "e2", "label": "WWI ends", "time": "1918"}]}}',
+    "mind_map": '{"type": "mind_map", "meta": {}, "data": {"root": {"id": "root", "label": "ML"}, "children": [{"id": "sl", "label": "Supervised"}], "edges": [{"source": "root", "target": "sl"}]}}',
+    "table": '{"type": "table", "meta": {}, "data": {"headers": ["Language", "Typing"], "rows": [["Python", "Dynamic"], ["Go", "Static"]]}}',
+}
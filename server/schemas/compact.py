@@ -0,0 +1,67 @@
+"""
+Compact, type-specific schemas for the IR prompts.
+
+`PydanticOutputParser(Diagram).get_format_instructions()` emits the full JSON
+Schema of `Diagram`, whose `data: Dict[str, Any]` tells the model nothing about
+the shape it must produce. Once the diagram type is known, `compact_ir_schema`
+renders just that type's data model as a short TypeScript-like signature, e.g.
+
+    {"nodes": [{"id": string, "label": string, "description"?: string}], ...}
+
+Free-form `props` dicts are omitted; "?" marks optional fields.
+"""
+
+import functools
+import typing
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+from server.schemas.diagram import TYPE_DATA_MODELS
+
+# Per-type `meta` keys the renderer understands
+TYPE_META = {
+    "flowchart": '{"direction"?: "TD" | "LR"}',
+    "timeline": '{"title"?: string}',
+    "mind_map": "{}",
+    "table": "{}",
+}
+
+_PRIMITIVES = {str: "string", int: "number", float: "number", bool: "boolean"}
+
+
+def _is_free_form(annotation: Any) -> bool:
+    return typing.get_origin(annotation) is dict or annotation is Any
+
+
+def _compact(annotation: Any) -> str:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return " | ".join(_compact(a) for a in args if a is not type(None))
+    if origin is list:
+        return f"[{_compact(args[0])}]"
+    if origin is typing.Literal:
+        return " | ".join(f'"{a}"' for a in args)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return compact_schema(annotation)
+    return _PRIMITIVES.get(annotation, "any")
+
+
+@functools.lru_cache(maxsize=None)
+def compact_schema(model: Type[BaseModel]) -> str:
+    fields = []
+    for name, field in model.model_fields.items():
+        if _is_free_form(field.annotation) and not field.is_required():
+            continue
+        optional = "" if field.is_required() else "?"
+        fields.append(f'"{name}"{optional}: {_compact(field.annotation)}')
+    return "{" + ", ".join(fields) + "}"
+
+
+def compact_ir_schema(diagram_type: str) -> str:
+    """Full IR shape for one diagram type."""
+    return (
+        f'{{"type": "{diagram_type}", "meta": {TYPE_META[diagram_type]}, '
+        f'"data": {compact_schema(TYPE_DATA_MODELS[diagram_type])}}}'
+    )
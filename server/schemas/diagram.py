@@ -1,5 +1,5 @@
-from typing import List, Optional, Literal, Dict, Any
-from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, Dict, Any, Type
+from pydantic import BaseModel, Field, PrivateAttr
 
 DiagramType = Literal["flowchart", "timeline", "mind_map", "table"]
 
@@ -43,7 +43,37 @@ class MindMapData(BaseModel):
     edges: List[Edge]
 
 
+class TableData(BaseModel):
+    headers: List[str]
+    rows: List[List[str]]
+
+
+TYPE_DATA_MODELS: Dict[str, Type[BaseModel]] = {
+    "flowchart": GraphData,
+    "timeline": TimelineData,
+    "mind_map": MindMapData,
+    "table": TableData,
+}
+
+
 class Diagram(BaseModel):
     type: DiagramType
     data: Dict[str, Any]
     meta: Dict[str, Any] = Field(default_factory=dict)
+    # Typed view of `data`, parsed once (by the validator or on first use)
+    _typed: Optional[BaseModel] = PrivateAttr(default=None)
+    # What services/repair.py fixed, if the diagram went through it
+    _repairs: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+
+    def typed_data(self) -> BaseModel:
+        """`data` as GraphData / TimelineData / MindMapData / TableData.
+
+        Cached: mutate `data` only before the first call (or reset `_typed`).
+        """
+        if self._typed is None:
+            self._typed = TYPE_DATA_MODELS[self.type].model_validate(self.data)
+        return self._typed
+
+    @property
+    def repairs(self) -> List[Dict[str, Any]]:
+        return self._repairs
@@ -0,0 +1,81 @@
+"""
+Pydantic schemas for per-request pipeline options and the result of `Workflow.generate`.
+"""
+
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
+
+from server.config.variables import (
+    ALLOWED_MODEL_IDS,
+    DEFAULT_GENERATION_MODE,
+    ESCALATION_ENABLED,
+    PARTITION_MAX_CLUSTER_SIZE,
+    PARTITION_MODE,
+    SPECULATIVE_STRUCTURE_ENABLED,
+    STAGE_MODELS,
+)
+from server.schemas.diagram import Diagram
+
+GenerationMode = Literal["pipeline", "fused"]
+PartitionMode = Literal["off", "subgraphs", "pages"]
+
+
+class GenerationOptions(BaseModel):
+    # "fused" asks for the IR in one call and falls back to "pipeline" on failure
+    mode: GenerationMode = DEFAULT_GENERATION_MODE
+    # Per-stage model overrides, e.g. {"ir": "<model id>"}; unset stages use STAGE_MODELS
+    models: Dict[str, str] = Field(default_factory=dict)
+    # Retry a stage on ESCALATION_MODEL_ID when its output fails to parse/validate
+    escalate: bool = ESCALATION_ENABLED
+    # Oversized flowcharts: group into subgraphs, or split into overview + pages
+    partition: PartitionMode = PARTITION_MODE
+    max_cluster_size: int = Field(default=PARTITION_MAX_CLUSTER_SIZE, ge=2)
+    # Pipeline: run structure extraction concurrently with intent classification
+    speculative: bool = SPECULATIVE_STRUCTURE_ENABLED
+    # Semantic cache: minimum similarity to reuse a near-duplicate's result
+    # (default SEMANTIC_CACHE_THRESHOLD; 1 turns it off). Not part of the cache key.
+    semantic_threshold: Optional[float] = Field(default=None, ge=0, le=1)
+
+    @field_validator("models")
+    @classmethod
+    def _check_models(cls, models: Dict[str, str]) -> Dict[str, str]:
+        for stage, model_id in models.items():
+            if stage not in STAGE_MODELS:
+                raise ValueError(f"Unknown stage '{stage}'; expected one of {list(STAGE_MODELS)}")
+            if model_id not in ALLOWED_MODEL_IDS:
+                raise ValueError(f"Model '{model_id}' is not allowed for stage '{stage}'")
+        return models
+
+    def stage_models(self) -> Dict[str, str]:
+        """Model id per stage after applying this request's overrides."""
+        return {**STAGE_MODELS, **self.models}
+
+
+class DiagramPage(BaseModel):
+    """Detail diagram of one community when `partition` is "pages"."""
+
+    id: str
+    title: str
+    mermaid: str
+
+
+class GenerationResult(BaseModel):
+    # With `partition="pages"`, the overview; the details are in `pages`
+    mermaid: str
+    diagram: Optional[Diagram] = None
+    cached: bool = False
+    cache_id: Optional[str] = None
+    meta: Dict[str, Any] = Field(default_factory=dict)
+    pages: List[DiagramPage] = Field(default_factory=list)
+
+
+class BatchItemResult(BaseModel):
+    """One entry of `Workflow.run_many`; exactly one of mermaid / error is set."""
+
+    index: int
+    mermaid: Optional[str] = None
+    cached: bool = False
+    cache_id: Optional[str] = None
+    error: Optional[str] = None
+    meta: Dict[str, Any] = Field(default_factory=dict)
+    pages: List[DiagramPage] = Field(default_factory=list)
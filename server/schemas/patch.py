@@ -0,0 +1,30 @@
+"""
+Pydantic schema for incremental edits: a small list of operations applied to an
+existing diagram IR by services/patcher.py, instead of regenerating it.
+"""
+
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+PatchOpName = Literal[
+    "add_node", "update_node", "remove_node", "add_edge", "update_edge", "remove_edge"
+]
+
+
+class PatchOp(BaseModel):
+    op: PatchOpName
+    # Nodes (timeline events, mind map children): id, new label / time, and for
+    # add_node the id of the node to insert after (default: at the end)
+    id: Optional[str] = None
+    label: Optional[str] = None
+    time: Optional[str] = None
+    after: Optional[str] = None
+    # Edges are identified by their endpoints
+    source: Optional[str] = None
+    target: Optional[str] = None
+
+
+class DiagramPatch(BaseModel):
+    ops: List[PatchOp] = Field(default_factory=list)
+    # Keys to set in the diagram's meta, e.g. {"direction": "LR"} or {"title": "..."}
+    meta: Dict[str, Any] = Field(default_factory=dict)
@@ -0,0 +1,221 @@
+"""
+cache.py
+
+Content-addressed cache for pipeline results.
+
+- Memory tier: bounded LRU with TTL, per process.
+- Disk tier: SQLite (WAL) file under CACHE_DIR, survives restarts and is shared
+  by every uvicorn worker on the host.
+
+Keys are SHA-256 digests built with `make_key`, so callers decide what goes into
+the key (normalized text, model id, prompt version, options ...).
+"""
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Iterator, Optional
+
+from server.config.variables import (
+    CACHE_DIR,
+    CACHE_DISK_TTL_SECONDS,
+    CACHE_ENABLED,
+    CACHE_MEMORY_MAX_ENTRIES,
+    CACHE_MEMORY_TTL_SECONDS,
+)
+from server.utils.logger import get_logger
+from server.utils.metrics import CACHE_REQUESTS
+
+logger = get_logger(os.path.basename(__file__))
+
+# Everything rendered into a prompt: the templates, and the schemas behind the
+# compact IR schemas and the output parsers' format instructions
+PROMPT_SOURCE_DIRS = tuple(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), name)
+    for name in ("prompts", "schemas")
+)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize user text so trivially different inputs share a cache entry."""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+def make_key(*parts: Any) -> str:
+    """Stable SHA-256 key over arbitrary JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def prompt_version() -> str:
+    """Hash of every prompt and schema module; changes whenever a prompt, or a
+    schema rendered into one, is edited."""
+    digest = hashlib.sha256()
+    for directory in PROMPT_SOURCE_DIRS:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    digest.update(os.path.basename(directory).encode("utf-8"))
+                    digest.update(name.encode("utf-8"))
+                    digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def prompt_hash(prompt: Any) -> str:
+    """Hash of a single stage prompt, including its partial variables."""
+    template = getattr(prompt, "template", prompt)
+    partials = getattr(prompt, "partial_variables", {}) or {}
+    return make_key(template, {k: str(v) for k, v in partials.items()})[:16]
+
+
+class UnknownCacheIdError(LookupError):
+    """A request referenced a cache id that holds no result (never stored, or expired)."""
+
+
+class ResultCache:
+    """Two-tier (memory LRU + SQLite) cache for JSON-serializable values."""
+
+    def __init__(
+        self,
+        namespace: str = "result",
+        path: Optional[str] = None,
+        max_entries: int = CACHE_MEMORY_MAX_ENTRIES,
+        memory_ttl: float = CACHE_MEMORY_TTL_SECONDS,
+        disk_ttl: float = CACHE_DISK_TTL_SECONDS,
+        enabled: bool = CACHE_ENABLED,
+    ):
+        self.namespace = namespace
+        self.path = path or os.path.join(CACHE_DIR, "results.sqlite3")
+        self.max_entries = max_entries
+        self.memory_ttl = memory_ttl
+        self.disk_ttl = disk_ttl
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " namespace TEXT NOT NULL,"
+                    " key TEXT NOT NULL,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps this safe across
+        # threads and processes; WAL lets readers proceed during writes.
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # -- memory tier ---------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (time.time() + self.memory_ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # -- public API ----------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None. Disk hits are promoted to memory."""
+        if not self.enabled:
+            return None
+        value = self._memory_get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(self.namespace, "memory_hit").inc()
+            return value
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE namespace=? AND key=?",
+                    (self.namespace, key),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Cache read failed (%s): %s", self.namespace, e)
+            CACHE_REQUESTS.labels(self.namespace, "error").inc()
+            return None
+        if row is None or row[1] < time.time():
+            CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+            return None
+        CACHE_REQUESTS.labels(self.namespace, "disk_hit").inc()
+        value = json.loads(row[0])
+        self._memory_set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._memory_set(key, value)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (
+                        self.namespace,
+                        key,
+                        json.dumps(value, ensure_ascii=False),
+                        time.time() + self.disk_ttl,
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Cache write failed (%s): %s", self.namespace, e)
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Drop one key, or the whole namespace when key is None.
+
+        Other workers may serve their in-memory copy for up to `memory_ttl`.
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+        with self._connect() as conn:
+            if key is None:
+                cur = conn.execute(
+                    "DELETE FROM entries WHERE namespace=?", (self.namespace,)
+                )
+            else:
+                cur = conn.execute(
+                    "DELETE FROM entries WHERE namespace=? AND key=?",
+                    (self.namespace, key),
+                )
+        logger.info(
+            "Invalidated %d cache entries (%s)", cur.rowcount, key or self.namespace
+        )
+        return cur.rowcount
@@ -0,0 +1,158 @@
+"""
+cassette.py
+
+Record/replay layer for Bedrock responses.
+
+- record: every call goes to Bedrock and the prompt/response pair is written to
+  the cassette store.
+- replay: responses are served from the store with no network access at all.
+  Misses are handled per BEDROCK_CASSETTE_ON_MISS: "error" raises, "passthrough"
+  calls Bedrock (and records the answer), "synthetic" returns a schema-valid
+  response from services/fake_llm.py.
+
+Entries are keyed by sha256(model_id + fully rendered prompt) and stored one JSON
+file per key, written atomically, so concurrent workers can record safely.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from server.config.variables import (
+    BEDROCK_CASSETTE_DIR,
+    BEDROCK_CASSETTE_MODE,
+    BEDROCK_CASSETTE_ON_MISS,
+)
+from server.utils.logger import get_logger
+
+logger = get_logger(os.path.basename(__file__))
+
+
+class CassetteMissError(LookupError):
+    """Replay mode found no recorded response and misses are configured to error."""
+
+
+def render_prompt(messages: List[BaseMessage]) -> str:
+    return "\n".join(f"{m.type}: {m.content}" for m in messages)
+
+
+def cassette_key(model_id: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_id}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """Directory of `<key[:2]>/<key>.json` records."""
+
+    def __init__(self, directory: str = BEDROCK_CASSETTE_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class CassetteChatModel(BaseChatModel):
+    """Wraps a chat model (created lazily by `inner_factory`) with record/replay."""
+
+    model_id: str
+    mode: str = BEDROCK_CASSETTE_MODE
+    on_miss: str = BEDROCK_CASSETTE_ON_MISS
+    store: Any = None
+    inner_factory: Optional[Callable[[], Any]] = None
+    inner: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _store(self) -> CassetteStore:
+        if self.store is None:
+            self.store = CassetteStore()
+        return self.store
+
+    def _inner(self):
+        # Built on first real call so pure replay never creates a Bedrock client
+        if self.inner is None:
+            self.inner = self.inner_factory()
+        return self.inner
+
+    def _lookup(self, messages: List[BaseMessage]):
+        prompt = render_prompt(messages)
+        key = cassette_key(self.model_id, prompt)
+        record = self._store().get(key) if self.mode == "replay" else None
+        return prompt, key, record
+
+    def _save(self, key: str, prompt: str, message: AIMessage) -> None:
+        self._store().put(
+            key,
+            {
+                "model_id": self.model_id,
+                "prompt": prompt,
+                "content": message.content,
+                "usage_metadata": getattr(message, "usage_metadata", None),
+                "recorded_at": time.time(),
+            },
+        )
+
+    def _miss(self, key: str, prompt: str) -> Optional[AIMessage]:
+        """Replay miss handling; None means "call the real model"."""
+        if self.on_miss == "passthrough":
+            logger.info("Cassette miss for %s (%s), calling Bedrock", self.model_id, key)
+            return None
+        if self.on_miss == "synthetic":
+            from server.services.fake_llm import synthetic_response
+
+            return AIMessage(content=synthetic_response(prompt))
+        raise CassetteMissError(f"No cassette entry for {self.model_id} ({key})")
+
+    @staticmethod
+    def _replayed(record: Dict[str, Any]) -> AIMessage:
+        return AIMessage(
+            content=record["content"], usage_metadata=record.get("usage_metadata")
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt, key, record = self._lookup(messages)
+        if record is not None:
+            message = self._replayed(record)
+        else:
+            message = self._miss(key, prompt) if self.mode == "replay" else None
+            if message is None:
+                message = self._inner().invoke(messages, stop=stop, **kwargs)
+                self._save(key, prompt, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        prompt, key, record = await asyncio.to_thread(self._lookup, messages)
+        if record is not None:
+            message = self._replayed(record)
+        else:
+            message = self._miss(key, prompt) if self.mode == "replay" else None
+            if message is None:
+                message = await self._inner().ainvoke(messages, stop=stop, **kwargs)
+                await asyncio.to_thread(self._save, key, prompt, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,310 @@
+"""
+fake_llm.py
+
+Deterministic stand-in for Bedrock chat models, used by the offline benchmarks
+(server/benchmarks) and anywhere a pipeline must run without network access.
+
+`FakeChatModel` plugs in where `BedrockModel.llm` is used. For each prompt it
+returns, in order of preference:
+1. a recorded response from `responses` (keyed by `prompt_key(prompt)`), or
+2. a synthetic but schema-valid response built from the prompt itself
+   (`synthetic_response`), so every stage of the pipeline gets parseable output.
+
+Latency is simulated per stage (seconds), with optional seeded jitter, plus a
+random slow tail (`tail_rate` of calls take `tail_factor` times longer, drawn
+per call, so a retried or hedged call can be fast). With
+`max_concurrency`, calls beyond that many in flight fail like a throttled
+Bedrock call (`FakeThrottlingError`), to exercise services/resilience.py.
+Like ChatBedrock, the sync path blocks its thread for the whole latency, and
+ModelRouter runs it on an executor thread that cancellation can't stop.
+"""
+
+import ast
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Guards the call counters: calls arrive on executor threads
+_counter_lock = threading.Lock()
+
+# Prompt signatures used to tell the pipeline stages apart
+STAGE_MARKERS = {
+    "intent": "diagram/visual intent extraction",
+    "structure": "diagram structure extractor",
+    "ir": "diagram IR generator",
+    "fused": "expert diagram generator",
+    "edit": "diagram patch generator",
+}
+
+_SENTENCE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_YEAR = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+
+
+def detect_stage(prompt: str) -> str:
+    for stage, marker in STAGE_MARKERS.items():
+        if marker in prompt:
+            return stage
+    return "unknown"
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with Claude-family tokenizers
+    return max(1, len(text) // 4)
+
+
+def _between(prompt: str, start: str, end: str) -> str:
+    i = prompt.rfind(start)
+    if i < 0:
+        return ""
+    i += len(start)
+    j = prompt.find(end, i)
+    return prompt[i : j if j >= 0 else len(prompt)].strip()
+
+
+def _structure_from_text(text: str, diagram_type: str) -> Dict[str, Any]:
+    sentences = [s.strip() for s in _SENTENCE.split(text) if s.strip()] or [text]
+    labels = [s[:60] for s in sentences]
+    if diagram_type == "timeline":
+        events = []
+        for i, label in enumerate(labels):
+            year = _YEAR.search(label)
+            events.append(
+                {"id": f"e{i}", "label": label, "time": year.group(0) if year else str(i + 1)}
+            )
+        return {"type": "timeline", "events": events}
+    if diagram_type == "mind_map":
+        children = [{"id": f"c{i}", "label": label} for i, label in enumerate(labels[1:])]
+        return {
+            "type": "mind_map",
+            "root": {"id": "root", "label": labels[0]},
+            "children": children,
+            "edges": [{"source": "root", "target": c["id"]} for c in children],
+        }
+    if diagram_type == "table":
+        return {
+            "type": "table",
+            "headers": ["#", "Item"],
+            "rows": [[str(i + 1), label] for i, label in enumerate(labels)],
+        }
+    nodes = [{"id": f"n{i}", "label": label} for i, label in enumerate(labels)]
+    edges = [
+        {"source": f"n{i}", "target": f"n{i + 1}"} for i in range(len(nodes) - 1)
+    ]
+    return {"type": "flowchart", "nodes": nodes, "edges": edges}
+
+
+def _ir_from_structure(structure: Dict[str, Any]) -> Dict[str, Any]:
+    structure = dict(structure)
+    diagram_type = structure.pop("type", "flowchart")
+    return {"type": diagram_type, "meta": {}, "data": structure}
+
+
+def synthetic_response(prompt: str) -> str:
+    """Schema-valid output for any pipeline stage, derived from the prompt only."""
+    from server.agents.local_intent_agent import LocalIntentClassifier
+
+    stage = detect_stage(prompt)
+    if stage in ("intent", "structure", "fused"):
+        if stage == "intent":
+            text = _between(prompt, "User: ", "\nOutput:")
+        elif stage == "structure":
+            text = _between(prompt, "User request: ", "\nIntent fields:")
+        else:
+            text = _between(prompt, "User request: ", "\nOutput:")
+        intent = LocalIntentClassifier().classify(text)
+        if stage == "intent":
+            return intent.model_dump_json()
+        structure = _structure_from_text(text, intent.diagram_type)
+        if stage == "structure":
+            return json.dumps(structure)
+        return json.dumps(_ir_from_structure(structure))
+    if stage == "ir":
+        raw = _between(prompt, "Input: ", "\nOutput:")
+        try:
+            structure = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            structure = json.loads(raw) if raw.startswith("{") else {}
+        return json.dumps(_ir_from_structure(structure))
+    if stage == "edit":
+        return json.dumps(_patch_from_prompt(prompt))
+    return "{}"
+
+
+_RENAME = re.compile(r"rename (.+?) to (.+)", re.IGNORECASE)
+
+
+def _patch_from_prompt(prompt: str) -> Dict[str, Any]:
+    """Patch for "rename X to Y", otherwise a new node appended after the last one."""
+    instruction = _between(prompt, "Instruction: ", "\nOutput:")
+    try:
+        diagram = json.loads(_between(prompt, "Diagram: ", "\nInstruction:"))
+    except ValueError:
+        diagram = {}
+    data = diagram.get("data") or {}
+    nodes = data.get("nodes") or data.get("children") or data.get("events") or []
+    rename = _RENAME.match(instruction)
+    if rename:
+        return {"ops": [{"op": "update_node", "id": rename.group(1), "label": rename.group(2)}]}
+    ops: List[Dict[str, Any]] = [
+        {"op": "add_node", "id": "edit_1", "label": instruction[:60], "time": "later"}
+    ]
+    if nodes and diagram.get("type") != "timeline":
+        ops.append({"op": "add_edge", "source": nodes[-1]["id"], "target": "edit_1"})
+    return {"ops": ops}
+
+
+class FakeThrottlingError(Exception):
+    """Shaped like botocore's ClientError for a ThrottlingException."""
+
+    def __init__(self, model_id: str):
+        super().__init__(f"ThrottlingException: too many concurrent calls to {model_id}")
+        self.response = {
+            "Error": {"Code": "ThrottlingException", "Message": "Too many requests"},
+            "ResponseMetadata": {"HTTPStatusCode": 429},
+        }
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that replays recorded or synthetic responses with simulated latency."""
+
+    model_id: str = "fake"
+    latency: Union[float, Dict[str, float]] = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+    responses: Dict[str, str] = {}
+    stream_chunk_chars: int = 16
+    tail_rate: float = 0.0
+    tail_factor: float = 10.0
+    max_concurrency: int = 0
+    calls: int = 0
+    throttled: int = 0
+    in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _prompt(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _delay(self, prompt: str) -> float:
+        if isinstance(self.latency, dict):
+            base = self.latency.get(detect_stage(prompt), 0.0)
+        else:
+            base = self.latency
+        if self.tail_rate and random.random() < self.tail_rate:
+            base *= self.tail_factor
+        if not self.jitter:
+            return base
+        rng = random.Random(f"{self.seed}:{prompt_key(prompt)}")
+        return max(0.0, base * (1 + rng.uniform(-self.jitter, self.jitter)))
+
+    def _respond(self, prompt: str) -> AIMessage:
+        with _counter_lock:
+            self.calls += 1
+        content = self.responses.get(prompt_key(prompt)) or synthetic_response(prompt)
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _enter(self) -> None:
+        with _counter_lock:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.throttled += 1
+                raise FakeThrottlingError(self.model_id)
+            self.in_flight += 1
+
+    def _exit(self) -> None:
+        with _counter_lock:
+            self.in_flight -= 1
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = self._prompt(messages)
+        self._enter()
+        try:
+            time.sleep(self._delay(prompt))
+        finally:
+            self._exit()
+        return ChatResult(generations=[ChatGeneration(message=self._respond(prompt))])
+
+    async def _agenerate(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        prompt = self._prompt(messages)
+        self._enter()
+        try:
+            await asyncio.sleep(self._delay(prompt))
+        finally:
+            self._exit()
+        return ChatResult(generations=[ChatGeneration(message=self._respond(prompt))])
+
+    def _chunks(self, content: str) -> List[str]:
+        n = max(1, self.stream_chunk_chars)
+        return [content[i : i + n] for i in range(0, len(content), n)]
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt(messages)
+        message = self._respond(prompt)
+        chunks = self._chunks(message.content)
+        delay = self._delay(prompt) / max(1, len(chunks))
+        for chunk in chunks:
+            time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = self._prompt(messages)
+        message = self._respond(prompt)
+        chunks = self._chunks(message.content)
+        delay = self._delay(prompt) / max(1, len(chunks))
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+def fake_model_factory(
+    latency: Union[float, Dict[str, float]] = 0.0,
+    jitter: float = 0.0,
+    responses: Optional[Dict[str, str]] = None,
+    max_concurrency: int = 0,
+    tail_rate: float = 0.0,
+    tail_factor: float = 10.0,
+):
+    """Factory for `set_model_factory` that builds BedrockModels backed by FakeChatModel."""
+    from server.services.model_bedrock import BedrockModel
+
+    def factory(model_id: str, region: Optional[str] = None, **kwargs) -> BedrockModel:
+        llm = FakeChatModel(
+            model_id=model_id,
+            latency=latency,
+            jitter=jitter,
+            responses=responses or {},
+            max_concurrency=max_concurrency,
+            tail_rate=tail_rate,
+            tail_factor=tail_factor,
+        )
+        return BedrockModel.from_llm(model_id, llm, region=region)
+
+    return factory
@@ -0,0 +1,214 @@
+"""
+hedging.py
+
+Hedged LLM calls, to cut the tail that one slow Bedrock response adds to a
+request ("The Tail at Scale"): when a call has not returned after the
+`HEDGE_PERCENTILE` of its recent latency, a duplicate is sent and whichever
+answers first wins.
+
+The loser is not stopped. Bedrock calls run on executor threads
+(services/resilience.py), and cancelling only stops waiting for one. The losing
+call runs to completion, is billed, and holds its pool connection and limiter
+slot until it returns. Every hedge is therefore a full extra call, and hedges are
+capped at `HEDGE_MAX_RATE` of the recent calls.
+
+- Latency is tracked per (stage, model) over the last `HEDGE_WINDOW` calls, as
+  the time since the original call started (for a call the hedge beat, a lower
+  bound), so winning hedges don't drag the threshold down; no
+  hedging until `HEDGE_MIN_SAMPLES` are in, and never earlier than
+  `HEDGE_MIN_DELAY_SECONDS`. Hedging at p95 costs roughly 5% extra calls.
+- The duplicate goes to `HEDGE_MODEL_ID` / `HEDGE_REGION` when set, else to the
+  same model. Both calls go through services/resilience.py. No hedge is sent
+  while the target's limiter already has calls queued, since it would only add
+  to the throttling. No hedge is sent past the `HEDGE_MAX_RATE` budget either
+  (result "skipped").
+- A failed call doesn't decide the race while the other is still running.
+
+Used by ModelRouter.ainvoke for the stages in `HEDGE_STAGES` when
+`HEDGE_ENABLED`. Per stage: t2v_hedge_calls_total{stage, result} (unhedged,
+skipped, primary_won, hedge_won) and t2v_hedge_delay_seconds{stage}; /stats has
+the hedge and win rates.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from server.config.variables import (
+    HEDGE_ENABLED,
+    HEDGE_MAX_RATE,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGE_STAGES,
+    HEDGE_WINDOW,
+)
+from server.utils.logger import get_logger
+from server.utils.metrics import HEDGE_CALLS, HEDGE_DELAY_SECONDS
+
+logger = get_logger(os.path.basename(__file__))
+
+T = TypeVar("T")
+
+RESULTS = ("unhedged", "skipped", "primary_won", "hedge_won")
+
+
+class LatencyTracker:
+    """Sliding window of call latencies with a percentile over it."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class Hedger:
+    """Hedging policy and counters for one (stage, model)."""
+
+    def __init__(
+        self,
+        stage: str,
+        percentile: float = HEDGE_PERCENTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+        window: int = HEDGE_WINDOW,
+        max_rate: float = HEDGE_MAX_RATE,
+    ):
+        self.stage = stage
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker(window)
+        self.max_rate = max_rate
+        # Whether each of the last `window` calls was hedged: the budget
+        self._hedged: deque = deque(maxlen=window)
+        self.counts: Dict[str, int] = dict.fromkeys(RESULTS, 0)
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """How long to wait before hedging (None: not enough samples yet)."""
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self.counts[result] += 1
+            self._hedged.append(result in ("primary_won", "hedge_won"))
+        HEDGE_CALLS.labels(self.stage, result).inc()
+
+    def within_budget(self) -> bool:
+        """Whether one more hedge keeps them under `max_rate` of recent calls."""
+        with self._lock:
+            return sum(self._hedged) + 1 <= self.max_rate * max(len(self._hedged), 1)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        can_hedge: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """Result of `primary()`, or of `hedge()` if that one answers first.
+
+        The loser's task is cancelled; the Bedrock call behind it is not.
+        """
+        delay = self.delay()
+        start = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        tasks = [first]
+        try:
+            if delay is None:
+                result = await first
+                self.latency.record(time.monotonic() - start)
+                self._count("unhedged")
+                return result
+            HEDGE_DELAY_SECONDS.labels(self.stage).set(delay)
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                result = first.result()
+                self.latency.record(time.monotonic() - start)
+                self._count("unhedged")
+                return result
+            if not self.within_budget() or not can_hedge():
+                result = await first
+                self.latency.record(time.monotonic() - start)
+                self._count("skipped")
+                return result
+            logger.info("Hedging %s call after %.2fs", self.stage, delay)
+            second = asyncio.ensure_future(hedge())
+            tasks.append(second)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        # The other call may still succeed
+                        error = error or (
+                            asyncio.CancelledError() if task.cancelled() else task.exception()
+                        )
+                        continue
+                    self.latency.record(time.monotonic() - start)
+                    self._count("hedge_won" if task is second else "primary_won")
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # the loser's error, if any, is moot
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        hedged = counts["primary_won"] + counts["hedge_won"]
+        delay = self.delay()
+        return {
+            **counts,
+            "calls": total,
+            "hedge_rate": hedged / total if total else 0.0,
+            "hedge_win_rate": counts["hedge_won"] / hedged if hedged else 0.0,
+            "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+        }
+
+
+_hedgers: Dict[Tuple[str, str], Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def hedger_for(stage: str, model_id: str) -> Optional[Hedger]:
+    """The stage's hedger for `model_id`, or None when it isn't hedged."""
+    if not HEDGE_ENABLED or stage not in HEDGE_STAGES:
+        return None
+    key = (stage, model_id)
+    hedger = _hedgers.get(key)
+    if hedger is None:
+        with _hedgers_lock:
+            hedger = _hedgers.setdefault(key, Hedger(stage))
+    return hedger
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """Per "stage model" counters and rates, for /stats."""
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {f"{stage} {model_id}": h.snapshot() for (stage, model_id), h in hedgers.items()}
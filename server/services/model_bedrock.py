@@ -8,36 +8,160 @@ It is designed to be imported and used by other backend components for text-to-I
 
 - Keeps all Bedrock/model logic isolated from API and workflow code.
 - Follows modular, extensible design for future model support.
+- `get_bedrock_model` hands out one shared, thread-safe client per
+  (model_id, region, kwargs), so agents share a single connection pool.
+- Calls go through services/resilience.py (limits, retries, circuit breaker);
+  botocore's own retries are capped by BEDROCK_SDK_MAX_ATTEMPTS.
 """
 
-from langchain_aws import BedrockLLM, ChatBedrock
-from langchain_core.language_models.llms import LLM
+import asyncio
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
 import os
-from server.config.variables import MODEL_ID
+from server.config.variables import (
+    BEDROCK_CASSETTE_MODE,
+    BEDROCK_CONNECT_TIMEOUT,
+    BEDROCK_MAX_POOL_CONNECTIONS,
+    BEDROCK_READ_TIMEOUT,
+    BEDROCK_SDK_MAX_ATTEMPTS,
+    MODEL_ID,
+)
+from server.services import resilience
 
 logger = get_logger(os.path.basename(__file__))
 
 
+@functools.lru_cache(maxsize=1)
+def boto_config():
+    """Large pool + TCP keep-alive: concurrent requests reuse warm TLS connections
+    instead of opening new ones (botocore's default pool is only 10)."""
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+        read_timeout=BEDROCK_READ_TIMEOUT,
+        retries={"mode": "standard", "total_max_attempts": BEDROCK_SDK_MAX_ATTEMPTS},
+    )
+
+
 class BedrockModel:
     """Wrapper for AWS Bedrock LLMs via LangChain. Uses ChatBedrock for chat models, BedrockLLM for legacy models."""
 
-    def __init__(self, model_id: str, region: str = "us-east-1", **kwargs):
+    def __init__(self, model_id: str, region: Optional[str] = None, **kwargs):
         self.model_id = model_id
         self.region = region or os.environ.get("AWS_REGION", "us-east-1")
-        # Use ChatBedrock for Claude 3/Opus, BedrockLLM for legacy
-        if any(x in model_id for x in ["claude-3", "opus", "sonnet", "haiku"]):
-            self.llm = ChatBedrock(model=model_id, region=self.region, **kwargs)
+        kwargs.setdefault("config", boto_config())
+        if BEDROCK_CASSETTE_MODE == "off":
+            self.llm = self._create_llm(kwargs)
         else:
-            self.llm = BedrockLLM(model=model_id, region=self.region, **kwargs)
+            from server.services.cassette import CassetteChatModel
+
+            logger.info("Bedrock cassette mode '%s' for %s", BEDROCK_CASSETTE_MODE, model_id)
+            self.llm = CassetteChatModel(
+                model_id=model_id, inner_factory=lambda: self._create_llm(kwargs)
+            )
+
+    def _create_llm(self, kwargs: dict):
+        # Imported here so importing this module (e.g. from the API) stays cheap
+        from langchain_aws import BedrockLLM, ChatBedrock
+
+        # Use ChatBedrock for Claude 3/Opus, BedrockLLM for legacy
+        if any(x in self.model_id for x in ["claude-3", "opus", "sonnet", "haiku"]):
+            return ChatBedrock(model=self.model_id, region=self.region, **kwargs)
+        return BedrockLLM(model=self.model_id, region=self.region, **kwargs)
+
+    @classmethod
+    def from_llm(cls, model_id: str, llm, region: Optional[str] = None) -> "BedrockModel":
+        """Wrap an existing LangChain model (e.g. services/fake_llm.FakeChatModel)."""
+        model = cls.__new__(cls)
+        model.model_id = model_id
+        model.region = region or os.environ.get("AWS_REGION", "us-east-1")
+        model.llm = llm
+        return model
+
+    def for_stage(self, stage: str):
+        """The LLM with a callback counting calls and tokens under `stage`."""
+        from server.utils.token_usage import TokenUsageCallback
+
+        return self.llm.with_config(callbacks=[TokenUsageCallback(stage, self.model_id)])
 
     def generate(self, prompt: str, **kwargs) -> str:
         """Generate a response from the Bedrock model."""
-        result = self.llm.invoke(prompt, **kwargs)
+        result = resilience.call(self.model_id, lambda: self.llm.invoke(prompt, **kwargs))
+        return result.content
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Async variant of `generate`; the call runs on the default executor."""
+        result = await resilience.acall(self.model_id, lambda: self.llm.invoke(prompt, **kwargs))
         return result.content
 
 
+_registry: Dict[Tuple[str, str, str], BedrockModel] = {}
+_registry_lock = threading.Lock()
+_model_factory: Callable[..., BedrockModel] = BedrockModel
+
+
+def set_model_factory(factory: Optional[Callable[..., BedrockModel]] = None) -> None:
+    """Swap how registry models are built (None restores Bedrock) and clear the registry.
+
+    Used by the offline benchmarks to plug in services/fake_llm.py.
+    """
+    global _model_factory
+    with _registry_lock:
+        _model_factory = factory or BedrockModel
+        _registry.clear()
+
+
+def get_bedrock_model(
+    model_id: str = MODEL_ID, region: Optional[str] = None, **kwargs
+) -> BedrockModel:
+    """Process-wide shared BedrockModel for (model_id, region, kwargs).
+
+    boto3 clients are thread-safe, and LangChain's async path runs them on the
+    event loop's executor, so one instance serves every agent, thread and task.
+    """
+    region = region or os.environ.get("AWS_REGION", "us-east-1")
+    key = (model_id, region, json.dumps(kwargs, sort_keys=True, default=repr))
+    model = _registry.get(key)
+    if model is None:
+        with _registry_lock:
+            model = _registry.get(key)
+            if model is None:
+                logger.info("Creating shared Bedrock client: %s (%s)", model_id, region)
+                model = _model_factory(model_id=model_id, region=region, **kwargs)
+                _registry[key] = model
+    return model
+
+
+def registered_models() -> List[BedrockModel]:
+    """Every shared model created so far (e.g. to read fake call counts)."""
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def configure_executor(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """Size the loop's default executor to the HTTP pool.
+
+    ChatBedrock has no native async client; `ainvoke` runs the boto call on the
+    default executor, whose stock size (min(32, cpu + 4)) would otherwise cap
+    in-flight Bedrock calls well below the connection pool.
+    """
+    loop = loop or asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=BEDROCK_MAX_POOL_CONNECTIONS, thread_name_prefix="bedrock"
+        )
+    )
+
+
 # Example usage (for testing only, not run on import)
 if __name__ == "__main__":
-    model = BedrockModel(model_id=MODEL_ID)
+    model = get_bedrock_model(model_id=MODEL_ID)
     prompt = "Summarize the following text: LangChain is a framework for developing applications powered by language models."
     logger.info(model.generate(prompt))
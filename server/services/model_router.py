@@ -0,0 +1,96 @@
+"""
+model_router.py
+
+Per-call model selection for the agents' chains.
+
+`ModelRouter(stage, default_model_id)` is the LLM step of a `prompt | llm | parser`
+chain. Each call runs on the shared registry model named by
+`config["configurable"]["model_id"]` (see `model_config`), or on the stage
+default, so a chain is built once and serves every model a request may route to.
+Calls, streams and token metrics all go through `BedrockModel.for_stage`, and
+every call and stream through the model's guard in services/resilience.py.
+`ainvoke` runs the model's blocking `invoke` on the default executor through
+`resilience.acall` (ChatBedrock's own `ainvoke` does the same, out of sight of
+the limiter).
+`ainvoke` is hedged for the stages in `HEDGE_STAGES` (services/hedging.py); the
+sync and streaming paths are not.
+"""
+
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from server.config.variables import HEDGE_MODEL_ID, HEDGE_REGION
+from server.services import hedging, resilience
+from server.services.model_bedrock import BedrockModel, get_bedrock_model
+
+
+def model_config(model_id: Optional[str]) -> Optional[RunnableConfig]:
+    """Runnable config routing a chain call to `model_id` (None keeps the default)."""
+    return {"configurable": {"model_id": model_id}} if model_id else None
+
+
+class ModelRouter(Runnable):
+
+    def __init__(self, stage: str, default_model_id: str):
+        self.stage = stage
+        self.default_model_id = default_model_id
+        self._bound: Dict[Tuple[str, Optional[str]], Tuple[BedrockModel, Runnable]] = {}
+        self._lock = threading.Lock()
+
+    def model_id(self, config: Optional[RunnableConfig]) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        return configurable.get("model_id") or self.default_model_id
+
+    def llm(self, model_id: str, region: Optional[str] = None) -> Runnable:
+        model = get_bedrock_model(model_id=model_id, region=region)
+        bound = self._bound.get((model_id, region))
+        # The registry can be swapped (set_model_factory); rebind when it is
+        if bound is None or bound[0] is not model:
+            with self._lock:
+                bound = (model, model.for_stage(self.stage))
+                self._bound[(model_id, region)] = bound
+        return bound[1]
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs):
+        model_id = self.model_id(config)
+        llm = self.llm(model_id)
+        return resilience.call(model_id, lambda: llm.invoke(input, config, **kwargs))
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ):
+        model_id = self.model_id(config)
+        llm = self.llm(model_id)
+        hedger = hedging.hedger_for(self.stage, model_id)
+        if hedger is None:
+            return await resilience.acall(model_id, lambda: llm.invoke(input, config, **kwargs))
+        backup_id = HEDGE_MODEL_ID or model_id
+        backup = self.llm(backup_id, HEDGE_REGION or None)
+        # The backup region gets its own limiter and breaker
+        backup_guard = f"{backup_id}@{HEDGE_REGION}" if HEDGE_REGION else backup_id
+        return await hedger.run(
+            lambda: resilience.acall(model_id, lambda: llm.invoke(input, config, **kwargs)),
+            lambda: resilience.acall(
+                backup_guard, lambda: backup.invoke(input, config, **kwargs)
+            ),
+            can_hedge=lambda: resilience.has_capacity(backup_guard),
+        )
+
+    def stream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Iterator[Any]:
+        model_id = self.model_id(config)
+        llm = self.llm(model_id)
+        yield from resilience.stream(model_id, lambda: llm.stream(input, config, **kwargs))
+
+    async def astream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AsyncIterator[Any]:
+        model_id = self.model_id(config)
+        llm = self.llm(model_id)
+        async for chunk in resilience.astream(
+            model_id, lambda: llm.astream(input, config, **kwargs)
+        ):
+            yield chunk
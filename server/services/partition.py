@@ -0,0 +1,226 @@
+"""
+partition.py
+
+Splits oversized flowcharts so the browser never has to lay out hundreds of
+nodes at once. Optional stage between `validate` and `to_mermaid`.
+
+1. Community detection: size-capped label propagation on the undirected,
+   edge-weighted graph (seeded, so the same graph always partitions the same way).
+2. Clean-up: small communities merge into their most-connected neighbour while
+   that stays under the cap; unconnected leftovers are packed together.
+3. Output, per `GenerationOptions.partition`:
+   - "subgraphs": one diagram, communities drawn as Mermaid `subgraph` blocks
+     (meta["clusters"], rendered by tools/mermaid.py)
+   - "pages": an overview diagram (one node per community, edges weighted by the
+     number of links between them) plus one detail diagram per community, with
+     stub nodes pointing at the communities it links to.
+
+Graphs with at most `max_cluster_size` nodes are returned unchanged.
+"""
+
+import os
+import random
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from server.config.variables import PARTITION_MAX_ITERATIONS
+from server.schemas.diagram import Diagram, GraphData
+from server.utils.logger import get_logger
+
+logger = get_logger(os.path.basename(__file__))
+
+Adjacency = Dict[str, Dict[str, int]]
+
+
+def _adjacency(graph: GraphData) -> Adjacency:
+    adj: Adjacency = {n.id: {} for n in graph.nodes}
+    for e in graph.edges:
+        if e.source == e.target or e.source not in adj or e.target not in adj:
+            continue
+        adj[e.source][e.target] = adj[e.source].get(e.target, 0) + 1
+        adj[e.target][e.source] = adj[e.target].get(e.source, 0) + 1
+    return adj
+
+
+def label_propagation(
+    adj: Adjacency,
+    max_size: int,
+    max_iterations: int = PARTITION_MAX_ITERATIONS,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Community label per node; no community grows beyond `max_size`.
+
+    Nodes are visited in a seeded random order and take the most frequent label
+    among their neighbours (ties broken by the same seeded generator), keeping
+    their own label whenever it is already among the most frequent. Stops when
+    a full pass changes nothing.
+    """
+    rng = random.Random(seed)
+    order = list(adj)
+    labels = {node: i for i, node in enumerate(order)}
+    sizes = defaultdict(int, {i: 1 for i in range(len(order))})
+    for _ in range(max_iterations):
+        rng.shuffle(order)
+        changed = 0
+        for node in order:
+            neighbours = adj[node]
+            if not neighbours:
+                continue
+            current = labels[node]
+            scores: Dict[int, int] = defaultdict(int)
+            for other, weight in neighbours.items():
+                label = labels[other]
+                if label == current or sizes[label] < max_size:
+                    scores[label] += weight
+            if not scores:
+                continue
+            top = max(scores.values())
+            if scores.get(current, 0) == top:
+                continue
+            best = rng.choice(sorted(l for l, score in scores.items() if score == top))
+            sizes[current] -= 1
+            sizes[best] += 1
+            labels[node] = best
+            changed += 1
+        if not changed:
+            break
+    return labels
+
+
+def _merge_small(
+    adj: Adjacency, labels: Dict[str, int], max_size: int
+) -> List[List[str]]:
+    members: Dict[int, List[str]] = defaultdict(list)
+    for node in adj:
+        members[labels[node]].append(node)
+    min_size = max(2, max_size // 2)
+    for label in sorted(members, key=lambda l: len(members[l])):
+        group = members.get(label)
+        if not group or len(group) >= min_size:
+            continue
+        links: Dict[int, int] = defaultdict(int)
+        for node in group:
+            for other, weight in adj[node].items():
+                if labels[other] != label:
+                    links[labels[other]] += weight
+        for target in sorted(links, key=lambda l: (-links[l], l)):
+            if len(members[target]) + len(group) <= max_size:
+                for node in group:
+                    labels[node] = target
+                members[target].extend(group)
+                del members[label]
+                break
+    # Pack what is still small and unconnected (e.g. isolated nodes) together
+    clusters, pool = [], []
+    for label, group in members.items():
+        if len(group) < min_size and not any(
+            labels[o] != label for n in group for o in adj[n]
+        ):
+            pool.extend(group)
+        else:
+            clusters.append(group)
+    for i in range(0, len(pool), max_size):
+        clusters.append(pool[i : i + max_size])
+    return clusters
+
+
+def partition_graph(graph: GraphData, max_cluster_size: int) -> List[List[str]]:
+    """Node ids per community, communities ordered by their first node."""
+    adj = _adjacency(graph)
+    labels = label_propagation(adj, max_cluster_size)
+    clusters = _merge_small(adj, labels, max_cluster_size)
+    position = {n.id: i for i, n in enumerate(graph.nodes)}
+    for group in clusters:
+        group.sort(key=position.__getitem__)
+    clusters.sort(key=lambda group: position[group[0]])
+    return clusters
+
+
+def _cluster_meta(graph: GraphData, clusters: List[List[str]]) -> List[Dict]:
+    degree = defaultdict(int)
+    for e in graph.edges:
+        degree[e.source] += 1
+        degree[e.target] += 1
+    labels = {n.id: n.label for n in graph.nodes}
+    meta = []
+    for i, group in enumerate(clusters):
+        hub = max(group, key=lambda node: (degree[node], -group.index(node)))
+        meta.append({"id": f"cluster_{i}", "label": labels[hub], "nodes": group})
+    return meta
+
+
+def cluster_diagram(diagram: Diagram, max_cluster_size: int) -> Diagram:
+    """Same diagram with meta["clusters"] for `subgraph` rendering."""
+    graph = diagram.typed_data()
+    if len(graph.nodes) <= max_cluster_size:
+        return diagram
+    clusters = _cluster_meta(graph, partition_graph(graph, max_cluster_size))
+    logger.info("Clustered %d nodes into %d subgraphs", len(graph.nodes), len(clusters))
+    clustered = diagram.model_copy(update={"meta": {**diagram.meta, "clusters": clusters}})
+    clustered._typed = graph
+    return clustered
+
+
+def paginate_diagram(
+    diagram: Diagram, max_cluster_size: int
+) -> Tuple[Diagram, List[Diagram]]:
+    """(overview, detail pages); a small diagram comes back as (diagram, [])."""
+    graph = diagram.typed_data()
+    if len(graph.nodes) <= max_cluster_size:
+        return diagram, []
+    clusters = _cluster_meta(graph, partition_graph(graph, max_cluster_size))
+    cluster_of = {node: c["id"] for c in clusters for node in c["nodes"]}
+    titles = {c["id"]: c["label"] for c in clusters}
+    nodes_by_id = {n.id: n for n in graph.nodes}
+
+    links: Dict[Tuple[str, str], int] = defaultdict(int)
+    internal: Dict[str, list] = defaultdict(list)
+    # Per page, edges to/from stub nodes standing in for the other pages
+    boundary: Dict[str, Dict[Tuple[str, str], None]] = defaultdict(dict)
+    linked: Dict[str, Dict[str, None]] = defaultdict(dict)
+    for e in graph.edges:
+        src, tgt = cluster_of.get(e.source), cluster_of.get(e.target)
+        if src is None or tgt is None:
+            continue
+        if src == tgt:
+            internal[src].append(e.model_dump(exclude_defaults=True))
+            continue
+        links[(src, tgt)] += 1
+        boundary[src][(e.source, f"page_{tgt}")] = None
+        boundary[tgt][(f"page_{src}", e.target)] = None
+        linked[src][tgt] = linked[tgt][src] = None
+
+    direction = diagram.meta.get("direction", "TD")
+    overview = Diagram(
+        type="flowchart",
+        data={
+            "nodes": [
+                {"id": c["id"], "label": f'{c["label"]} ({len(c["nodes"])} nodes)'}
+                for c in clusters
+            ],
+            "edges": [
+                {"source": s, "target": t, **({"label": f"{n} links"} if n > 1 else {})}
+                for (s, t), n in links.items()
+            ],
+        },
+        meta={"direction": direction, "pages": [c["id"] for c in clusters]},
+    )
+
+    pages = []
+    for c in clusters:
+        nodes = [nodes_by_id[n].model_dump(exclude_defaults=True) for n in c["nodes"]]
+        nodes += [
+            {"id": f"page_{other}", "label": f"→ {titles[other]}"} for other in linked[c["id"]]
+        ]
+        edges = internal[c["id"]] + [
+            {"source": source, "target": target} for source, target in boundary[c["id"]]
+        ]
+        pages.append(
+            Diagram(
+                type="flowchart",
+                data={"nodes": nodes, "edges": edges},
+                meta={"direction": direction, "page": c["id"], "title": c["label"]},
+            )
+        )
+    logger.info("Paginated %d nodes into %d pages", len(graph.nodes), len(pages))
+    return overview, pages
@@ -0,0 +1,169 @@
+"""
+patcher.py
+
+Applies a `DiagramPatch` (schemas/patch.py) to a validated diagram, locally.
+The edit agent only produces the patch, so output tokens scale with the size of
+the edit, not of the diagram; the result goes back through `validate` (and
+therefore services/repair.py) before rendering.
+
+- flowchart: nodes and edges
+- mind_map: the root (label only) and its children, plus edges
+- timeline: events (`time` applies), no edges
+- table: not supported
+
+Node references may use the id or the label (the model sometimes echoes the
+label); an update or removal naming a node that doesn't exist raises ValueError.
+Added edges may name unknown nodes: repair remaps or creates them.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.schemas.diagram import Diagram
+from server.schemas.patch import DiagramPatch, PatchOp
+from server.utils.logger import get_logger
+
+logger = get_logger(os.path.basename(__file__))
+
+# Where each editable type keeps its nodes
+_NODE_FIELDS = {"flowchart": "nodes", "mind_map": "children", "timeline": "events"}
+
+
+def _norm(label: Any) -> str:
+    return " ".join(str(label).split()).lower()
+
+
+class _Graph:
+    """Mutable copy of a diagram's nodes and edges, with id/label lookup."""
+
+    def __init__(self, diagram: Diagram):
+        self.type = diagram.type
+        data = diagram.model_dump()["data"]
+        self.data = data
+        self.nodes: List[Dict[str, Any]] = list(data.get(_NODE_FIELDS[self.type]) or [])
+        self.edges: List[Dict[str, Any]] = list(data.get("edges") or [])
+        self.root: Optional[Dict[str, Any]] = data.get("root")
+
+    def resolve(self, ref: Optional[str]) -> Optional[str]:
+        if not ref:
+            return None
+        ids = {n["id"] for n in self.nodes}
+        if self.root is not None:
+            ids |= {self.root["id"], "root"}
+        if ref in ids:
+            return ref
+        wanted = _norm(ref)
+        for n in ([self.root] if self.root else []) + self.nodes:
+            if _norm(n["label"]) == wanted:
+                return n["id"]
+        return None
+
+    def node(self, ref: Optional[str], op: PatchOp) -> Dict[str, Any]:
+        node_id = self.resolve(ref)
+        if node_id is None:
+            raise ValueError(f"{op.op}: unknown node '{ref}'")
+        if self.root is not None and node_id in (self.root["id"], "root"):
+            return self.root
+        return next(n for n in self.nodes if n["id"] == node_id)
+
+    def matching_edges(self, op: PatchOp) -> List[int]:
+        source, target = self.resolve(op.source), self.resolve(op.target)
+        found = [
+            i
+            for i, e in enumerate(self.edges)
+            if e["source"] == source and e["target"] == target
+        ]
+        if not found:
+            raise ValueError(f"{op.op}: no edge {op.source} -> {op.target}")
+        return found
+
+    def result(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        self.data[_NODE_FIELDS[self.type]] = self.nodes
+        if self.type != "timeline":
+            self.data["edges"] = self.edges
+        if self.root is not None:
+            self.data["root"] = self.root
+        return {"type": self.type, "data": self.data, "meta": meta}
+
+
+def _add_node(g: _Graph, op: PatchOp) -> str:
+    taken = {n["id"] for n in g.nodes} | ({g.root["id"]} if g.root else set())
+    if op.id in taken:
+        _update_node(g, op)
+        return f"add_node {op.id}: exists, updated instead"
+    node = {"id": op.id, "label": op.label or op.id}
+    if g.type == "timeline":
+        node["time"] = op.time
+    after = g.resolve(op.after)
+    index = next((i + 1 for i, n in enumerate(g.nodes) if n["id"] == after), len(g.nodes))
+    g.nodes.insert(index, node)
+    return f"add_node {op.id}"
+
+
+def _update_node(g: _Graph, op: PatchOp) -> str:
+    node = g.node(op.id, op)
+    if op.label is not None:
+        node["label"] = op.label
+    if op.time is not None and g.type == "timeline":
+        node["time"] = op.time
+    return f"update_node {node['id']}"
+
+
+def _remove_node(g: _Graph, op: PatchOp) -> str:
+    node = g.node(op.id, op)
+    if node is g.root:
+        raise ValueError("remove_node: the mind map root can't be removed")
+    g.nodes = [n for n in g.nodes if n["id"] != node["id"]]
+    before = len(g.edges)
+    g.edges = [e for e in g.edges if node["id"] not in (e["source"], e["target"])]
+    return f"remove_node {node['id']} (+{before - len(g.edges)} edges)"
+
+
+def _add_edge(g: _Graph, op: PatchOp) -> str:
+    if not op.source or not op.target:
+        raise ValueError("add_edge: source and target are required")
+    source = g.resolve(op.source) or op.source
+    target = g.resolve(op.target) or op.target
+    edge = {"source": source, "target": target}
+    if op.label:
+        edge["label"] = op.label
+    g.edges.append(edge)
+    return f"add_edge {source} -> {target}"
+
+
+def _update_edge(g: _Graph, op: PatchOp) -> str:
+    for i in g.matching_edges(op):
+        g.edges[i] = {**g.edges[i], "label": op.label}
+    return f"update_edge {op.source} -> {op.target}"
+
+
+def _remove_edge(g: _Graph, op: PatchOp) -> str:
+    drop = set(g.matching_edges(op))
+    g.edges = [e for i, e in enumerate(g.edges) if i not in drop]
+    return f"remove_edge {op.source} -> {op.target}"
+
+
+_OPS = {
+    "add_node": _add_node,
+    "update_node": _update_node,
+    "remove_node": _remove_node,
+    "add_edge": _add_edge,
+    "update_edge": _update_edge,
+    "remove_edge": _remove_edge,
+}
+
+
+def apply_patch(diagram: Diagram, patch: DiagramPatch) -> Tuple[Dict[str, Any], List[str]]:
+    """Patched IR dict (to be re-validated) and a line per applied operation."""
+    if diagram.type not in _NODE_FIELDS:
+        raise ValueError(f"Editing {diagram.type} diagrams is not supported")
+    g = _Graph(diagram)
+    applied = []
+    for op in patch.ops:
+        if op.op.endswith("_edge") and g.type == "timeline":
+            raise ValueError(f"{op.op}: timelines have no edges")
+        if op.op.endswith("_node") and not op.id:
+            raise ValueError(f"{op.op}: id is required")
+        applied.append(_OPS[op.op](g, op))
+    logger.info("Applied patch: %s", applied)
+    return g.result({**(diagram.meta or {}), **patch.meta}), applied
@@ -0,0 +1,255 @@
+"""
+repair.py
+
+Deterministic local repair of LLM-produced diagram IR, run by the validator
+before parsing so that common defects cost microseconds instead of a new LLM
+round-trip:
+
+- unknown or missing `type`: inferred from the data keys; fields emitted next to
+  `type` instead of under `data` are moved into `data`
+- flowchart / mind_map: edges without source or target are dropped, nodes get
+  missing ids/labels, duplicate node ids are renamed, dangling edge endpoints are
+  remapped to the node with that label or else created as a node
+- mind_map: missing root id, `nodes` used instead of `children`
+- timeline: missing event ids/labels/times, non-string times
+- table: missing headers, rows shorter or longer than the headers, non-string cells
+
+`repair_ir` returns the repaired dict and a report: one {"fix", "detail"} entry
+per change. Anything it can't fix is left for the typed parse to reject.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.schemas.diagram import TYPE_DATA_MODELS
+from server.utils.logger import get_logger
+
+logger = get_logger(os.path.basename(__file__))
+
+Report = List[Dict[str, Any]]
+
+_NON_ID = re.compile(r"[^0-9a-zA-Z_]+")
+
+
+def _plain(item: Any) -> Any:
+    return item.model_dump() if hasattr(item, "model_dump") else item
+
+
+def _fix(report: Report, fix: str, detail: str) -> None:
+    report.append({"fix": fix, "detail": detail})
+
+
+def _norm(label: Any) -> str:
+    return " ".join(str(label).split()).lower()
+
+
+def _unique(base: str, taken: set) -> str:
+    candidate, n = base, 2
+    while candidate in taken:
+        candidate, n = f"{base}_{n}", n + 1
+    return candidate
+
+
+def infer_type(data: Dict[str, Any]) -> Optional[str]:
+    """Diagram type implied by which keys `data` has."""
+    if "events" in data:
+        return "timeline"
+    if "headers" in data or "rows" in data:
+        return "table"
+    if "root" in data:
+        return "mind_map"
+    if "nodes" in data or "edges" in data:
+        return "flowchart"
+    return None
+
+
+def _repair_nodes(nodes: List[Any], report: Report, taken: set) -> List[Dict[str, Any]]:
+    repaired = []
+    for idx, node in enumerate(nodes):
+        node = _plain(node)
+        # Fast path: well-formed nodes are kept as they are, without copying
+        if isinstance(node, dict):
+            node_id = node.get("id")
+            if isinstance(node_id, str) and node_id and node.get("label") and node_id not in taken:
+                taken.add(node_id)
+                repaired.append(node)
+                continue
+            node = dict(node)
+        else:
+            node = {"label": str(node)}
+        if not node.get("id"):
+            base = _NON_ID.sub("_", str(node.get("label") or "")).strip("_")[:40]
+            node["id"] = _unique(base or f"n{idx}", taken)
+            _fix(report, "missing_node_id", f"node {idx} -> {node['id']}")
+        node["id"] = str(node["id"])
+        if node["id"] in taken:
+            new_id = _unique(node["id"], taken)
+            _fix(report, "duplicate_node_id", f"{node['id']} -> {new_id}")
+            node["id"] = new_id
+        if not node.get("label"):
+            node["label"] = node["id"]
+            _fix(report, "missing_node_label", node["id"])
+        taken.add(node["id"])
+        repaired.append(node)
+    return repaired
+
+
+def _repair_edges(
+    edges: List[Any],
+    nodes: List[Dict[str, Any]],
+    report: Report,
+    aliases: Tuple[str, ...] = (),
+) -> List[Dict[str, Any]]:
+    """Drop incomplete edges; remap or create nodes for dangling endpoints."""
+    ids = {n["id"] for n in nodes} | set(aliases)
+    by_label = None
+    repaired = []
+    for idx, edge in enumerate(edges):
+        edge = _plain(edge)
+        if not isinstance(edge, dict) or not edge.get("source") or not edge.get("target"):
+            _fix(report, "dropped_edge", f"edge {idx} missing source or target: {edge}")
+            continue
+        if edge["source"] in ids and edge["target"] in ids:
+            repaired.append(edge)
+            continue
+        if by_label is None:
+            # Only built once some edge actually dangles
+            by_label = {}
+            for n in nodes:
+                by_label.setdefault(_norm(n["label"]), n["id"])
+        edge = dict(edge)
+        for end in ("source", "target"):
+            ref = str(edge[end])
+            if ref in ids:
+                edge[end] = ref
+                continue
+            match = by_label.get(_norm(ref))
+            if match is not None:
+                _fix(report, "remapped_endpoint", f"edge {idx} {end} '{ref}' -> {match}")
+                edge[end] = match
+                continue
+            node_id = _unique(_NON_ID.sub("_", ref).strip("_") or f"n{len(ids)}", ids)
+            nodes.append({"id": node_id, "label": ref})
+            ids.add(node_id)
+            by_label[_norm(ref)] = node_id
+            _fix(report, "created_node", f"edge {idx} {end} '{ref}' -> new node {node_id}")
+            edge[end] = node_id
+        repaired.append(edge)
+    return repaired
+
+
+def _repair_flowchart(data: Dict[str, Any], report: Report) -> None:
+    nodes = _repair_nodes(data.get("nodes") or [], report, set())
+    data["edges"] = _repair_edges(data.get("edges") or [], nodes, report)
+    data["nodes"] = nodes
+
+
+def _repair_mind_map(data: Dict[str, Any], report: Report) -> None:
+    root = _plain(data.get("root")) or {}
+    if isinstance(root, str):
+        root = {"label": root}
+    root = dict(root)
+    if not root.get("id"):
+        root["id"] = "root"
+        _fix(report, "missing_root_id", "root")
+    if not root.get("label"):
+        root["label"] = root["id"]
+        _fix(report, "missing_node_label", root["id"])
+    if "children" not in data and "nodes" in data:
+        data["children"] = data.pop("nodes")
+        _fix(report, "renamed_field", "nodes -> children")
+    members = [root] + _repair_nodes(data.get("children") or [], report, {root["id"]})
+    # Edges may name the root as "root" whatever its id (the renderer relies on
+    # it); nodes created for dangling endpoints are appended to `members`
+    data["edges"] = _repair_edges(
+        data.get("edges") or [], members, report, aliases=("root",)
+    )
+    data["root"] = root
+    data["children"] = members[1:]
+
+
+def _repair_timeline(data: Dict[str, Any], report: Report) -> None:
+    events, taken = [], set()
+    for idx, event in enumerate(data.get("events") or []):
+        event = _plain(event)
+        if not isinstance(event, dict):
+            event = {"label": str(event)}
+        event = dict(event)
+        if event.get("time") is None or event.get("time") == "":
+            event["time"] = str(idx + 1)
+            _fix(report, "missing_event_time", f"event {idx} -> {event['time']}")
+        elif not isinstance(event["time"], str):
+            event["time"] = str(event["time"])
+        if not event.get("id"):
+            event["id"] = f"e{idx}"
+            _fix(report, "missing_event_id", f"event {idx} -> {event['id']}")
+        event["id"] = str(event["id"])
+        if event["id"] in taken:
+            new_id = _unique(event["id"], taken)
+            _fix(report, "duplicate_event_id", f"{event['id']} -> {new_id}")
+            event["id"] = new_id
+        taken.add(event["id"])
+        if not event.get("label"):
+            event["label"] = event["id"]
+            _fix(report, "missing_event_label", event["id"])
+        events.append(event)
+    data["events"] = events
+
+
+def _cell(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _repair_table(data: Dict[str, Any], report: Report) -> None:
+    rows = [r if isinstance(r, list) else [r] for r in data.get("rows") or []]
+    headers = [_cell(h) for h in data.get("headers") or []]
+    width = max([len(headers)] + [len(r) for r in rows])
+    if len(headers) < width:
+        missing = width - len(headers)
+        headers += [f"Column {len(headers) + i + 1}" for i in range(missing)]
+        _fix(report, "added_headers", f"{missing} header(s) for wider rows")
+    repaired = []
+    for idx, row in enumerate(rows):
+        if len(row) < width:
+            _fix(report, "padded_row", f"row {idx}: {len(row)} -> {width} cells")
+            row = row + [""] * (width - len(row))
+        repaired.append([_cell(c) for c in row])
+    data["headers"] = headers
+    data["rows"] = repaired
+
+
+_REPAIRERS = {
+    "flowchart": _repair_flowchart,
+    "mind_map": _repair_mind_map,
+    "timeline": _repair_timeline,
+    "table": _repair_table,
+}
+
+
+def repair_ir(ir: Dict[str, Any]) -> Tuple[Dict[str, Any], Report]:
+    """Repaired copy of a raw IR dict, plus what was fixed."""
+    report: Report = []
+    ir = dict(_plain(ir))
+    data = ir.get("data")
+    if not isinstance(data, dict):
+        # Data fields emitted next to "type" instead of under "data"
+        data = {k: v for k, v in ir.items() if k not in ("type", "meta", "data")}
+        if data:
+            _fix(report, "moved_data", f"{sorted(data)} -> data")
+        ir = {k: v for k, v in ir.items() if k in ("type", "meta")}
+    data = dict(data)
+    diagram_type = ir.get("type")
+    if diagram_type not in TYPE_DATA_MODELS:
+        inferred = infer_type(data)
+        if inferred is not None:
+            _fix(report, "inferred_type", f"{diagram_type!r} -> {inferred}")
+            diagram_type = inferred
+    if diagram_type in _REPAIRERS:
+        _REPAIRERS[diagram_type](data, report)
+    ir["type"] = diagram_type
+    ir["data"] = data
+    ir["meta"] = ir.get("meta") or {}
+    if report:
+        logger.warning("Repaired IR (%d fixes): %s", len(report), report)
+    return ir, report
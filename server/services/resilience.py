@@ -0,0 +1,603 @@
+"""
+resilience.py
+
+Shared guard around every Bedrock call (ModelRouter, BedrockModel.generate), so
+throttling under peak load slows us down instead of failing requests:
+
+- Adaptive concurrency (AIMD), per model: the limit grows by one per window of
+  successful calls and halves on throttling, at most once per round trip (a
+  burst of throttles is one signal). Calls over the limit queue; a full queue
+  is refused with `BedrockThrottled` (429).
+- Retries with exponential backoff and full jitter on throttling, 5xx and
+  connection/read timeouts, never past the request deadline: a contextvar set
+  by `deadline()` that tasks and threads started inside inherit.
+- Circuit breaker, per model: after `BREAKER_FAILURE_THRESHOLD` consecutive
+  failures (5xx, timeouts, or calls that ran out of retries; a throttled attempt
+  is the limiter's business) it opens and sheds calls at once with `CircuitOpen` (503) for
+  `BREAKER_RESET_SECONDS`, then lets a single probe through (half-open).
+
+Every refusal is a `BedrockUnavailable` carrying an HTTP status and a
+Retry-After; the API answers with those instead of a 500. Errors that are not
+transient (bad requests, rejected output) pass through untouched, without retry.
+Streams are retried until their first chunk only; the slot is held until they end.
+
+ChatBedrock has no native async client, so `acall` runs the blocking call on the
+loop's default executor itself. The limiter slot belongs to that call, not to its
+caller: when the caller times out or is cancelled, the thread (and its HTTP
+request) keeps going, and the slot is freed only when it returns. `in_flight`
+therefore counts live Bedrock calls.
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+
+from server.config.variables import (
+    BEDROCK_CONCURRENCY_INITIAL,
+    BEDROCK_CONCURRENCY_MAX,
+    BEDROCK_CONCURRENCY_MIN,
+    BEDROCK_MAX_QUEUE,
+    BEDROCK_RETRY_ATTEMPTS,
+    BEDROCK_RETRY_BASE_SECONDS,
+    BEDROCK_RETRY_MAX_SECONDS,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    RESILIENCE_ENABLED,
+)
+from server.utils.logger import get_logger
+from server.utils.metrics import (
+    BEDROCK_CONCURRENCY_LIMIT,
+    BEDROCK_RETRIES,
+    BEDROCK_SHED,
+    BREAKER_STATE,
+)
+
+logger = get_logger(os.path.basename(__file__))
+
+T = TypeVar("T")
+
+# botocore error codes (response["Error"]["Code"])
+THROTTLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+}
+TRANSIENT_CODES = {
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "InternalServerException",
+}
+TRANSIENT_ERROR_NAMES = {
+    "ReadTimeoutError",
+    "ConnectTimeoutError",
+    "EndpointConnectionError",
+    "ConnectionClosedError",
+}
+
+
+class BedrockUnavailable(Exception):
+    """A Bedrock call refused or given up on; maps to `status_code` + Retry-After."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = max(0.0, retry_after)
+
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class BedrockThrottled(BedrockUnavailable):
+    status_code = 429
+
+
+class CircuitOpen(BedrockUnavailable):
+    pass
+
+
+class DeadlineExceeded(BedrockUnavailable):
+    pass
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("bedrock_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Bound the Bedrock calls made inside to `seconds` from now (nested ones only tighten)."""
+    if not seconds:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None without one)."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """"throttle", "transient" or None (not worth retrying), following the cause chain."""
+    seen = 0
+    while error is not None and seen < 5:
+        response = getattr(error, "response", None)
+        if isinstance(response, dict):
+            code = (response.get("Error") or {}).get("Code")
+            status = (response.get("ResponseMetadata") or {}).get("HTTPStatusCode")
+            if code in THROTTLE_CODES or status == 429:
+                return "throttle"
+            if code in TRANSIENT_CODES or status in (500, 502, 503, 504):
+                return "transient"
+        if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+            return "transient"
+        if any(code in str(error) for code in THROTTLE_CODES):
+            return "throttle"
+        error = error.__cause__ or error.__context__
+        seen += 1
+    return None
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry `attempt` (0-based)."""
+    cap = min(BEDROCK_RETRY_MAX_SECONDS, BEDROCK_RETRY_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, cap)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "event", "granted")
+
+    def __init__(self, loop=None, future=None, event=None):
+        self.loop = loop
+        self.future = future
+        self.event = event
+        self.granted = False
+
+
+def _grant(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit shared by the sync and async callers of one model."""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = BEDROCK_CONCURRENCY_INITIAL,
+        minimum: int = BEDROCK_CONCURRENCY_MIN,
+        maximum: int = BEDROCK_CONCURRENCY_MAX,
+        max_queue: int = BEDROCK_MAX_QUEUE,
+        decrease: float = 0.5,
+    ):
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.max_queue = max_queue
+        self.decrease = decrease
+        self.in_flight = 0
+        # Smoothed duration of successful calls: the AIMD round trip
+        self.rtt = 1.0
+        self._last_decrease = 0.0
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+        self._gauge = BEDROCK_CONCURRENCY_LIMIT.labels(name)
+        self._gauge.set(self.limit)
+
+    def _enqueue(self, waiter: _Waiter) -> bool:
+        """Take a slot now (True) or queue `waiter`; the lock must be held."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            BEDROCK_SHED.labels(self.name, "queue_full").inc()
+            raise BedrockThrottled(
+                f"Too many requests queued for {self.name}; try again shortly.",
+                retry_after=BEDROCK_RETRY_BASE_SECONDS * 4,
+            )
+        self._waiters.append(waiter)
+        return False
+
+    def _wake(self) -> None:
+        """Hand free slots to queued callers, oldest first; the lock must be held."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            if waiter.event is not None:
+                waiter.event.set()
+                continue
+            try:
+                waiter.loop.call_soon_threadsafe(_grant, waiter.future)
+            except RuntimeError:
+                # Its event loop has been closed: nobody will take the slot
+                self.in_flight -= 1
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+
+    def _timed_out(self) -> DeadlineExceeded:
+        BEDROCK_SHED.labels(self.name, "deadline").inc()
+        return DeadlineExceeded(
+            f"Deadline reached waiting for {self.name} capacity.",
+            retry_after=BEDROCK_RETRY_BASE_SECONDS * 4,
+        )
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop=loop, future=loop.create_future())
+        with self._lock:
+            if self._enqueue(waiter):
+                return
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise self._timed_out() from None
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def acquire_sync(self, timeout: Optional[float] = None) -> None:
+        waiter = _Waiter(event=threading.Event())
+        with self._lock:
+            if self._enqueue(waiter):
+                return
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                # Granted between the timeout and the lock: keep the slot
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    raise self._timed_out()
+
+    def release(self, outcome: Optional[str] = None, seconds: Optional[float] = None) -> None:
+        """Free a slot; "ok" (a call of `seconds`) grows the limit, "throttle" shrinks it."""
+        with self._lock:
+            self.in_flight -= 1
+            if outcome == "ok":
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                if seconds is not None:
+                    self.rtt = 0.8 * self.rtt + 0.2 * seconds
+            elif outcome == "throttle":
+                now = time.monotonic()
+                if now - self._last_decrease >= self.rtt:
+                    self._last_decrease = now
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    logger.warning("Throttled: %s limit down to %d", self.name, int(self.limit))
+            self._gauge.set(self.limit)
+            self._wake()
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._gauge = BREAKER_STATE.labels(name)
+        self._gauge.set(self.CLOSED)
+
+    def _set(self, state: int) -> None:
+        if state != self.state:
+            logger.warning("Circuit for %s: %s", self.name, ("closed", "half-open", "open")[state])
+        self.state = state
+        self._gauge.set(state)
+
+    def before_call(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+                self._set(self.HALF_OPEN)
+                self._probing = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probing):
+                BEDROCK_SHED.labels(self.name, "circuit_open").inc()
+                retry_after = max(1.0, self.opened_at + self.reset_seconds - now)
+                raise CircuitOpen(
+                    f"{self.name} is unavailable (circuit open); try again later.",
+                    retry_after=retry_after,
+                )
+            if self.state == self.HALF_OPEN:
+                self._probing = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set(self.CLOSED)
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set(self.OPEN)
+
+    def on_other(self) -> None:
+        """A call that ended for a reason unrelated to availability (e.g. bad input)."""
+        with self._lock:
+            self._probing = False
+
+
+class _Offloaded:
+    """A blocking call for the executor that owns its limiter slot.
+
+    The thread releases the slot when the call returns. If the caller gives up
+    before the thread picks the call up, `abandon` releases it instead and the
+    call is skipped.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, fn: Callable[[], T]):
+        self.limiter = limiter
+        self.fn = fn
+        self.state = "queued"  # -> running | abandoned
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            if self.state == "abandoned":
+                return None
+            self.state = "running"
+        start = time.monotonic()
+        outcome = None
+        try:
+            result = self.fn()
+            outcome = "ok"
+            return result
+        except Exception as e:
+            outcome = classify_error(e)
+            raise
+        finally:
+            seconds = time.monotonic() - start if outcome == "ok" else None
+            self.limiter.release(outcome, seconds)
+
+    def abandon(self) -> None:
+        with self._lock:
+            if self.state != "queued":
+                return
+            self.state = "abandoned"
+        self.limiter.release()
+
+
+def _offload(fn: Callable[[], T]) -> "asyncio.Future[T]":
+    """`fn()` on the loop's default executor, in a copy of the caller's context."""
+    return asyncio.get_running_loop().run_in_executor(
+        None, contextvars.copy_context().run, fn
+    )
+
+
+class Guard:
+    """Limiter + breaker + retry policy for one model."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limiter = AdaptiveLimiter(name)
+        self.breaker = CircuitBreaker(name)
+
+    def _admit(self) -> Optional[float]:
+        """Check the breaker and the deadline; seconds left (None: no deadline)."""
+        self.breaker.before_call()
+        left = remaining()
+        if left is not None and left <= 0:
+            BEDROCK_SHED.labels(self.name, "deadline").inc()
+            raise DeadlineExceeded("Request deadline exceeded.", retry_after=1.0)
+        return left
+
+    def _failed(self, error: BaseException, attempt: int, retry: bool = True) -> float:
+        """After a failed call (slot already released): backoff before the next
+        attempt, or raise. Non-transient errors are re-raised as they are."""
+        kind = classify_error(error) if isinstance(error, Exception) else None
+        if kind is None:
+            self.breaker.on_other()
+            raise error
+        delay = backoff(attempt)
+        left = remaining()
+        if not retry or attempt + 1 >= BEDROCK_RETRY_ATTEMPTS or (left is not None and left <= delay):
+            self.breaker.on_failure()
+            BEDROCK_SHED.labels(self.name, "retries_exhausted").inc()
+            retry_after = max(delay, BEDROCK_RETRY_BASE_SECONDS * 2**attempt)
+            if kind == "throttle":
+                raise BedrockThrottled(
+                    f"{self.name} is throttling requests; try again shortly.", retry_after
+                ) from error
+            raise BedrockUnavailable(f"{self.name} is unavailable: {error}", retry_after) from error
+        if kind == "transient":
+            self.breaker.on_failure()
+        else:
+            self.breaker.on_other()
+        BEDROCK_RETRIES.labels(self.name, kind).inc()
+        logger.info("Retrying %s in %.2fs after %s (%s)", self.name, delay, kind, error)
+        return delay
+
+    async def acall(self, fn: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            left = self._admit()
+            await self.limiter.acquire(left)
+            call = _Offloaded(self.limiter, fn)
+            future = _offload(call.run)
+            left = remaining()
+            try:
+                if left is None:
+                    result = await future
+                else:
+                    result = await asyncio.wait_for(future, max(left, 0.001))
+            except asyncio.TimeoutError as e:
+                call.abandon()
+                if remaining() is not None and remaining() <= 0:
+                    self.breaker.on_failure()
+                    BEDROCK_SHED.labels(self.name, "deadline").inc()
+                    raise DeadlineExceeded("Request deadline exceeded.", retry_after=1.0) from e
+                await asyncio.sleep(self._failed(e, attempt))
+            except BaseException as e:
+                # A failed call released its slot in its thread; a cancelled one
+                # releases it when the thread is done
+                call.abandon()
+                await asyncio.sleep(self._failed(e, attempt))
+            else:
+                self.breaker.on_success()
+                return result
+            attempt += 1
+
+    def call(self, fn: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            self.limiter.acquire_sync(self._admit())
+            start = time.monotonic()
+            try:
+                result = fn()
+            except BaseException as e:
+                self.limiter.release(classify_error(e) if isinstance(e, Exception) else None)
+                time.sleep(self._failed(e, attempt))
+            else:
+                self.limiter.release("ok", time.monotonic() - start)
+                self.breaker.on_success()
+                return result
+            attempt += 1
+
+    async def astream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        attempt = 0
+        while True:
+            await self.limiter.acquire(self._admit())
+            stream = open_stream().__aiter__()
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                self.limiter.release("ok")
+                self.breaker.on_success()
+                return
+            except BaseException as e:
+                self.limiter.release(classify_error(e) if isinstance(e, Exception) else None)
+                await asyncio.sleep(self._failed(e, attempt))
+                attempt += 1
+                continue
+            break
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            self.limiter.release(classify_error(e))
+            self._failed(e, attempt, retry=False)
+        except BaseException:
+            # Closed early by the consumer, or cancelled
+            self.limiter.release()
+            self.breaker.on_other()
+            raise
+        else:
+            self.limiter.release("ok")
+            self.breaker.on_success()
+
+    def stream(self, open_stream: Callable[[], Iterator[T]]) -> Iterator[T]:
+        attempt = 0
+        while True:
+            self.limiter.acquire_sync(self._admit())
+            stream = iter(open_stream())
+            try:
+                first = next(stream)
+            except StopIteration:
+                self.limiter.release("ok")
+                self.breaker.on_success()
+                return
+            except BaseException as e:
+                self.limiter.release(classify_error(e) if isinstance(e, Exception) else None)
+                time.sleep(self._failed(e, attempt))
+                attempt += 1
+                continue
+            break
+        try:
+            yield first
+            yield from stream
+        except Exception as e:
+            self.limiter.release(classify_error(e))
+            self._failed(e, attempt, retry=False)
+        except BaseException:
+            self.limiter.release()
+            self.breaker.on_other()
+            raise
+        else:
+            self.limiter.release("ok")
+            self.breaker.on_success()
+
+
+_guards: Dict[str, Guard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard_for(model_id: str) -> Guard:
+    guard = _guards.get(model_id)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.setdefault(model_id, Guard(model_id))
+    return guard
+
+
+def has_capacity(model_id: str) -> bool:
+    """Whether a call to `model_id` would start now rather than queue."""
+    if not RESILIENCE_ENABLED:
+        return True
+    guard = guard_for(model_id)
+    return guard.breaker.state == guard.breaker.CLOSED and not guard.limiter._waiters
+
+
+async def acall(model_id: str, fn: Callable[[], T]) -> T:
+    """Blocking `fn()` on the default executor, behind `model_id`'s limiter,
+    retries and breaker. Cancelling the caller doesn't stop a call already running."""
+    if not RESILIENCE_ENABLED:
+        return await _offload(fn)
+    return await guard_for(model_id).acall(fn)
+
+
+def call(model_id: str, fn: Callable[[], T]) -> T:
+    """Sync variant of `acall`."""
+    if not RESILIENCE_ENABLED:
+        return fn()
+    return guard_for(model_id).call(fn)
+
+
+def astream(model_id: str, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+    """Chunks of `open_stream()`, retried until the first one arrives."""
+    if not RESILIENCE_ENABLED:
+        return open_stream()
+    return guard_for(model_id).astream(open_stream)
+
+
+def stream(model_id: str, open_stream: Callable[[], Iterator[T]]) -> Iterator[T]:
+    """Sync variant of `astream`."""
+    if not RESILIENCE_ENABLED:
+        return open_stream()
+    return guard_for(model_id).stream(open_stream)
@@ -0,0 +1,128 @@
+"""
+segmenter.py
+
+Local (no LLM) topic segmentation of long documents, so each topic can become
+its own diagram instead of one bloated visual.
+
+1. Split on structure: markdown headings and blank lines give paragraphs. A
+   paragraph longer than `max_chars` is split at sentence ends (at word
+   boundaries for a single overlong sentence), so text without blank lines
+   still segments.
+2. Merge adjacent paragraphs while they stay on topic (lexical overlap of content
+   words, TextTiling-style) and the segment stays under `max_chars`.
+3. Fold tiny leftovers into their neighbour so no segment is a lone sentence.
+4. Cap the count by merging the shortest adjacent pair until it fits.
+"""
+
+import re
+from typing import List, Set
+
+from server.config.variables import (
+    SEGMENT_MAX_CHARS,
+    SEGMENT_MAX_SEGMENTS,
+    SEGMENT_MIN_CHARS,
+    SEGMENT_SIMILARITY_THRESHOLD,
+)
+
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+")
+_WORD = re.compile(r"[a-zA-Z][a-zA-Z0-9'-]{2,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were",
+    "has", "have", "had", "but", "not", "you", "your", "its", "into", "then",
+    "than", "they", "them", "their", "there", "which", "when", "what", "will",
+    "would", "can", "could", "should", "also", "been", "being", "each", "after",
+    "before", "about", "over", "such", "these", "those", "other", "more", "most",
+}
+
+
+def _paragraphs(text: str) -> List[str]:
+    blocks, current = [], []
+    for line in text.splitlines():
+        if not line.strip() or _HEADING.match(line):
+            if current:
+                blocks.append("\n".join(current).strip())
+                current = []
+            if line.strip():
+                current.append(line)
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current).strip())
+    return [b for b in blocks if b]
+
+
+def _pack(pieces: List[str], max_chars: int, sep: str) -> List[str]:
+    """Greedily join consecutive pieces into chunks of at most `max_chars`."""
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(sep) + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]}{sep}{piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _split_long(paragraph: str, max_chars: int) -> List[str]:
+    """A paragraph over `max_chars` as sentence-aligned chunks under it."""
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+    sentences = []
+    for sentence in _SENTENCE_END.split(paragraph):
+        sentence = sentence.strip()
+        if len(sentence) > max_chars:
+            sentences.extend(_pack(sentence.split(), max_chars, " "))
+        elif sentence:
+            sentences.append(sentence)
+    return _pack(sentences, max_chars, " ")
+
+
+def _terms(text: str) -> Set[str]:
+    return {w for w in (m.lower() for m in _WORD.findall(text)) if w not in _STOPWORDS}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def segment_text(
+    text: str,
+    max_chars: int = SEGMENT_MAX_CHARS,
+    min_chars: int = SEGMENT_MIN_CHARS,
+    threshold: float = SEGMENT_SIMILARITY_THRESHOLD,
+    max_segments: int = SEGMENT_MAX_SEGMENTS,
+) -> List[str]:
+    """Split a document into ordered topic segments."""
+    paragraphs = [p for block in _paragraphs(text) for p in _split_long(block, max_chars)]
+    if not paragraphs:
+        return []
+
+    segments: List[str] = [paragraphs[0]]
+    terms: List[Set[str]] = [_terms(paragraphs[0])]
+    for paragraph in paragraphs[1:]:
+        paragraph_terms = _terms(paragraph)
+        starts_section = bool(_HEADING.match(paragraph))
+        fits = len(segments[-1]) + len(paragraph) + 2 <= max_chars
+        on_topic = _similarity(terms[-1], paragraph_terms) >= threshold
+        too_small = len(segments[-1]) < min_chars
+        if fits and not starts_section and (on_topic or too_small):
+            segments[-1] = f"{segments[-1]}\n\n{paragraph}"
+            terms[-1] |= paragraph_terms
+        else:
+            segments.append(paragraph)
+            terms.append(paragraph_terms)
+
+    # A short trailing segment reads better as part of the previous topic
+    if len(segments) > 1 and len(segments[-1]) < min_chars:
+        if len(segments[-2]) + len(segments[-1]) + 2 <= max_chars:
+            segments[-2] = f"{segments[-2]}\n\n{segments.pop()}"
+
+    while len(segments) > max(1, max_segments):
+        i = min(
+            range(len(segments) - 1),
+            key=lambda j: len(segments[j]) + len(segments[j + 1]),
+        )
+        segments[i : i + 2] = [f"{segments[i]}\n\n{segments[i + 1]}"]
+    return segments
@@ -0,0 +1,369 @@
+"""
+semantic_cache.py
+
+Near-duplicate lookup in front of the pipeline: paraphrases such as "timeline of
+WW2" and "World War II timeline" reuse the earlier result instead of missing the
+exact-match cache.
+
+- Embedding: local and CPU-only. Words (with acronyms of capitalized runs and
+  Roman numerals normalized, so "World War II" also yields "ww" and "2"), word
+  bigrams and character trigrams are hashed into `SEMANTIC_CACHE_DIM` signed
+  buckets (the hashing trick), then L2-normalized; cosine similarity is a dot
+  product.
+- Key-term guard: a lexical embedding scores "World War I" vs "World War II"
+  (0.76) about as high as a real paraphrase, so no threshold alone is safe. A
+  match also needs the same numbers ("II" counts as 2) and the same entities
+  (acronyms of capitalized runs, all-caps words). The threshold is calibrated on
+  the labelled pairs in server/benchmarks/corpus.py (`python -m
+  server.benchmarks.semantic`), paragraphs that differ in one action included:
+  those score above 0.9, so the cache only reuses near-verbatim inputs and is
+  opt-in (`SEMANTIC_CACHE_ENABLED`).
+- Index: two NumPy arrays memory-mapped from .npy files under
+  `SEMANTIC_CACHE_DIR`: the vectors, and a record per slot (result cache key,
+  scope, 64-bit SimHash, key-term hashes, timestamps, hits). Both live in the
+  page cache and are shared by every worker on the host; lookups (which update
+  the hit stats) and writes take a file lock.
+- Search: exact (one matrix-vector product) up to `SEMANTIC_CACHE_BRUTE_FORCE_MAX`
+  live entries; beyond that, SimHash LSH (8 bands of 8 bits) narrows the
+  candidates before the exact cosine.
+- Entries point at result cache keys; the value itself stays in services/cache.py.
+  A match only counts within the same scope (models, prompt version, options),
+  above the threshold, and while its result is still cached.
+- Eviction: TTL, then least recently used once `SEMANTIC_CACHE_MAX_ENTRIES`
+  slots are taken.
+
+Without NumPy the semantic cache is disabled.
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from server.config.variables import (
+    CACHE_DISK_TTL_SECONDS,
+    CACHE_ENABLED,
+    SEMANTIC_CACHE_BRUTE_FORCE_MAX,
+    SEMANTIC_CACHE_DIM,
+    SEMANTIC_CACHE_DIR,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+from server.utils.logger import get_logger
+from server.utils.metrics import (
+    CACHE_REQUESTS,
+    SEMANTIC_CACHE_ENTRIES,
+    SEMANTIC_HIT_QUALITY,
+    SEMANTIC_SIMILARITY,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+logger = get_logger(os.path.basename(__file__))
+
+_WORD = re.compile(r"[A-Za-z]+|\d+")
+_ROMAN = {"II": "2", "III": "3", "IV": "4", "VI": "6", "VII": "7", "VIII": "8", "IX": "9"}
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "with", "about",
+    "me", "my", "please", "show", "create", "make", "draw", "generate", "give",
+    "is", "are", "was", "were", "be", "how", "what", "works", "explain", "describe",
+    "do", "does", "i",
+}
+_BANDS, _BAND_BITS = 8, 8
+_RECORD = [
+    ("key", "S64"),
+    ("scope", "S16"),
+    ("sig", "<u8"),
+    ("numbers", "<u8"),
+    ("entities", "<u8"),
+    ("created", "<f8"),
+    ("used", "<f8"),
+    ("hits", "<u4"),
+    ("valid", "?"),
+]
+
+
+def _analyze(text: str) -> Tuple[List[Tuple[str, float]], Set[str], Set[str]]:
+    """Weighted words, numbers and entities. A run of capitalized words ("World
+    War") becomes its acronym ("ww"), with the words themselves at half weight."""
+    tokens: List[Tuple[str, float]] = []
+    numbers: Set[str] = set()
+    entities: Set[str] = set()
+    run: List[str] = []
+
+    def close_run() -> None:
+        words = [w.lower() for w in run if w.lower() not in _STOPWORDS]
+        weight = 0.5 if len(words) >= 2 else 1.0
+        if len(words) >= 2:
+            acronym = "".join(w[0] for w in words)
+            tokens.append((acronym, 1.0))
+            entities.add(acronym)
+        tokens.extend((w, weight) for w in words)
+        entities.update(w.lower() for w in run if len(w) >= 2 and w.isupper())
+        run.clear()
+
+    for word in _WORD.findall(text):
+        # "I" is only a numeral right after a capitalized run ("World War I")
+        numeral = word in _ROMAN or (word == "I" and bool(run))
+        if word[:1].isupper() and not numeral:
+            run.append(word)
+            continue
+        close_run()
+        token = "1" if word == "I" and numeral else _ROMAN.get(word, word.lower())
+        if token.isdigit():
+            numbers.add(token.lstrip("0") or "0")
+        if token not in _STOPWORDS:
+            tokens.append((token, 1.0))
+    close_run()
+    return tokens, numbers, entities
+
+
+def _tokens(text: str) -> List[Tuple[str, float]]:
+    return _analyze(text)[0]
+
+
+def key_terms(text: str) -> "Terms":
+    """(numbers, entities) of `text`, which a semantic match must agree on."""
+    _, numbers, entities = _analyze(text)
+    return frozenset(numbers), frozenset(entities)
+
+
+def _terms_hash(terms: FrozenSet[str]) -> int:
+    """Stable 64-bit hash of a term set; 0 for the empty set."""
+    if not terms:
+        return 0
+    data = "\x1f".join(sorted(terms)).encode("utf-8")
+    return (zlib.crc32(data) << 32 | zlib.adler32(data)) or 1
+
+
+Terms = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def terms_match(a: Terms, b: Terms) -> bool:
+    """Same numbers and same entities; an entity named on one side only is a
+    change too ("... and sends an SMS")."""
+    return a == b
+
+
+def features(text: str) -> List[Tuple[str, float]]:
+    """Weighted features hashed into the embedding."""
+    tokens = _tokens(text)
+    feats = list(tokens)
+    feats += [(f"{a} {b}", 0.5 * min(wa, wb)) for (a, wa), (b, wb) in zip(tokens, tokens[1:])]
+    for t, weight in tokens:
+        padded = f"#{t}#"
+        feats += [(padded[i : i + 3], 0.2 * weight) for i in range(len(padded) - 2)]
+    return feats
+
+
+def embed(text: str, dim: int = SEMANTIC_CACHE_DIM) -> "np.ndarray":
+    """L2-normalized hashing-trick embedding (float32, length `dim`)."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feat, weight in features(text):
+        # crc32 rather than hash(): stable across processes and restarts
+        h = zlib.crc32(feat.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Memory-mapped nearest-neighbour index from past inputs to result cache keys."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        dim: int = SEMANTIC_CACHE_DIM,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = CACHE_DISK_TTL_SECONDS,
+        brute_force_max: int = SEMANTIC_CACHE_BRUTE_FORCE_MAX,
+        enabled: bool = CACHE_ENABLED and SEMANTIC_CACHE_ENABLED,
+    ):
+        self.directory = directory or SEMANTIC_CACHE_DIR
+        self.max_entries = max_entries
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.brute_force_max = brute_force_max
+        self.enabled = enabled and np is not None and max_entries > 0
+        if enabled and np is None:
+            logger.warning("NumPy is not installed; semantic cache disabled.")
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._planes = np.random.default_rng(0).standard_normal(
+                (_BANDS * _BAND_BITS, dim)
+            ).astype(np.float32)
+            self._bits = np.left_shift(
+                np.uint64(1), np.arange(_BANDS * _BAND_BITS, dtype=np.uint64)
+            )
+            with self._file_lock():
+                self.vectors = self._open("vectors.npy", np.float32, (max_entries, dim))
+                self.records = self._open("records.npy", np.dtype(_RECORD), (max_entries,))
+            SEMANTIC_CACHE_ENTRIES.set(int(self.records["valid"].sum()))
+
+    def _open(self, name: str, dtype, shape) -> "np.memmap":
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            try:
+                array = np.load(path, mmap_mode="r+")
+                if array.shape == shape and array.dtype == dtype:
+                    return array
+                logger.warning("Semantic cache %s has another shape; recreating it", name)
+            except (ValueError, OSError) as e:
+                logger.warning("Semantic cache %s unreadable (%s); recreating it", name, e)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def signature(self, vector: "np.ndarray") -> int:
+        """64-bit SimHash (random hyperplanes) of an embedding."""
+        bits = (self._planes @ vector) > 0
+        return int(np.bitwise_or.reduce(self._bits[bits], initial=np.uint64(0)))
+
+    def _candidates(self, scope: bytes, sig: int, now: float) -> "np.ndarray":
+        records = self.records
+        live = records["valid"] & (records["scope"] == scope) & (records["created"] > now - self.ttl)
+        idx = np.flatnonzero(live)
+        if len(idx) <= self.brute_force_max:
+            return idx
+        sigs = records["sig"][idx]
+        query = np.uint64(sig)
+        mask = np.uint64((1 << _BAND_BITS) - 1)
+        match = np.zeros(len(idx), dtype=bool)
+        for band in range(_BANDS):
+            shift = np.uint64(band * _BAND_BITS)
+            match |= ((sigs >> shift) & mask) == ((query >> shift) & mask)
+        return idx[match]
+
+    def lookup(
+        self, text: str, scope: str, threshold: Optional[float] = None
+    ) -> Optional[Tuple[str, float]]:
+        """(result cache key, similarity) of the nearest past input, if close enough."""
+        if not self.enabled:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        vector = embed(text, self.dim)
+        numbers, entities = (_terms_hash(t) for t in key_terms(text))
+        now = time.time()
+        # The file lock, not just the thread lock: a hit updates the shared records
+        with self._file_lock():
+            idx = self._candidates(scope.encode()[:16], self.signature(vector), now)
+            found = self.records[idx]
+            idx = idx[
+                (found["numbers"] == np.uint64(numbers))
+                & (found["entities"] == np.uint64(entities))
+            ]
+            if len(idx) == 0:
+                CACHE_REQUESTS.labels("semantic", "miss").inc()
+                return None
+            sims = self.vectors[idx] @ vector
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            SEMANTIC_SIMILARITY.observe(similarity)
+            if similarity < threshold:
+                CACHE_REQUESTS.labels("semantic", "miss").inc()
+                return None
+            slot = int(idx[best])
+            record = self.records[slot]
+            record["used"] = now
+            record["hits"] += 1
+            key = record["key"].decode()
+        CACHE_REQUESTS.labels("semantic", "hit").inc()
+        return key, similarity
+
+    def add(self, text: str, scope: str, key: str) -> None:
+        """Index `text` as pointing at result cache `key`."""
+        if not self.enabled:
+            return
+        vector = embed(text, self.dim)
+        if not vector.any():
+            return
+        numbers, entities = (_terms_hash(t) for t in key_terms(text))
+        now = time.time()
+        with self._file_lock():
+            records = self.records
+            existing = np.flatnonzero(records["valid"] & (records["key"] == key.encode()))
+            if len(existing):
+                slot = int(existing[0])
+            else:
+                free = np.flatnonzero(~records["valid"] | (records["created"] <= now - self.ttl))
+                # Reuse a free or expired slot, else evict the least recently used
+                slot = int(free[0]) if len(free) else int(np.argmin(records["used"]))
+            self.vectors[slot] = vector
+            records[slot] = (
+                key, scope.encode()[:16], self.signature(vector), numbers, entities,
+                now, now, 0, True,
+            )
+            self.vectors.flush()
+            records.flush()
+            SEMANTIC_CACHE_ENTRIES.set(int(records["valid"].sum()))
+
+    def discard(self, key: str) -> None:
+        """Forget entries pointing at `key` (e.g. its result expired)."""
+        if not self.enabled:
+            return
+        with self._file_lock():
+            hit = self.records["key"] == key.encode()
+            self.records["valid"][hit] = False
+            self.records.flush()
+            SEMANTIC_CACHE_ENTRIES.set(int(self.records["valid"].sum()))
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._file_lock():
+            self.records["valid"] = False
+            self.records.flush()
+        SEMANTIC_CACHE_ENTRIES.set(0)
+
+
+def _labels(diagram: Any) -> Set[str]:
+    data = diagram.get("data", {}) if isinstance(diagram, dict) else diagram.data
+    items = list(data.get("nodes") or []) + list(data.get("children") or [])
+    items += list(data.get("events") or [])
+    if data.get("root"):
+        items.append(data["root"])
+    labels = {" ".join(str(i.get("label", "")).lower().split()) for i in items if isinstance(i, dict)}
+    labels |= {str(h).lower() for h in data.get("headers") or []}
+    return labels - {""}
+
+
+def diagram_similarity(a: Any, b: Any) -> float:
+    """0..1 agreement of two diagrams: same type, then Jaccard of their labels."""
+    type_a = a.get("type") if isinstance(a, dict) else a.type
+    type_b = b.get("type") if isinstance(b, dict) else b.type
+    if type_a != type_b:
+        return 0.0
+    la, lb = _labels(a), _labels(b)
+    if not la and not lb:
+        return 1.0
+    return len(la & lb) / len(la | lb)
+
+
+def record_hit_quality(cached: Any, fresh: Any) -> float:
+    quality = diagram_similarity(cached, fresh)
+    SEMANTIC_HIT_QUALITY.observe(quality)
+    return quality
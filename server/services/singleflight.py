@@ -0,0 +1,79 @@
+"""
+singleflight.py
+
+In-flight deduplication: concurrent calls with the same key share one running
+task instead of each starting their own (e.g. a burst of identical
+/generate_mermaid requests costs one set of Bedrock calls, not N).
+
+- The first caller (the leader) starts the task; later callers attach to it
+  until it finishes. Finished calls are forgotten: the result cache serves
+  repeats after that.
+- Every caller awaits the task through `asyncio.shield`, so one caller being
+  cancelled (client disconnect) never cancels the work the others wait on.
+- The task is reference-counted: when its last caller is gone it is cancelled,
+  unless `cancel_orphans` is off (then it runs to completion and fills caches).
+- Calls are per event loop; a caller on another loop runs on its own.
+
+Counted in t2v_singleflight_total{namespace, result}: leader, coalesced, cancelled.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+
+from server.utils.logger import get_logger
+from server.utils.metrics import SINGLEFLIGHT_CALLS
+
+logger = get_logger(os.path.basename(__file__))
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "loop", "waiters")
+
+    def __init__(self, task: "asyncio.Future[T]", loop: asyncio.AbstractEventLoop):
+        self.task = task
+        self.loop = loop
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self, namespace: str, cancel_orphans: bool = True):
+        self.namespace = namespace
+        self.cancel_orphans = cancel_orphans
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Result of `fn()`, run once per key at a time; True if it was shared."""
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        shared = call is not None and call.loop is loop and not call.task.done()
+        if shared:
+            SINGLEFLIGHT_CALLS.labels(self.namespace, "coalesced").inc()
+            logger.info("Coalesced onto in-flight %s call %s", self.namespace, key[:12])
+        else:
+            SINGLEFLIGHT_CALLS.labels(self.namespace, "leader").inc()
+            call = _Call(asyncio.ensure_future(fn()), loop)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done() and self.cancel_orphans:
+                # Nobody is waiting any more: stop spending tokens on it, and
+                # make sure no new caller attaches to the cancelled task
+                SINGLEFLIGHT_CALLS.labels(self.namespace, "cancelled").inc()
+                logger.info("Cancelling orphaned %s call %s", self.namespace, key[:12])
+                self._forget(key, call)
+                call.task.cancel()
@@ -1,5 +1,9 @@
+import functools
 import re
-from server.schemas.diagram import Diagram, GraphData, TimelineData, MindMapData
+from typing import Dict, Iterator, TextIO
+
+from server.schemas.diagram import Diagram
+from server.utils.metrics import timed_stage
 
 # List of reserved words in Mermaid
 MERMAID_RESERVED_WORDS = {
@@ -31,14 +35,17 @@ MERMAID_RESERVED_WORDS = {
 }
 
 
-@staticmethod
+_ID_UNSAFE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+@functools.lru_cache(maxsize=65536)
 def sanitize_id(node_id: str) -> str:
     """Sanitize node ID to be Mermaid-compatible."""
     if not node_id:
         return "node_empty"
 
     # Replace spaces and special characters with underscores
-    sanitized = re.sub(r"[^a-zA-Z0-9_]", "_", node_id)
+    sanitized = _ID_UNSAFE.sub("_", node_id)
 
     # Ensure it doesn't start with a number
     if sanitized and sanitized[0].isdigit():
@@ -52,7 +59,7 @@ def sanitize_id(node_id: str) -> str:
     return sanitized if sanitized else "node_default"
 
 
-@staticmethod
+@functools.lru_cache(maxsize=65536)
 def sanitize_label(label: str) -> str:
     """Sanitize label text for Mermaid compatibility."""
     if not label:
@@ -68,6 +75,31 @@ def sanitize_label(label: str) -> str:
     return sanitized
 
 
+class IdAllocator:
+    """Maps raw ids to unique Mermaid ids for one diagram.
+
+    Ids that sanitize to the same string (e.g. "a b" and "a-b") get numeric
+    suffixes instead of silently merging into one node; each raw id is
+    sanitized once.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+        self._taken: set = set()
+
+    def __call__(self, raw_id: str) -> str:
+        safe = self._ids.get(raw_id)
+        if safe is None:
+            safe = base = sanitize_id(raw_id)
+            n = 2
+            while safe in self._taken:
+                safe = f"{base}_{n}"
+                n += 1
+            self._taken.add(safe)
+            self._ids[raw_id] = safe
+        return safe
+
+
 def fix_mermaid_string(mermaid_str: str) -> str:
     """Fix common Mermaid string issues like escaped newlines."""
     # Fix the main issue: escaped newlines
@@ -75,60 +107,99 @@ def fix_mermaid_string(mermaid_str: str) -> str:
     return fixed
 
 
-def to_mermaid(diagram: Diagram) -> str:
+def _iter_subgraphs(nodes, clusters, node_id: IdAllocator) -> Iterator[str]:
+    by_id = {n.id: n for n in nodes}
+    placed = set()
+    for cluster in clusters:
+        yield f'subgraph {node_id(cluster["id"])}["{sanitize_label(cluster["label"])}"]'
+        for raw_id in cluster["nodes"]:
+            n = by_id.get(raw_id)
+            if n is not None and raw_id not in placed:
+                placed.add(raw_id)
+                yield f'{node_id(n.id)}["{n.label}"]'
+        yield "end"
+    for n in nodes:
+        if n.id not in placed:
+            yield f'{node_id(n.id)}["{n.label}"]'
+
+
+def iter_mermaid(diagram: Diagram) -> Iterator[str]:
+    """Yield the Mermaid source line by line (no newlines), in O(1) extra memory per line."""
     t = diagram.type
     meta = diagram.meta or {}
     if t == "flowchart":
-        g = GraphData(**diagram.data)
+        g = diagram.typed_data()
         direction = meta.get("direction", "TD")
-        lines = [f"flowchart {direction}"]
-        # Sanitize node IDs
-        node_id_map = {}
-        for n in g.nodes:
-            safe_id = sanitize_id(n.id)
-            node_id_map[n.id] = safe_id
-            lines.append(f'{safe_id}["{n.label}"]')
+        yield f"flowchart {direction}"
+        node_id = IdAllocator()
+        clusters = meta.get("clusters")
+        if clusters:
+            # Communities from services/partition.py, drawn as subgraphs
+            yield from _iter_subgraphs(g.nodes, clusters, node_id)
+        else:
+            for n in g.nodes:
+                yield f'{node_id(n.id)}["{n.label}"]'
+        # Unknown endpoints get ids too; Mermaid creates those nodes implicitly
         for e in g.edges:
-            src = node_id_map.get(e.source, sanitize_id(e.source))
-            tgt = node_id_map.get(e.target, sanitize_id(e.target))
+            src = node_id(e.source)
+            tgt = node_id(e.target)
             if e.label:
-                safe_label = sanitize_label(e.label)
-                lines.append(f'{src} --"{safe_label}"--> {tgt}')
+                yield f'{src} --"{sanitize_label(e.label)}"--> {tgt}'
             else:
-                lines.append(f"{src} --> {tgt}")
-        return "\n".join(lines)
+                yield f"{src} --> {tgt}"
+        return
 
     if t == "timeline":
-        tl = TimelineData(**diagram.data)
-        lines = ["timeline"]
+        tl = diagram.typed_data()
+        yield "timeline"
         title = meta.get("title")
         if title:
-            lines.append(f"title {title}")
+            yield f"title {title}"
         for ev in tl.events:
-            lines.append(f"{ev.time} : {ev.label}")
-        return "\n".join(lines)
+            yield f"{ev.time} : {ev.label}"
+        return
 
     if t == "mind_map":
-        mm = MindMapData(**diagram.data)
-        lines = ["mindmap"]
-        lines.append(f"root(({mm.root.label}))")
+        mm = diagram.typed_data()
+        yield "mindmap"
+        yield f"root(({mm.root.label}))"
         # map child IDs to labels for readability
         for child in mm.children:
-            lines.append(f"{child.id}({child.label})")
+            yield f"{child.id}({child.label})"
         for e in mm.edges:
             # only support root->child for now
             if e.source == "root":
-                lines.append(f"root --> {e.target}")
-        return "\n".join(lines)
+                yield f"root --> {e.target}"
+        return
 
     if t == "table":
-        headers = diagram.data["headers"]
-        rows = diagram.data["rows"]
-        lines = ["%% Mermaid has limited table support; using Markdown fallback"]
-        lines.append("| " + " | ".join(headers) + " |")
-        lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
-        for r in rows:
-            lines.append("| " + " | ".join(r) + " |")
-        return "\n".join(lines)
+        table = diagram.typed_data()
+        headers = table.headers
+        yield "%% Mermaid has limited table support; using Markdown fallback"
+        yield "| " + " | ".join(headers) + " |"
+        yield "| " + " | ".join(["---"] * len(headers)) + " |"
+        for r in table.rows:
+            yield "| " + " | ".join(r) + " |"
+        return
 
     raise ValueError(f"Unsupported diagram type: {t}")
+
+
+@timed_stage("render")
+def to_mermaid(diagram: Diagram) -> str:
+    return "\n".join(iter_mermaid(diagram))
+
+
+@timed_stage("render")
+def write_mermaid(diagram: Diagram, stream: TextIO) -> int:
+    """Write the Mermaid source to a text stream without building it in memory.
+
+    Output is identical to `to_mermaid`; returns the number of lines written.
+    """
+    count = 0
+    for line in iter_mermaid(diagram):
+        if count:
+            stream.write("\n")
+        stream.write(line)
+        count += 1
+    return count
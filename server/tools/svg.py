@@ -0,0 +1,573 @@
+"""
+svg.py
+
+Server-side SVG rendering of validated diagrams, for clients that can't run
+Mermaid.js (Slack bots, email, ...). Pure Python: no headless browser or Node.
+
+- flowchart (and mind_map, drawn as a left-to-right tree): layered
+  (Sugiyama-style) layout
+  1. cycle removal: edges closing a DFS cycle are reversed for layout only
+  2. layering: longest path from the sources
+  3. edges spanning several layers get a dummy vertex per crossed layer (within
+     a budget of dummies per node; beyond it long edges are drawn straight)
+  4. crossing reduction: barycenter ordering in alternating down/up sweeps,
+     keeping the ordering with the fewest crossings
+  5. coordinates: vertices pulled towards the mean of their neighbours, packed
+     left-to-right and right-to-left with a minimum gap and averaged
+- timeline: events spaced along one axis, labels alternating above and below
+
+Layouts are kept in a bounded in-process LRU keyed by the IR hash (type, data
+and direction), so redrawing a diagram (result cache hits, /render_svg of a
+stored IR) skips the layout.
+"""
+
+import functools
+import re
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from server.config.variables import SVG_LAYOUT_CACHE_SIZE
+from server.schemas.diagram import Diagram
+from server.services.cache import make_key
+from server.utils.metrics import CACHE_REQUESTS, stage_timer, timed_stage
+
+# Bump when the layout code changes, so cached layouts are not reused
+LAYOUT_VERSION = 1
+
+_CHAR_WIDTH = 7.6  # average glyph width at 14px sans-serif
+_LINE_HEIGHT = 18
+_PAD_X, _PAD_Y = 14, 9
+_MAX_LINE_CHARS = 32
+_MAX_LINES = 3
+_LAYER_GAP = 56
+_NODE_GAP = 28
+_MARGIN = 20
+_SWEEPS = 4
+_COORD_PASSES = 4
+_DUMMY_BUDGET = 4  # dummy vertices per real node
+_STEM = 28  # timeline: axis to label box
+
+_BR = re.compile(r"<br\s*/?>|\n")
+
+Point = Tuple[float, float]
+# (center x, center y, width, height, text lines, css class)
+Box = Tuple[float, float, float, float, Tuple[str, ...], str]
+# (points, label, arrow head, cubic curve)
+Path = Tuple[List[Point], Optional[str], bool, bool]
+
+_STYLE = (
+    "text{font-family:-apple-system,'Segoe UI',Helvetica,Arial,sans-serif;"
+    "font-size:14px;fill:#333;text-anchor:middle;dominant-baseline:central}"
+    ".node,.event{fill:#ECECFF;stroke:#9370DB;stroke-width:1px}"
+    ".root{fill:#FFF5AD;stroke:#AAAA33;stroke-width:1px}"
+    ".dot{fill:#9370DB}"
+    ".edge{fill:none;stroke:#333;stroke-width:1.5px}"
+    ".label-bg{fill:#E8E8E8;opacity:0.85}"
+    ".title{font-size:18px;font-weight:bold;text-anchor:start}"
+    ".time{font-weight:bold}"
+)
+
+
+class Layout:
+    """A positioned diagram: what `svg_from_layout` draws and the cache holds."""
+
+    __slots__ = ("width", "height", "boxes", "paths", "title")
+
+    def __init__(
+        self,
+        width: float,
+        height: float,
+        boxes: List[Box],
+        paths: List[Path],
+        title: Optional[str] = None,
+    ):
+        self.width = width
+        self.height = height
+        self.boxes = boxes
+        self.paths = paths
+        self.title = title
+
+
+class LayoutCache:
+    """Bounded, thread-safe LRU of layouts by IR hash."""
+
+    def __init__(self, max_entries: int = SVG_LAYOUT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Layout]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Layout]:
+        with self._lock:
+            layout = self._entries.get(key)
+            if layout is not None:
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels("layout", "miss" if layout is None else "memory_hit").inc()
+        return layout
+
+    def set(self, key: str, layout: Layout) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = layout
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+LAYOUT_CACHE = LayoutCache()
+
+
+@functools.lru_cache(maxsize=65536)
+def _wrap(label: str) -> Tuple[str, ...]:
+    lines: List[str] = []
+    for paragraph in _BR.split(label or ""):
+        lines.extend(textwrap.wrap(paragraph, _MAX_LINE_CHARS) or [""])
+    if len(lines) > _MAX_LINES:
+        lines = lines[:_MAX_LINES]
+        lines[-1] = lines[-1][: _MAX_LINE_CHARS - 3] + "..."
+    return tuple(lines)
+
+
+def _box_size(lines: Sequence[str]) -> Tuple[float, float]:
+    width = max(len(line) for line in lines) * _CHAR_WIDTH + 2 * _PAD_X
+    return max(width, 40.0), len(lines) * _LINE_HEIGHT + 2 * _PAD_Y
+
+
+def _feedback_edges(n: int, pairs: List[Tuple[int, int]]) -> set:
+    """Indices of edges that close a cycle in an (iterative) DFS."""
+    succ: List[List[Tuple[int, int]]] = [[] for _ in range(n)]
+    for k, (s, t) in enumerate(pairs):
+        if s != t:
+            succ[s].append((t, k))
+    state = [0] * n  # 0 unvisited, 1 on the stack, 2 done
+    back = set()
+    for root in range(n):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(succ[root]))]
+        while stack:
+            node, children = stack[-1]
+            for t, k in children:
+                if state[t] == 0:
+                    state[t] = 1
+                    stack.append((t, iter(succ[t])))
+                    break
+                if state[t] == 1:
+                    back.add(k)
+            else:
+                state[node] = 2
+                stack.pop()
+    return back
+
+
+def _longest_path_layers(n: int, dag: List[Tuple[int, int]]) -> List[int]:
+    succ: List[List[int]] = [[] for _ in range(n)]
+    indegree = [0] * n
+    for s, t in dag:
+        succ[s].append(t)
+        indegree[t] += 1
+    layer = [0] * n
+    ready = [v for v in range(n) if indegree[v] == 0]
+    while ready:
+        v = ready.pop()
+        for t in succ[v]:
+            if layer[v] + 1 > layer[t]:
+                layer[t] = layer[v] + 1
+            indegree[t] -= 1
+            if indegree[t] == 0:
+                ready.append(t)
+    return layer
+
+
+def _crossings(layers: List[List[int]], down: List[List[int]], pos: List[int]) -> int:
+    """Edge crossings between adjacent layers (inversions, via a Fenwick tree)."""
+    total = 0
+    for upper, lower in zip(layers, layers[1:]):
+        size = len(lower)
+        tree = [0] * (size + 1)
+        seen = 0
+        for a in upper:
+            for b in sorted(pos[x] for x in down[a]):
+                i, not_greater = b + 1, 0
+                while i > 0:
+                    not_greater += tree[i]
+                    i -= i & -i
+                total += seen - not_greater
+                i = b + 1
+                while i <= size:
+                    tree[i] += 1
+                    i += i & -i
+                seen += 1
+    return total
+
+
+def _order_layers(
+    layers: List[List[int]], up: List[List[int]], down: List[List[int]], pos: List[int]
+) -> List[List[int]]:
+    """Barycenter sweeps; returns the ordering with the fewest crossings."""
+    best = [list(vs) for vs in layers]
+    best_crossings = _crossings(layers, down, pos)
+    for sweep in range(2 * _SWEEPS):
+        if best_crossings == 0:
+            break
+        downward = sweep % 2 == 0
+        indices = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+        neighbours = up if downward else down
+        for l in indices:
+            vs = layers[l]
+            bary = {}
+            for v in vs:
+                nb = neighbours[v]
+                bary[v] = sum(pos[x] for x in nb) / len(nb) if nb else pos[v]
+            vs.sort(key=bary.__getitem__)
+            for i, v in enumerate(vs):
+                pos[v] = i
+        crossings = _crossings(layers, down, pos)
+        if crossings < best_crossings:
+            best, best_crossings = [list(vs) for vs in layers], crossings
+    for vs in best:
+        for i, v in enumerate(vs):
+            pos[v] = i
+    return best
+
+
+def _place(vs: List[int], want: List[float], size: List[float]) -> List[float]:
+    """Positions closest to `want` keeping neighbours `_NODE_GAP` apart."""
+    right = list(want)
+    for i in range(1, len(vs)):
+        lo = right[i - 1] + (size[vs[i - 1]] + size[vs[i]]) / 2 + _NODE_GAP
+        if right[i] < lo:
+            right[i] = lo
+    left = list(want)
+    for i in range(len(vs) - 2, -1, -1):
+        hi = left[i + 1] - (size[vs[i]] + size[vs[i + 1]]) / 2 - _NODE_GAP
+        if left[i] > hi:
+            left[i] = hi
+    # Both respect the gaps, so their average does too
+    return [(a + b) / 2 for a, b in zip(left, right)]
+
+
+def _clip(center: Point, toward: Point, half_w: float, half_h: float) -> Point:
+    """Where the segment from a box center toward a point leaves the box."""
+    dx, dy = toward[0] - center[0], toward[1] - center[1]
+    if dx == 0 and dy == 0:
+        return center
+    t = min(
+        half_w / abs(dx) if dx else float("inf"),
+        half_h / abs(dy) if dy else float("inf"),
+    )
+    t = min(t, 1.0)
+    return center[0] + dx * t, center[1] + dy * t
+
+
+def layered_layout(
+    labels: List[str],
+    pairs: List[Tuple[int, int]],
+    edge_labels: List[Optional[str]],
+    direction: str = "TD",
+    classes: Optional[List[str]] = None,
+) -> Layout:
+    """Layered layout of a directed graph given as node labels and index pairs."""
+    n = len(labels)
+    lines = [_wrap(label) for label in labels]
+    sizes = [_box_size(l) for l in lines]
+    horizontal = direction in ("LR", "RL")
+    # "along" runs within a layer, "across" from one layer to the next
+    along = [h if horizontal else w for w, h in sizes]
+    across = [w if horizontal else h for w, h in sizes]
+
+    back = _feedback_edges(n, pairs)
+    dag = [(t, s) if k in back else (s, t) for k, (s, t) in enumerate(pairs)]
+    layer = _longest_path_layers(n, [(s, t) for s, t in dag if s != t])
+
+    vlayer = list(layer)
+    valong = list(along)
+    up: List[List[int]] = [[] for _ in range(n)]
+    down: List[List[int]] = [[] for _ in range(n)]
+    chains: List[Optional[List[int]]] = [None] * len(dag)
+    budget = _DUMMY_BUDGET * n
+    for k in sorted(range(len(dag)), key=lambda k: layer[dag[k][1]] - layer[dag[k][0]]):
+        u, v = dag[k]
+        if u == v:
+            continue
+        span = layer[v] - layer[u]
+        chain = [u]
+        if 1 < span <= budget + 1:
+            budget -= span - 1
+            for l in range(layer[u] + 1, layer[v]):
+                chain.append(len(vlayer))
+                vlayer.append(l)
+                valong.append(0.0)
+                up.append([])
+                down.append([])
+        chain.append(v)
+        for a, b in zip(chain, chain[1:]):
+            if vlayer[b] - vlayer[a] == 1:
+                down[a].append(b)
+                up[b].append(a)
+        chains[k] = chain
+
+    layers: List[List[int]] = [[] for _ in range(max(vlayer, default=-1) + 1)]
+    for v, l in enumerate(vlayer):
+        layers[l].append(v)
+    pos = [0] * len(vlayer)
+    for vs in layers:
+        for i, v in enumerate(vs):
+            pos[v] = i
+    layers = _order_layers(layers, up, down, pos)
+
+    # Coordinate along the layers
+    x = [0.0] * len(vlayer)
+    for vs in layers:
+        cursor = 0.0
+        for v in vs:
+            x[v] = cursor + valong[v] / 2
+            cursor += valong[v] + _NODE_GAP
+    for p in range(_COORD_PASSES):
+        downward = p % 2 == 0
+        indices = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+        neighbours = up if downward else down
+        for l in indices:
+            vs = layers[l]
+            want = [
+                sum(x[u] for u in neighbours[v]) / len(neighbours[v]) if neighbours[v] else x[v]
+                for v in vs
+            ]
+            for v, placed in zip(vs, _place(vs, want, valong)):
+                x[v] = placed
+    offset = min((x[v] - valong[v] / 2 for v in range(len(vlayer))), default=0.0)
+
+    # Coordinate across the layers
+    thickness = [0.0] * len(layers)
+    for v in range(n):
+        thickness[layer[v]] = max(thickness[layer[v]], across[v])
+    depth, cursor = [], 0.0
+    for t in thickness:
+        depth.append(cursor + t / 2)
+        cursor += t + _LAYER_GAP
+    total_depth = max(cursor - _LAYER_GAP, 0.0)
+
+    def point(v: int) -> Point:
+        a = x[v] - offset
+        d = depth[vlayer[v]]
+        if direction in ("BT", "RL"):
+            d = total_depth - d
+        if horizontal:
+            return _MARGIN + d, _MARGIN + a
+        return _MARGIN + a, _MARGIN + d
+
+    centers = [point(v) for v in range(n)]
+    classes = classes or ["node"] * n
+    boxes: List[Box] = [
+        (cx, cy, w, h, lines[v], classes[v])
+        for v, ((cx, cy), (w, h)) in enumerate(zip(centers, sizes))
+    ]
+    paths: List[Path] = []
+    for k, chain in enumerate(chains):
+        s, t = pairs[k]
+        if chain is None:
+            # Self-loop: a small arc on the box's right-hand side
+            cx, cy = centers[s]
+            r = cx + sizes[s][0] / 2
+            pts = [(r, cy - 6), (r + 26, cy - 20), (r + 26, cy + 20), (r, cy + 6)]
+            paths.append((pts, edge_labels[k], True, True))
+            continue
+        pts = [point(v) for v in chain]
+        if k in back:
+            pts.reverse()
+        pts[0] = _clip(centers[s], pts[1], sizes[s][0] / 2, sizes[s][1] / 2)
+        pts[-1] = _clip(centers[t], pts[-2], sizes[t][0] / 2, sizes[t][1] / 2)
+        paths.append((pts, edge_labels[k], True, False))
+
+    # Dummy vertices (long edges) can reach past the outermost boxes
+    width = max(
+        max((b[0] + b[2] / 2 for b in boxes), default=0.0),
+        max((px for pts, *_ in paths for px, _ in pts), default=0.0),
+    )
+    height = max(
+        max((b[1] + b[3] / 2 for b in boxes), default=0.0),
+        max((py for pts, *_ in paths for _, py in pts), default=0.0),
+    )
+    return Layout(width + _MARGIN, height + _MARGIN, boxes, paths)
+
+
+def _flowchart_layout(diagram: Diagram) -> Layout:
+    g = diagram.typed_data()
+    index: Dict[str, int] = {}
+    labels: List[str] = []
+    for node in g.nodes:
+        if node.id not in index:
+            index[node.id] = len(labels)
+            labels.append(node.label)
+    pairs, edge_labels = [], []
+    for e in g.edges:
+        # Unknown endpoints become nodes, as in Mermaid
+        for end in (e.source, e.target):
+            if end not in index:
+                index[end] = len(labels)
+                labels.append(end)
+        pairs.append((index[e.source], index[e.target]))
+        edge_labels.append(e.label)
+    return layered_layout(labels, pairs, edge_labels, (diagram.meta or {}).get("direction", "TD"))
+
+
+def _mind_map_layout(diagram: Diagram) -> Layout:
+    mm = diagram.typed_data()
+    index = {"root": 0, mm.root.id: 0}
+    labels, classes = [mm.root.label], ["root"]
+    for child in mm.children:
+        index.setdefault(child.id, len(labels))
+        labels.append(child.label)
+        classes.append("node")
+    pairs = [
+        (index[e.source], index[e.target])
+        for e in mm.edges
+        if e.source in index and e.target in index
+    ]
+    return layered_layout(labels, pairs, [None] * len(pairs), "LR", classes)
+
+
+def _timeline_layout(diagram: Diagram) -> Layout:
+    tl = diagram.typed_data()
+    title = (diagram.meta or {}).get("title")
+    lines = [(ev.time,) + _wrap(ev.label) for ev in tl.events]
+    sizes = [_box_size(l) for l in lines]
+    # Labels alternate above/below the axis, so only every other one can collide
+    xs: List[float] = []
+    for i, (w, _) in enumerate(sizes):
+        x = _MARGIN + w / 2
+        if i >= 1:
+            x = max(x, xs[i - 1] + 2 * _NODE_GAP)
+        if i >= 2:
+            x = max(x, xs[i - 2] + (sizes[i - 2][0] + w) / 2 + _NODE_GAP)
+        xs.append(x)
+    above = max((h for h in (s[1] for s in sizes[0::2])), default=0.0)
+    below = max((h for h in (s[1] for s in sizes[1::2])), default=0.0)
+    top = _MARGIN + (2 * _LINE_HEIGHT if title else 0)
+    axis_y = top + above + _STEM
+    end_x = max((x + w / 2 for x, (w, _) in zip(xs, sizes)), default=_MARGIN) + _MARGIN
+
+    boxes: List[Box] = []
+    paths: List[Path] = [([(_MARGIN / 2, axis_y), (end_x, axis_y)], None, True, False)]
+    for i, (x, (w, h)) in enumerate(zip(xs, sizes)):
+        side = -1 if i % 2 == 0 else 1
+        cy = axis_y + side * (_STEM + h / 2)
+        paths.append(([(x, axis_y), (x, cy - side * h / 2)], None, False, False))
+        boxes.append((x, axis_y, 10.0, 10.0, (), "dot"))
+        boxes.append((x, cy, w, h, lines[i], "event"))
+    height = axis_y + _STEM + below + _MARGIN
+    return Layout(end_x + _MARGIN, height, boxes, paths, title)
+
+
+_LAYOUTS = {
+    "flowchart": _flowchart_layout,
+    "mind_map": _mind_map_layout,
+    "timeline": _timeline_layout,
+}
+
+
+def layout_key(diagram: Diagram) -> str:
+    meta = diagram.meta or {}
+    return make_key(
+        "layout",
+        LAYOUT_VERSION,
+        diagram.type,
+        diagram.data,
+        meta.get("direction"),
+        meta.get("title"),
+    )
+
+
+def layout_diagram(diagram: Diagram, cache: LayoutCache = LAYOUT_CACHE) -> Layout:
+    """Layout of a validated diagram, from the layout cache when possible."""
+    if diagram.type not in _LAYOUTS:
+        raise ValueError(
+            f"SVG rendering supports {', '.join(_LAYOUTS)}; got {diagram.type}"
+        )
+    key = layout_key(diagram)
+    layout = cache.get(key)
+    if layout is None:
+        with stage_timer("layout"):
+            layout = _LAYOUTS[diagram.type](diagram)
+        cache.set(key, layout)
+    return layout
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.1f}"
+
+
+def _text(cx: float, cy: float, lines: Sequence[str], first_class: str = "") -> str:
+    top = cy - (len(lines) - 1) * _LINE_HEIGHT / 2
+    spans = []
+    for i, line in enumerate(lines):
+        cls = f' class="{first_class}"' if i == 0 and first_class else ""
+        spans.append(
+            f'<tspan x="{_fmt(cx)}" y="{_fmt(top + i * _LINE_HEIGHT)}"{cls}>{escape(line)}</tspan>'
+        )
+    return f"<text>{''.join(spans)}</text>"
+
+
+def svg_from_layout(layout: Layout) -> str:
+    w, h = _fmt(layout.width), _fmt(layout.height)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">',
+        f"<style>{_STYLE}</style>",
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" '
+        'markerHeight="8" orient="auto-start-reverse"><path d="M0,0L10,5L0,10z" fill="#333"/>'
+        "</marker></defs>",
+        '<rect width="100%" height="100%" fill="#fff"/>',
+    ]
+    if layout.title:
+        parts.append(
+            f'<text class="title" x="{_MARGIN}" y="{_MARGIN + _LINE_HEIGHT / 2}">'
+            f"{escape(layout.title)}</text>"
+        )
+    labels = []
+    for pts, label, arrow, curved in layout.paths:
+        coords = [f"{_fmt(px)},{_fmt(py)}" for px, py in pts]
+        d = f"M{coords[0]}C{' '.join(coords[1:])}" if curved else f"M{'L'.join(coords)}"
+        marker = ' marker-end="url(#arrow)"' if arrow else ""
+        parts.append(f'<path class="edge" d="{d}"{marker}/>')
+        if label:
+            if curved:
+                lx, ly = pts[1][0], (pts[1][1] + pts[2][1]) / 2
+            else:
+                mid = (len(pts) - 1) // 2
+                (ax, ay), (bx, by) = pts[mid], pts[mid + 1]
+                lx, ly = (ax + bx) / 2, (ay + by) / 2
+            labels.append((lx, ly, _wrap(label)))
+    for cx, cy, bw, bh, lines, cls in layout.boxes:
+        if cls == "dot":
+            parts.append(f'<circle class="dot" cx="{_fmt(cx)}" cy="{_fmt(cy)}" r="{_fmt(bw / 2)}"/>')
+            continue
+        rx = bh / 2 if cls == "root" else 5
+        parts.append(
+            f'<rect class={quoteattr(cls)} x="{_fmt(cx - bw / 2)}" y="{_fmt(cy - bh / 2)}" '
+            f'width="{_fmt(bw)}" height="{_fmt(bh)}" rx="{_fmt(rx)}"/>'
+        )
+        parts.append(_text(cx, cy, lines, "time" if cls == "event" else ""))
+    for lx, ly, lines in labels:
+        lw, lh = _box_size(lines)
+        lw, lh = lw - _PAD_X, lh - _PAD_Y
+        parts.append(
+            f'<rect class="label-bg" x="{_fmt(lx - lw / 2)}" y="{_fmt(ly - lh / 2)}" '
+            f'width="{_fmt(lw)}" height="{_fmt(lh)}"/>'
+        )
+        parts.append(_text(lx, ly, lines))
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+@timed_stage("svg")
+def to_svg(diagram: Diagram, cache: LayoutCache = LAYOUT_CACHE) -> str:
+    """SVG document for a validated diagram (flowchart, mind_map or timeline)."""
+    return svg_from_layout(layout_diagram(diagram, cache))
@@ -8,10 +8,27 @@ Copyright (c) 2023-2025 Saurabh Zinjad. All rights reserved | https://github.com
 -----------------------------------------------------------------------
 """
 
+import functools
+import inspect
 import time
 
 
 def measure_execution_time(func):
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.time()
+            result = await func(*args, **kwargs)
+            execution_time = time.time() - start_time
+            print(
+                f"Function {func.__name__} took {execution_time:.4f} seconds to execute"
+            )
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.time()
         result = func(*args, **kwargs)
@@ -0,0 +1,215 @@
+"""
+metrics.py
+
+Prometheus metrics for the generation pipeline, served by the API at /metrics.
+
+- t2v_stage_seconds{stage}: latency of intent, structure, ir, fused, validate,
+  partition, render
+- t2v_llm_calls_total / t2v_llm_tokens_total{stage, model[, direction]}: Bedrock usage
+- t2v_cache_requests_total{namespace, result}: result cache and stage memo hits/misses
+- t2v_validation_failures_total{type}, t2v_dropped_edges_total and
+  t2v_ir_repairs_total{fix}: validator and local repair outcomes
+- t2v_in_flight_requests{endpoint} and t2v_in_flight_generations: concurrency
+- t2v_intent_requests_total{path} and agreement counters: the intent fast path
+- t2v_escalations_total{stage}: stages retried on ESCALATION_MODEL_ID
+- t2v_singleflight_total{namespace, result}: identical in-flight calls coalesced
+- t2v_bedrock_concurrency_limit{model}, t2v_bedrock_retries_total{model, reason},
+  t2v_bedrock_shed_total{model, reason} and t2v_breaker_state{model}: the
+  resilience layer around Bedrock calls
+- t2v_hedge_calls_total{stage, result} and t2v_hedge_delay_seconds{stage}: hedged calls
+- t2v_speculations_total{result} and t2v_speculation_saved_seconds_total:
+  speculative structure extraction (stage intent_structure times both modes)
+- t2v_semantic_similarity, t2v_semantic_hit_quality, t2v_semantic_cache_entries:
+  the semantic cache
+- t2v_startup_seconds{phase}: warm-up and cold start to first served request
+
+prometheus_client is optional: without it every metric is a no-op and /metrics
+answers 503. Label children are cached per decorator, so the hot-path cost is a
+perf_counter pair and one histogram observe.
+"""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+
+    METRICS_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    METRICS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NoopMetric:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+
+if not METRICS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def generate_latest() -> bytes:
+        return b""
+
+
+# LLM stages take seconds, validate/render take microseconds to milliseconds
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "t2v_stage_seconds", "Pipeline stage latency.", ["stage"], buckets=STAGE_BUCKETS
+)
+LLM_CALLS = Counter("t2v_llm_calls_total", "Bedrock calls.", ["stage", "model"])
+LLM_TOKENS = Counter(
+    "t2v_llm_tokens_total", "Bedrock tokens.", ["stage", "model", "direction"]
+)
+CACHE_REQUESTS = Counter(
+    "t2v_cache_requests_total", "Cache lookups.", ["namespace", "result"]
+)
+VALIDATION_FAILURES = Counter(
+    "t2v_validation_failures_total", "Diagrams rejected by the validator.", ["type"]
+)
+IR_REPAIRS = Counter(
+    "t2v_ir_repairs_total", "Local IR repairs (services/repair.py).", ["fix"]
+)
+DROPPED_EDGES = Counter(
+    "t2v_dropped_edges_total", "Edges dropped by the validator for missing endpoints."
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "t2v_in_flight_requests", "HTTP requests being served.", ["endpoint"]
+)
+IN_FLIGHT_GENERATIONS = Gauge(
+    "t2v_in_flight_generations", "Workflow generations running (cache misses included)."
+)
+INTENT_REQUESTS = Counter(
+    "t2v_intent_requests_total", "Intent classifications by path.", ["path"]
+)
+INTENT_FAST_PATH_COMPARED = Counter(
+    "t2v_intent_fast_path_compared_total", "LLM classifications with a local guess."
+)
+INTENT_FAST_PATH_AGREED = Counter(
+    "t2v_intent_fast_path_agreed_total", "Local guesses that matched the LLM."
+)
+ESCALATIONS = Counter(
+    "t2v_escalations_total", "Stages retried on the escalation model.", ["stage"]
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "t2v_singleflight_total",
+    "Single-flight calls: leader, coalesced onto a running call, or cancelled orphan.",
+    ["namespace", "result"],
+)
+BEDROCK_CONCURRENCY_LIMIT = Gauge(
+    "t2v_bedrock_concurrency_limit", "Adaptive concurrency limit per model.", ["model"]
+)
+BEDROCK_RETRIES = Counter(
+    "t2v_bedrock_retries_total", "Bedrock calls retried, by cause.", ["model", "reason"]
+)
+BEDROCK_SHED = Counter(
+    "t2v_bedrock_shed_total",
+    "Bedrock calls refused: queue_full, circuit_open, deadline, retries_exhausted.",
+    ["model", "reason"],
+)
+BREAKER_STATE = Gauge(
+    "t2v_breaker_state", "Circuit breaker per model: 0 closed, 1 half-open, 2 open.", ["model"]
+)
+HEDGE_CALLS = Counter(
+    "t2v_hedge_calls_total",
+    "Hedge-eligible LLM calls: unhedged, skipped, primary_won, hedge_won.",
+    ["stage", "result"],
+)
+HEDGE_DELAY_SECONDS = Gauge(
+    "t2v_hedge_delay_seconds", "Current wait before hedging a call.", ["stage"]
+)
+SPECULATIONS = Counter(
+    "t2v_speculations_total",
+    "Speculative structure extractions: kept, or re-run on the real intent.",
+    ["result"],
+)
+SPECULATION_SAVED_SECONDS = Counter(
+    "t2v_speculation_saved_seconds_total",
+    "Estimated latency saved by kept speculative structure extractions.",
+)
+SEMANTIC_SIMILARITY = Histogram(
+    "t2v_semantic_similarity",
+    "Best semantic cache similarity per lookup.",
+    buckets=(0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0),
+)
+SEMANTIC_HIT_QUALITY = Histogram(
+    "t2v_semantic_hit_quality",
+    "Sampled semantic hits: agreement of the cached diagram with a fresh one (0..1).",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+SEMANTIC_CACHE_ENTRIES = Gauge("t2v_semantic_cache_entries", "Semantic cache entries.")
+STARTUP_SECONDS = Gauge("t2v_startup_seconds", "Startup timings.", ["phase"])
+
+
+def timed_stage(stage: str):
+    """Decorator recording the wrapped function's (or coroutine's) latency."""
+    histogram = STAGE_SECONDS.labels(stage)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Context-manager form of `timed_stage`, for part of a function."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_llm_usage(stage: str, model_id: str, usage) -> None:
+    LLM_CALLS.labels(stage, model_id).inc()
+    if usage:
+        LLM_TOKENS.labels(stage, model_id, "input").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels(stage, model_id, "output").inc(usage.get("output_tokens", 0))
@@ -0,0 +1,92 @@
+"""
+partial_json.py
+
+Incremental scanner for JSON that arrives token by token from an LLM stream.
+
+Each character is scanned once; whenever an object that sits directly inside one
+of the watched arrays (e.g. "nodes", "edges", "events") closes, it is decoded
+and returned, long before the whole document is complete.
+"""
+
+import json
+from typing import Iterable, List, Tuple
+
+
+class IncrementalJsonScanner:
+    """Feed text chunks, get back `(array_key, obj)` for every completed element."""
+
+    def __init__(self, array_keys: Iterable[str] = ("nodes", "edges", "events")):
+        self.array_keys = set(array_keys)
+        self._chunks: List[str] = []
+        # Only the text still needed (from the oldest open element or string) is
+        # buffered; `_base` is its offset in the whole stream
+        self._buffer = ""
+        self._base = 0
+        self._pos = 0
+        # Each frame: [kind ("{" or "["), start index, current key, array key,
+        # whether it is an element of a watched array]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        self._chunks.append(chunk)
+        self._buffer += chunk
+        buffer, base = self._buffer, self._base
+        found = []
+        for j, c in enumerate(chunk):
+            i = self._pos + j
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1 - base : i - base]
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == "{":
+                parent = self._stack[-1] if self._stack else None
+                element = parent is not None and parent[0] == "[" and parent[3] in self.array_keys
+                self._stack.append(["{", i, None, None, element])
+            elif c == "[":
+                parent = self._stack[-1] if self._stack else None
+                array_key = None
+                if parent is not None:
+                    array_key = parent[2] if parent[0] == "{" else parent[3]
+                self._stack.append(["[", i, None, array_key, False])
+            elif c == ":" and self._stack and self._stack[-1][0] == "{":
+                self._stack[-1][2] = self._last_string
+            elif c in "}]" and self._stack:
+                frame = self._stack.pop()
+                if c == "}" and frame[4]:
+                    try:
+                        obj = json.loads(buffer[frame[1] - base : i + 1 - base])
+                    except ValueError:
+                        continue
+                    if isinstance(obj, dict):
+                        found.append((self._stack[-1][3], obj))
+        self._pos += len(chunk)
+        self._trim()
+        return found
+
+    def _trim(self) -> None:
+        """Drop buffered text no open element or string can still need."""
+        keep = min((f[1] for f in self._stack if f[4]), default=self._pos)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if keep > self._base:
+            self._buffer = self._buffer[keep - self._base :]
+            self._base = keep
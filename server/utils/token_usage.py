@@ -0,0 +1,28 @@
+"""
+token_usage.py
+
+LangChain callback that feeds Bedrock call and token counts into utils/metrics.py.
+Attached per stage by `BedrockModel.for_stage`, so it sees both `invoke` and
+streamed calls (LangChain aggregates streamed chunks before `on_llm_end`).
+"""
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from server.utils.metrics import record_llm_usage
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    # Counter increments are cheap; don't hop to an executor thread for them
+    run_inline = True
+
+    def __init__(self, stage: str, model_id: str):
+        self.stage = stage
+        self.model_id = model_id
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                record_llm_usage(
+                    self.stage, self.model_id, getattr(message, "usage_metadata", None)
+                )
@@ -11,7 +11,7 @@ from typing import Dict
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers.json import JsonOutputParser
 from langchain.chains.llm import LLMChain
-from server.services.model_bedrock import BedrockModel
+from server.services.model_bedrock import get_bedrock_model
 from server.prompts.visual_structure_prompt import VISUAL_STRUCTURE_PROMPT
 from server.config.variables import MODEL_ID
 
@@ -20,7 +20,7 @@ class VisualStructureExtractor:
 
     def __init__(self, model_id=MODEL_ID):
         print(f"[VisualStructureExtractor] Initializing with model_id: {model_id}")
-        self.model = BedrockModel(model_id=model_id)
+        self.model = get_bedrock_model(model_id=model_id)
         self.parser = JsonOutputParser()
         self.prompt = PromptTemplate(
             template=VISUAL_STRUCTURE_PROMPT,
@@ -0,0 +1,50 @@
+"""
+Shared fixtures: every test runs offline against services/fake_llm.py, with the
+on-disk caches pointed at a throwaway directory. Settings are read at import
+time, so the environment is set here, before anything under server/ is imported.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="t2v-tests-"))
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("BEDROCK_CASSETTE_MODE", "off")
+
+import pytest
+
+from server.services.fake_llm import fake_model_factory
+from server.services.model_bedrock import registered_models, set_model_factory
+
+
+@pytest.fixture
+def fake_models():
+    """Install fake Bedrock models; call with fake_model_factory's arguments."""
+
+    def install(**kwargs):
+        set_model_factory(fake_model_factory(**kwargs))
+        return registered_models
+
+    yield install
+    set_model_factory(None)
+
+
+@pytest.fixture
+def workflow(fake_models):
+    from server.graphs.workflow import Workflow
+
+    fake_models()
+    return Workflow()
+
+
+@pytest.fixture
+def client(workflow, monkeypatch):
+    """TestClient for the API, serving `workflow`."""
+    from fastapi.testclient import TestClient
+
+    from server.apis import mermaid
+
+    monkeypatch.setattr(mermaid, "_workflow", workflow)
+    return TestClient(mermaid.app)
@@ -0,0 +1,81 @@
+import pytest
+
+from server.apis import mermaid
+from server.graphs import workflow as workflow_module
+from server.services.cache import ResultCache
+from server.services.cassette import CassetteMissError
+
+
+def test_batch_items_get_their_own_deadline(client, fake_models, monkeypatch):
+    # 10 items at concurrency 2 take ~5x one item's time: longer than the
+    # deadline as a whole, well within it per item
+    fake_models(latency=0.05)
+    monkeypatch.setattr(mermaid, "REQUEST_DEADLINE_SECONDS", 0.5)
+    monkeypatch.setattr(workflow_module, "REQUEST_DEADLINE_SECONDS", 0.5)
+    texts = [f"Process {i}: first collect data, then clean it, finally report" for i in range(10)]
+
+    response = client.post("/generate_mermaid/batch", json={"texts": texts, "concurrency": 2})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["error"] for r in results] == [None] * len(texts)
+
+
+@pytest.fixture
+def cached_client(client, workflow, tmp_path, monkeypatch):
+    """`client` with a real result cache holding one entry."""
+    workflow.cache = ResultCache(path=str(tmp_path / "results.sqlite3"), enabled=True)
+    workflow.cache.set("entry", {"mermaid": "flowchart TD", "diagram": {}})
+    return client
+
+
+@pytest.mark.parametrize("token", [None, "wrong"])
+def test_admin_cache_rejects_missing_or_wrong_token(cached_client, workflow, monkeypatch, token):
+    monkeypatch.setattr(mermaid, "ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": token} if token else {}
+
+    response = cached_client.request("DELETE", "/admin/cache", json={}, headers=headers)
+
+    assert response.status_code == 403
+    assert workflow.cache.get("entry") is not None
+
+
+def test_admin_cache_is_disabled_without_configured_token(cached_client, workflow, monkeypatch):
+    monkeypatch.setattr(mermaid, "ADMIN_TOKEN", None)
+
+    response = cached_client.request("DELETE", "/admin/cache", json={})
+
+    assert response.status_code == 403
+    assert workflow.cache.get("entry") is not None
+
+
+def test_admin_cache_clears_with_token(cached_client, workflow, monkeypatch):
+    monkeypatch.setattr(mermaid, "ADMIN_TOKEN", "secret")
+
+    response = cached_client.request(
+        "DELETE", "/admin/cache", json={}, headers={"X-Admin-Token": "secret"}
+    )
+
+    assert response.status_code == 200
+    assert workflow.cache.get("entry") is None
+
+
+def test_edit_unknown_cache_id_is_404(client):
+    response = client.post("/edit_diagram", json={"instruction": "add a step", "cache_id": "nope"})
+
+    assert response.status_code == 404
+
+
+def test_edit_cassette_miss_is_not_404(client, workflow):
+    async def miss(*args, **kwargs):
+        raise CassetteMissError("No cassette entry")
+
+    workflow.editor.aedit = miss
+    ir = {
+        "type": "flowchart",
+        "data": {"nodes": [{"id": "a", "label": "A"}, {"id": "b", "label": "B"}], "edges": []},
+    }
+
+    response = client.post("/edit_diagram", json={"instruction": "link a to b", "ir": ir})
+
+    assert response.status_code == 500
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from server.schemas.generation import GenerationOptions
+
+OPTIONS = GenerationOptions(mode="pipeline", speculative=False)
+TEXTS = [f"Request {i}: tickets are triaged, then routed to a team." for i in range(4)]
+
+
+def test_arun_returns_mermaid(workflow):
+    mermaid = asyncio.run(workflow.arun(TEXTS[0], OPTIONS))
+
+    assert mermaid.startswith("flowchart")
+
+
+def test_concurrent_requests_overlap(workflow, fake_models):
+    fake_models(latency=0.1)
+
+    async def concurrently():
+        start = time.perf_counter()
+        await asyncio.gather(*(workflow.arun(text, OPTIONS) for text in TEXTS))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(concurrently())
+
+    # 3 sequential calls of 0.1s each; one request at a time would take 4x that
+    assert elapsed < 2 * 0.3
+
+
+def test_generate_endpoint(client):
+    response = client.post("/generate_mermaid", json={"text": TEXTS[0]})
+    empty = client.post("/generate_mermaid", json={"text": "  "})
+
+    assert response.status_code == 200
+    assert response.json()["mermaid"].startswith("flowchart")
+    assert response.json()["cached"] is False
+    assert empty.status_code == 400
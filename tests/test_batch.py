@@ -0,0 +1,60 @@
+import asyncio
+
+from server.schemas.generation import GenerationOptions
+
+OPTIONS = GenerationOptions(mode="pipeline", speculative=False)
+TEXTS = [f"Order {i}: first check stock, then pack the items, then ship." for i in range(3)]
+
+
+def test_results_keep_input_order_and_duplicates_run_once(workflow, fake_models):
+    models = fake_models()
+    texts = [TEXTS[0], " ", TEXTS[1], TEXTS[0]]
+
+    results = asyncio.run(workflow.arun_many(texts, OPTIONS, concurrency=2))
+
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.error for r in results] == [None, "Text input required.", None, None]
+    assert results[0].cache_id == results[3].cache_id != results[2].cache_id
+    assert sum(model.llm.calls for model in models()) == 2 * 3
+
+
+def test_failing_item_does_not_fail_the_batch(workflow):
+    generate = workflow.agenerate
+
+    async def flaky(text, options=None):
+        if text == TEXTS[1]:
+            raise ValueError("rejected output")
+        return await generate(text, options)
+
+    workflow.agenerate = flaky
+    results = asyncio.run(workflow.arun_many(TEXTS, OPTIONS))
+
+    assert [r.error for r in results] == [None, "rejected output", None]
+    assert results[0].mermaid and results[2].mermaid
+
+
+def test_concurrency_is_bounded(workflow):
+    running, peak = 0, 0
+
+    async def tracked(text, options=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return await generate(text, options)
+
+    generate = workflow.agenerate
+    workflow.agenerate = tracked
+    texts = [f"Step {i}: do this, then that." for i in range(8)]
+    asyncio.run(workflow.arun_many(texts, OPTIONS, concurrency=3))
+
+    assert peak == 3
+
+
+def test_batch_endpoint(client):
+    response = client.post("/generate_mermaid/batch", json={"texts": TEXTS[:2] + [""]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [bool(r["mermaid"]) for r in results] == [True, True, False]
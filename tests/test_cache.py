@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from server.schemas.generation import GenerationOptions
+from server.services import cache as cache_module
+from server.services.cache import ResultCache, make_key, normalize_text, prompt_version
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.sqlite3")
+
+
+def test_keys_are_stable_and_normalized():
+    assert make_key("a", {"x": 1, "y": 2}) == make_key("a", {"y": 2, "x": 1})
+    assert make_key("a") != make_key("b")
+    assert normalize_text("  Hello \n  world ") == normalize_text("Hello world")
+
+
+def test_prompt_version_follows_the_schemas(tmp_path, monkeypatch):
+    prompts, schemas = tmp_path / "prompts", tmp_path / "schemas"
+    prompts.mkdir()
+    schemas.mkdir()
+    (prompts / "prompt.py").write_text("TEMPLATE = '{schema}'")
+    (schemas / "diagram.py").write_text("class Node: label: str")
+    monkeypatch.setattr(cache_module, "PROMPT_SOURCE_DIRS", (str(prompts), str(schemas)))
+    prompt_version.cache_clear()
+    try:
+        before = prompt_version()
+        prompt_version.cache_clear()
+        (schemas / "diagram.py").write_text("class Node: label: str; shape: str")
+        assert prompt_version() != before
+    finally:
+        prompt_version.cache_clear()
+
+
+def test_disk_tier_survives_a_new_instance(path):
+    ResultCache(path=path, enabled=True).set("k", {"mermaid": "flowchart TD"})
+
+    assert ResultCache(path=path, enabled=True).get("k") == {"mermaid": "flowchart TD"}
+
+
+def test_namespaces_and_invalidation(path):
+    results = ResultCache(path=path, enabled=True)
+    memo = ResultCache(namespace="intent", path=path, enabled=True)
+    results.set("k", 1)
+    memo.set("k", 2)
+
+    assert results.invalidate() == 1
+
+    assert ResultCache(path=path, enabled=True).get("k") is None
+    assert ResultCache(namespace="intent", path=path, enabled=True).get("k") == 2
+
+
+def test_memory_tier_is_bounded(path):
+    cache = ResultCache(path=path, enabled=True, max_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.get("a") == "a"
+
+
+def test_expired_entries_are_misses(path):
+    cache = ResultCache(path=path, enabled=True, memory_ttl=-1, disk_ttl=-1)
+    cache.set("k", 1)
+
+    assert cache.get("k") is None
+
+
+def test_disabled_cache_stores_nothing(path):
+    cache = ResultCache(path=path, enabled=False)
+    cache.set("k", 1)
+
+    assert cache.get("k") is None
+
+
+def test_workflow_serves_repeats_from_cache(workflow, fake_models, path):
+    models = fake_models()
+    workflow.cache = ResultCache(path=path, enabled=True)
+    options = GenerationOptions(mode="pipeline", speculative=False)
+    text = "First collect the data, then clean it, finally publish the report."
+
+    first = asyncio.run(workflow.agenerate(text, options))
+    calls = sum(model.llm.calls for model in models())
+    assert calls > 0
+    second = asyncio.run(workflow.agenerate("  " + text.replace(" ", "  "), options))
+
+    assert (first.cached, second.cached) == (False, True)
+    assert second.cache_id == first.cache_id
+    assert second.mermaid == first.mermaid
+    assert sum(model.llm.calls for model in models()) == calls
+
+
+def test_edit_cache_ignores_semantic_threshold(workflow, fake_models, path):
+    models = fake_models()
+    workflow.cache = ResultCache(path=path, enabled=True)
+    options = GenerationOptions(mode="pipeline", speculative=False)
+    base = asyncio.run(workflow.agenerate("First collect the data, then publish it.", options))
+
+    first = asyncio.run(workflow.aedit("add a review step", cache_id=base.cache_id, options=options))
+    calls = sum(model.llm.calls for model in models())
+    options = options.model_copy(update={"semantic_threshold": 0.99})
+    second = asyncio.run(workflow.aedit("add a review step", cache_id=base.cache_id, options=options))
+
+    assert (first.cached, second.cached) == (False, True)
+    assert second.cache_id == first.cache_id
+    assert sum(model.llm.calls for model in models()) == calls
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from server.services.cassette import CassetteChatModel, CassetteMissError, CassetteStore
+from server.services.fake_llm import FakeChatModel
+
+PROMPT = "You are a diagram IR generator. Input: {'type': 'flowchart'}\nOutput:"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CassetteStore(str(tmp_path))
+
+
+def cassette(store, mode, on_miss="error", inner=None):
+    def build():
+        if inner is None:
+            raise AssertionError("replay must not create the real model")
+        return inner
+
+    return CassetteChatModel(
+        model_id="model-a", mode=mode, on_miss=on_miss, store=store, inner_factory=build
+    )
+
+
+def test_record_then_replay_offline(store):
+    inner = FakeChatModel(responses={})
+    recorded = cassette(store, "record", inner=inner).invoke(PROMPT).content
+
+    replayed = cassette(store, "replay").invoke(PROMPT).content
+    replayed_async = asyncio.run(cassette(store, "replay").ainvoke(PROMPT)).content
+
+    assert replayed == replayed_async == recorded
+    assert inner.calls == 1
+
+
+def test_entries_are_per_model(store):
+    cassette(store, "record", inner=FakeChatModel()).invoke(PROMPT)
+    other = CassetteChatModel(model_id="model-b", mode="replay", on_miss="error", store=store)
+
+    with pytest.raises(CassetteMissError):
+        other.invoke(PROMPT)
+
+
+def test_replay_miss_policies(store):
+    with pytest.raises(CassetteMissError):
+        cassette(store, "replay").invoke(PROMPT)
+
+    synthetic = cassette(store, "replay", on_miss="synthetic").invoke(PROMPT).content
+    assert '"type": "flowchart"' in synthetic
+
+    inner = FakeChatModel()
+    cassette(store, "replay", on_miss="passthrough", inner=inner).invoke(PROMPT)
+    cassette(store, "replay").invoke(PROMPT)
+    assert inner.calls == 1
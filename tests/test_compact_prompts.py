@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from server.agents.ir_generation_agent import IRGenerator, typed_ir_prompt
+from server.prompts.ir_generation_prompt import IR_TYPE_EXAMPLES
+from server.schemas.compact import compact_ir_schema
+from server.schemas.diagram import TYPE_DATA_MODELS
+from server.services.validator import validate
+
+
+def test_compact_schema():
+    assert compact_ir_schema("timeline") == (
+        '{"type": "timeline", "meta": {"title"?: string}, '
+        '"data": {"events": [{"id": string, "label": string, "time": string}]}}'
+    )
+    assert '"props"' not in compact_ir_schema("flowchart")
+
+
+@pytest.mark.parametrize("diagram_type", sorted(TYPE_DATA_MODELS))
+def test_examples_are_valid_ir(diagram_type):
+    diagram = validate(json.loads(IR_TYPE_EXAMPLES[diagram_type]))
+
+    assert diagram.type == diagram_type
+    assert diagram.repairs == []
+
+
+def test_typed_prompts_are_shorter(fake_models):
+    fake_models()
+    generator = IRGenerator()
+    structure = {"visual_structure": {"type": "flowchart", "nodes": []}}
+    generic = generator.prompt.format(**structure)
+
+    for diagram_type in TYPE_DATA_MODELS:
+        typed = typed_ir_prompt(diagram_type).format(**structure)
+        assert len(typed) < len(generic)
+
+
+def test_chain_for_falls_back_to_the_generic_chain(fake_models):
+    fake_models()
+    generator = IRGenerator(typed_prompts=True)
+
+    assert generator.chain_for("timeline") is generator.typed_chains["timeline"]
+    assert generator.chain_for(None) is generator.chain
+    assert generator.chain_for("venn", text=True) is generator.text_chain
+
+    untyped = IRGenerator(typed_prompts=False)
+    assert untyped.chain_for("timeline") is untyped.chain
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from server.agents.ir_generation_agent import typed_ir_prompt
+from server.benchmarks.run import compare
+from server.prompts.edit_prompt import EDIT_PATCH_PROMPT
+from server.schemas.diagram import TYPE_DATA_MODELS
+from server.services.fake_llm import (
+    FakeChatModel,
+    FakeThrottlingError,
+    detect_stage,
+    prompt_key,
+)
+
+
+def test_every_production_prompt_is_recognized(workflow):
+    prompts = {
+        "intent": [workflow.intent.prompt],
+        "structure": [workflow.ir_generator.visual_extractor.prompt],
+        "ir": [workflow.ir_generator.prompt] + [typed_ir_prompt(t) for t in TYPE_DATA_MODELS],
+        "fused": [workflow.fused.prompt],
+    }
+
+    for stage, templates in prompts.items():
+        for prompt in templates:
+            assert detect_stage(prompt.template) == stage
+    assert detect_stage(EDIT_PATCH_PROMPT) == "edit"
+
+
+def test_recorded_responses_win():
+    model = FakeChatModel(responses={prompt_key("hi"): "hello"})
+
+    assert model.invoke("hi").content == "hello"
+    assert model.invoke("other").content == "{}"
+    assert model.calls == 2
+
+
+def test_latency_per_stage():
+    model = FakeChatModel(latency={"intent": 0.1, "ir": 0.3})
+
+    assert model._delay("... diagram/visual intent extraction ...") == 0.1
+    assert model._delay("... diagram IR generator ...") == 0.3
+    assert model._delay("unrelated") == 0.0
+
+
+def test_calls_beyond_max_concurrency_are_throttled():
+    model = FakeChatModel(latency=0.05, max_concurrency=1)
+
+    def call(_):
+        try:
+            model.invoke("hi")
+            return "ok"
+        except FakeThrottlingError:
+            return "throttled"
+
+    with ThreadPoolExecutor(4) as pool:
+        outcomes = list(pool.map(call, range(4)))
+
+    assert outcomes.count("ok") >= 1
+    assert outcomes.count("throttled") == model.throttled >= 1
+    assert model.in_flight == 0
+
+
+@pytest.mark.parametrize(
+    "current, regressed",
+    [
+        ({"e2e.p50_ms": 110, "tp.items_per_s": 95, "tp.errors": 0}, False),
+        ({"e2e.p50_ms": 130, "tp.items_per_s": 100, "tp.errors": 0}, True),
+        ({"e2e.p50_ms": 100, "tp.items_per_s": 70, "tp.errors": 0}, True),
+        ({"e2e.p50_ms": 100, "tp.items_per_s": 100, "tp.errors": 1}, True),
+    ],
+)
+def test_baseline_comparison(current, regressed):
+    baseline = {"e2e.p50_ms": 100, "tp.items_per_s": 100, "tp.errors": 0}
+
+    assert bool(compare(current, baseline, threshold=0.2)) == regressed
@@ -0,0 +1,49 @@
+import asyncio
+
+from server.schemas.generation import GenerationOptions
+
+TEXT = "First collect the data, then clean it, finally publish the report."
+FUSED = GenerationOptions(mode="fused", speculative=False)
+
+
+def test_fused_mode_is_one_call(workflow, fake_models):
+    models = fake_models()
+
+    result = asyncio.run(workflow.agenerate(TEXT, FUSED))
+
+    assert result.meta["path"] == "fused"
+    assert result.mermaid.startswith("flowchart")
+    assert sum(model.llm.calls for model in models()) == 1
+
+
+def reject_fused(workflow):
+    async def rejected(text, model_id=None):
+        raise ValueError("not a diagram")
+
+    async def rejected_stream(text, model_id=None):
+        yield '{"type": "venn"}'
+
+    workflow.fused.agenerate = rejected
+    workflow.fused.astream_text = rejected_stream
+
+
+def test_rejected_output_falls_back_to_the_pipeline(workflow):
+    reject_fused(workflow)
+
+    result = asyncio.run(workflow.agenerate(TEXT, FUSED))
+
+    assert result.meta["path"] == "fused_fallback"
+    assert result.mermaid.startswith("flowchart")
+
+
+def test_stream_reports_the_fallback(workflow):
+    reject_fused(workflow)
+
+    async def collect():
+        return [event async for event in workflow.astream(TEXT, FUSED)]
+
+    events = asyncio.run(collect())
+
+    names = [event["event"] for event in events if event["event"] != "partial"]
+    assert names == ["fallback", "intent", "structure", "ir", "validated", "rendered"]
+    assert events[-1]["data"]["path"] == "fused_fallback"
@@ -0,0 +1,88 @@
+import asyncio
+
+from server.services.hedging import Hedger, LatencyTracker
+
+
+def warmed(calls=20, **kwargs) -> Hedger:
+    """A hedger that has seen `calls` unhedged 10 ms calls."""
+    hedger = Hedger("ir", min_samples=5, min_delay=0.01, **kwargs)
+    for _ in range(calls):
+        hedger.latency.record(0.01)
+        hedger._count("unhedged")
+    return hedger
+
+
+def sleeper(seconds, value, log=None):
+    async def call():
+        if log is not None:
+            log.append(value)
+        await asyncio.sleep(seconds)
+        return value
+
+    return call
+
+
+def test_percentile():
+    tracker = LatencyTracker(window=200)
+    for ms in range(101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(50) == 0.05
+    assert tracker.percentile(95) == 0.095
+
+
+def test_no_hedge_before_min_samples():
+    hedger = Hedger("ir", min_samples=5)
+    log = []
+    assert hedger.delay() is None
+    result = asyncio.run(hedger.run(sleeper(0.05, "primary"), sleeper(0, "hedge", log)))
+    assert result == "primary" and log == []
+    assert hedger.counts["unhedged"] == 1
+
+
+def test_slow_primary_is_beaten_by_the_hedge():
+    hedger = warmed()
+    result = asyncio.run(hedger.run(sleeper(1.0, "primary"), sleeper(0.01, "hedge")))
+    assert result == "hedge"
+    assert hedger.counts["hedge_won"] == 1
+
+
+def test_fast_primary_sends_no_hedge():
+    hedger = warmed()
+    log = []
+    result = asyncio.run(hedger.run(sleeper(0, "primary"), sleeper(0, "hedge", log)))
+    assert result == "primary" and log == []
+
+
+def test_failed_hedge_does_not_decide_the_race():
+    hedger = warmed()
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    result = asyncio.run(hedger.run(sleeper(0.05, "primary"), failing))
+    assert result == "primary"
+    assert hedger.counts["primary_won"] == 1
+
+
+def test_hedges_stay_within_budget():
+    hedger = warmed(calls=200, max_rate=0.01)
+    log = []
+
+    async def main():
+        for _ in range(10):
+            await hedger.run(sleeper(0.03, "primary"), sleeper(0, "hedge", log))
+
+    asyncio.run(main())
+    # Hedges may make up at most 1% of the ~200 recent calls
+    assert len(log) == 2
+    assert hedger.counts["skipped"] == 8
+
+
+def test_no_hedge_when_target_has_no_capacity():
+    hedger = warmed()
+    log = []
+    result = asyncio.run(
+        hedger.run(sleeper(0.03, "primary"), sleeper(0, "hedge", log), can_hedge=lambda: False)
+    )
+    assert result == "primary" and log == []
+    assert hedger.counts["skipped"] == 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from server.agents.local_intent_agent import LocalIntentClassifier
+
+OBVIOUS = {
+    "timeline": "Timeline of the Apollo program: 1961 Kennedy speech, 1967 Apollo 1 fire, "
+    "1969 Moon landing, 1972 last mission.",
+    "flowchart": "Login process: first enter the password. If it is wrong then show an error, "
+    "otherwise open the dashboard. Finally log the event.",
+    "mind_map": "Mind map of machine learning: the main concepts, types of models and topics.",
+    "table": "Compare PostgreSQL vs MySQL in a table with columns for price, speed and licensing.",
+}
+
+
+@pytest.mark.parametrize("diagram_type, text", OBVIOUS.items())
+def test_obvious_inputs_are_confident(diagram_type, text):
+    result = LocalIntentClassifier().classify(text)
+
+    assert result.diagram_type == diagram_type
+    assert result.confidence >= 0.9
+
+
+def test_no_evidence_is_uniform():
+    classifier = LocalIntentClassifier()
+
+    assert set(classifier.score("A story about a cat.").values()) == {0.0}
+    assert classifier.classify("A story about a cat.").confidence == 0.25
+
+
+def test_feature_matches_are_capped():
+    years = " ".join(str(year) for year in range(1900, 2000))
+
+    assert LocalIntentClassifier().score(years)["timeline"] == pytest.approx(0.8 * 6)
+
+
+@pytest.fixture
+def intent(fake_models):
+    from server.agents.text_intent_agent import IntentClassifier
+
+    models = fake_models()
+    return IntentClassifier(), models
+
+
+def test_confident_inputs_skip_the_model(intent):
+    classifier, models = intent
+
+    result = asyncio.run(classifier.aclassify(OBVIOUS["timeline"]))
+
+    assert result.diagram_type == "timeline"
+    assert sum(model.llm.calls for model in models()) == 0
+    assert classifier.stats.snapshot()["fast_path"] == 1
+
+
+def test_uncertain_inputs_go_to_the_model(intent):
+    classifier, models = intent
+
+    asyncio.run(classifier.aclassify("A story about a cat."))
+
+    stats = classifier.stats.snapshot()
+    assert sum(model.llm.calls for model in models()) == 1
+    assert (stats["llm"], stats["compared"]) == (1, 0)
@@ -0,0 +1,57 @@
+import io
+
+from server.services.validator import validate
+from server.tools.mermaid import IdAllocator, sanitize_id, to_mermaid, write_mermaid
+
+
+def test_sanitize_id():
+    assert sanitize_id("a b-c") == "a_b_c"
+    assert sanitize_id("1st") == "node_1st"
+    assert sanitize_id("end") == "end_node"
+    assert sanitize_id("") == "node_empty"
+
+
+def test_colliding_ids_get_suffixes():
+    node_id = IdAllocator()
+    ids = [node_id(raw) for raw in ("a b", "a-b", "a_b", "a b")]
+
+    assert ids == ["a_b", "a_b_2", "a_b_3", "a_b"]
+
+
+def test_suffix_does_not_steal_a_later_literal_id():
+    node_id = IdAllocator()
+
+    assert node_id("x y") == "x_y"
+    assert node_id("x-y") == "x_y_2"
+    assert node_id("x_y_2") == "x_y_2_2"
+
+
+def test_colliding_nodes_stay_distinct_in_the_output():
+    diagram = validate(
+        {
+            "type": "flowchart",
+            "data": {
+                "nodes": [{"id": "a b", "label": "Space"}, {"id": "a-b", "label": "Dash"}],
+                "edges": [{"source": "a b", "target": "a-b", "label": "to"}],
+            },
+        }
+    )
+
+    assert to_mermaid(diagram).splitlines() == [
+        "flowchart TD",
+        'a_b["Space"]',
+        'a_b_2["Dash"]',
+        'a_b --"to"--> a_b_2',
+    ]
+
+
+def test_write_mermaid_matches_to_mermaid():
+    diagram = validate(
+        {"type": "timeline", "data": {"events": [{"label": "Launch", "time": "1969"}]}}
+    )
+    stream = io.StringIO()
+
+    lines = write_mermaid(diagram, stream)
+
+    assert stream.getvalue() == to_mermaid(diagram)
+    assert lines == 2
@@ -0,0 +1,43 @@
+import pytest
+
+from server.utils.metrics import METRICS_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not METRICS_AVAILABLE, reason="prometheus_client not installed")
+
+TEXT = "Support tickets arrive by email, get triaged, and are routed to a team."
+
+
+def sample(body, name, **labels):
+    """Value of one sample in Prometheus text format (0 when absent)."""
+    wanted = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    for line in body.splitlines():
+        if line.startswith("#") or " " not in line:
+            continue
+        series, value = line.rsplit(" ", 1)
+        metric, _, rest = series.partition("{")
+        found = ",".join(sorted(rest.rstrip("}").split(","))) if rest else ""
+        if metric == name and found == wanted:
+            return float(value)
+    return 0.0
+
+
+def test_generation_shows_up_in_metrics(client):
+    before = client.get("/metrics").text
+
+    response = client.post(
+        "/generate_mermaid", json={"text": TEXT, "mode": "pipeline", "speculative": False}
+    )
+    after = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert after.headers["content-type"].startswith("text/plain")
+    for stage in ("structure", "ir", "validate", "render"):
+        name = "t2v_stage_seconds_count"
+        assert sample(after.text, name, stage=stage) == sample(before, name, stage=stage) + 1
+    assert sample(after.text, "t2v_in_flight_generations") == 0
+
+
+def test_stats(client):
+    body = client.get("/stats").json()
+
+    assert set(body) == {"intent_fast_path", "speculation", "hedging"}
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from server.config.variables import STAGE_MODELS
+from server.services.model_bedrock import get_bedrock_model
+
+
+def test_one_shared_model_per_id(fake_models):
+    models = fake_models()
+
+    with ThreadPoolExecutor(8) as pool:
+        instances = list(pool.map(lambda _: get_bedrock_model("model-a"), range(32)))
+
+    assert all(instance is instances[0] for instance in instances)
+    assert get_bedrock_model("model-a", region="eu-west-1") is not instances[0]
+    assert len(models()) == 2
+
+
+def test_workflow_agents_share_their_clients(fake_models):
+    from server.graphs.workflow import Workflow
+
+    models = fake_models()
+    Workflow()
+    Workflow()
+
+    assert {model.model_id for model in models()} == set(STAGE_MODELS.values())
+    assert len(models()) == len(set(STAGE_MODELS.values()))
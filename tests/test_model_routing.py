@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from server.config.variables import STAGE_MODELS
+from server.schemas.generation import GenerationOptions
+
+TEXT = "Support tickets arrive by email, get triaged, and are routed to a team."
+
+
+def calls_by_model(models):
+    counts = {}
+    for model in models():
+        counts[model.model_id] = counts.get(model.model_id, 0) + model.llm.calls
+    return counts
+
+
+def test_stage_override_routes_only_that_stage(workflow, fake_models):
+    models = fake_models()
+    small, large = STAGE_MODELS["intent"], STAGE_MODELS["ir"]
+    options = GenerationOptions(mode="pipeline", speculative=False)
+
+    def run(options):
+        before = calls_by_model(models)
+        asyncio.run(workflow.agenerate(TEXT, options))
+        after = calls_by_model(models)
+        return {m: after.get(m, 0) - before.get(m, 0) for m in (small, large)}
+
+    default = run(options)
+    routed = run(options.model_copy(update={"models": {"ir": small}}))
+
+    assert sum(default.values()) == sum(routed.values()) == 3
+    assert routed[small] == default[small] + 1
+    assert routed[large] == default[large] - 1
+
+
+def test_unknown_stage_or_model_is_rejected():
+    with pytest.raises(ValidationError):
+        GenerationOptions(models={"ir": "not-an-allowed-model"})
+    with pytest.raises(ValidationError):
+        GenerationOptions(models={"render": STAGE_MODELS["ir"]})
+
+
+def test_defaults_fill_unset_stages():
+    options = GenerationOptions(models={"ir": STAGE_MODELS["intent"]})
+
+    assert options.stage_models() == {**STAGE_MODELS, "ir": STAGE_MODELS["intent"]}
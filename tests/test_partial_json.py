@@ -0,0 +1,59 @@
+import json
+
+from server.utils.partial_json import IncrementalJsonScanner
+
+DOCUMENT = json.dumps(
+    {
+        "type": "flowchart",
+        "data": {
+            "nodes": [
+                {"id": "a", "label": "Start {here}", "meta": {"shape": "round"}},
+                {"id": "b", "label": 'Say "hi" ]'},
+            ],
+            "edges": [{"source": "a", "target": "b", "label": "next"}],
+            "tags": [{"ignored": True}],
+        },
+    }
+)
+
+
+def scan(chunks):
+    scanner = IncrementalJsonScanner()
+    found = [item for chunk in chunks for item in scanner.feed(chunk)]
+    return scanner, found
+
+
+def test_yields_each_watched_element_once():
+    _, found = scan([DOCUMENT])
+
+    data = json.loads(DOCUMENT)["data"]
+    assert found == [("nodes", n) for n in data["nodes"]] + [("edges", data["edges"][0])]
+
+
+def test_chunking_does_not_change_the_result():
+    _, whole = scan([DOCUMENT])
+
+    for size in (1, 3, 16):
+        scanner, found = scan([DOCUMENT[i : i + size] for i in range(0, len(DOCUMENT), size)])
+        assert found == whole
+        assert scanner.text == DOCUMENT
+
+
+def test_elements_are_yielded_as_soon_as_they_close():
+    scanner = IncrementalJsonScanner()
+    head, _, tail = DOCUMENT.partition('{"id": "b"')
+
+    assert [key for key, _ in scanner.feed(head)] == ["nodes"]
+    assert [key for key, _ in scanner.feed('{"id": "b"' + tail)] == ["nodes", "edges"]
+
+
+def test_buffer_holds_only_the_open_element():
+    nodes = [{"id": f"n{i}", "label": "x" * 50} for i in range(500)]
+    document = json.dumps({"type": "flowchart", "data": {"nodes": nodes}})
+    scanner = IncrementalJsonScanner()
+
+    for i in range(0, len(document), 7):
+        scanner.feed(document[i : i + 7])
+        assert len(scanner._buffer) < 200
+
+    assert scanner.text == document
@@ -0,0 +1,64 @@
+from itertools import combinations
+
+from server.services.partition import cluster_diagram, paginate_diagram
+from server.services.validator import validate
+from server.tools.mermaid import to_mermaid
+
+
+def cliques(count=3, size=5):
+    """`count` fully connected groups of `size` nodes, chained by one edge each."""
+    groups = [[f"g{g}_{i}" for i in range(size)] for g in range(count)]
+    edges = [{"source": a, "target": b} for group in groups for a, b in combinations(group, 2)]
+    edges += [{"source": groups[g][-1], "target": groups[g + 1][0]} for g in range(count - 1)]
+    nodes = [{"id": n, "label": n.upper()} for group in groups for n in group]
+    diagram = validate({"type": "flowchart", "data": {"nodes": nodes, "edges": edges}})
+    return diagram, groups
+
+
+def test_small_diagrams_are_unchanged():
+    diagram, _ = cliques(count=1)
+
+    assert cluster_diagram(diagram, 5) is diagram
+    assert paginate_diagram(diagram, 5) == (diagram, [])
+
+
+def test_clusters_follow_communities_under_the_cap():
+    diagram, groups = cliques()
+
+    clustered = cluster_diagram(diagram, 6)
+
+    clusters = clustered.meta["clusters"]
+    assert [c["nodes"] for c in clusters] == groups
+    assert [c["id"] for c in clusters] == ["cluster_0", "cluster_1", "cluster_2"]
+    assert to_mermaid(clustered).count("subgraph ") == 3
+
+
+def test_partition_is_deterministic():
+    diagram, _ = cliques(count=4, size=4)
+
+    first = cluster_diagram(diagram, 5).meta["clusters"]
+
+    assert cluster_diagram(diagram, 5).meta["clusters"] == first
+    assert all(len(c["nodes"]) <= 5 for c in first)
+    clustered = sorted(n for c in first for n in c["nodes"])
+    assert clustered == sorted(n.id for n in diagram.typed_data().nodes)
+
+
+def test_pages_link_through_the_overview():
+    diagram, groups = cliques()
+
+    overview, pages = paginate_diagram(diagram, 6)
+
+    assert overview.meta["pages"] == ["cluster_0", "cluster_1", "cluster_2"]
+    assert [(e["source"], e["target"]) for e in overview.data["edges"]] == [
+        ("cluster_0", "cluster_1"),
+        ("cluster_1", "cluster_2"),
+    ]
+    middle = pages[1]
+    assert middle.meta["page"] == "cluster_1"
+    ids = [n["id"] for n in middle.data["nodes"]]
+    assert ids == groups[1] + ["page_cluster_0", "page_cluster_2"]
+    assert {"source": "page_cluster_0", "target": "g1_0"} in middle.data["edges"]
+    assert {"source": "g1_4", "target": "page_cluster_2"} in middle.data["edges"]
+    for page in pages:
+        validate(page)
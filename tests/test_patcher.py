@@ -0,0 +1,108 @@
+import pytest
+
+from server.schemas.patch import DiagramPatch
+from server.services.patcher import apply_patch
+from server.services.validator import validate
+
+FLOWCHART = {
+    "type": "flowchart",
+    "data": {
+        "nodes": [
+            {"id": "a", "label": "Collect"},
+            {"id": "b", "label": "Clean"},
+            {"id": "c", "label": "Report"},
+        ],
+        "edges": [{"source": "a", "target": "b"}, {"source": "b", "target": "c"}],
+    },
+}
+
+
+def patch(*ops, **meta):
+    return DiagramPatch(ops=list(ops), meta=meta)
+
+
+def test_insert_a_step_between_two_nodes():
+    base = validate(FLOWCHART)
+
+    patched, applied = apply_patch(
+        base,
+        patch(
+            {"op": "add_node", "id": "v", "label": "Validate", "after": "b"},
+            {"op": "remove_edge", "source": "b", "target": "c"},
+            {"op": "add_edge", "source": "Clean", "target": "v"},
+            {"op": "add_edge", "source": "v", "target": "c", "label": "ok"},
+            direction="LR",
+        ),
+    )
+
+    assert [n["id"] for n in patched["data"]["nodes"]] == ["a", "b", "v", "c"]
+    assert patched["data"]["edges"] == [
+        {"source": "a", "target": "b"},
+        {"source": "b", "target": "v"},
+        {"source": "v", "target": "c", "label": "ok"},
+    ]
+    assert patched["meta"]["direction"] == "LR"
+    assert len(applied) == 4
+    assert validate(patched).repairs == []
+    # The base diagram is not modified
+    assert len(base.data["nodes"]) == 3
+
+
+def test_remove_node_drops_its_edges():
+    patched, applied = apply_patch(
+        validate(FLOWCHART), patch({"op": "remove_node", "id": "Clean"})
+    )
+
+    assert [n["id"] for n in patched["data"]["nodes"]] == ["a", "c"]
+    assert patched["data"]["edges"] == []
+    assert applied == ["remove_node b (+2 edges)"]
+
+
+def test_add_existing_node_updates_it():
+    patched, applied = apply_patch(
+        validate(FLOWCHART), patch({"op": "add_node", "id": "a", "label": "Gather"})
+    )
+
+    assert patched["data"]["nodes"][0] == {"id": "a", "label": "Gather"}
+    assert applied == ["add_node a: exists, updated instead"]
+
+
+def test_timeline_events_and_mind_map_root():
+    timeline = validate(
+        {"type": "timeline", "data": {"events": [{"id": "e0", "label": "Launch", "time": "1969"}]}}
+    )
+    patched, _ = apply_patch(
+        timeline, patch({"op": "update_node", "id": "Launch", "time": "July 1969"})
+    )
+    assert patched["data"]["events"][0]["time"] == "July 1969"
+
+    mind_map = validate({"type": "mind_map", "data": {"root": {"id": "r", "label": "Topic"}}})
+    patched, _ = apply_patch(
+        mind_map, patch({"op": "update_node", "id": "root", "label": "Subject"})
+    )
+    assert patched["data"]["root"] == {"id": "r", "label": "Subject"}
+
+
+@pytest.mark.parametrize(
+    "diagram, op",
+    [
+        (FLOWCHART, {"op": "update_node", "id": "missing", "label": "x"}),
+        (FLOWCHART, {"op": "remove_edge", "source": "a", "target": "c"}),
+        (FLOWCHART, {"op": "add_edge", "source": "a"}),
+        (
+            {"type": "timeline", "data": {"events": [{"id": "e0", "label": "L", "time": "1"}]}},
+            {"op": "add_edge", "source": "e0", "target": "e0"},
+        ),
+        (
+            {"type": "table", "data": {"headers": ["A"], "rows": [["1"]]}},
+            {"op": "remove_node", "id": "A"},
+        ),
+        (
+            {"type": "mind_map", "data": {"root": {"id": "r", "label": "T"}}},
+            {"op": "remove_node", "id": "r"},
+        ),
+    ],
+)
+def test_invalid_operations_raise(diagram, op):
+    with pytest.raises(ValueError):
+        apply_patch(validate(diagram), patch(op))
@@ -0,0 +1,107 @@
+import pytest
+
+from server.services.repair import repair_ir
+from server.services.validator import validate
+
+
+def fixes(report):
+    return [entry["fix"] for entry in report]
+
+
+def test_well_formed_ir_is_left_alone():
+    ir = {
+        "type": "flowchart",
+        "data": {"nodes": [{"id": "a", "label": "A"}], "edges": []},
+        "meta": {},
+    }
+
+    repaired, report = repair_ir(ir)
+
+    assert report == []
+    assert repaired == ir
+
+
+def test_type_inferred_and_data_moved_under_data():
+    repaired, report = repair_ir({"events": [{"id": "e0", "label": "Launch", "time": "1969"}]})
+
+    assert repaired["type"] == "timeline"
+    assert repaired["data"]["events"][0]["label"] == "Launch"
+    assert fixes(report) == ["moved_data", "inferred_type"]
+
+
+def test_flowchart_ids_and_edges_repaired():
+    ir = {
+        "type": "flowchart",
+        "data": {
+            "nodes": [
+                {"label": "Start"},
+                {"id": "x", "label": "One"},
+                {"id": "x", "label": "Two"},
+            ],
+            "edges": [
+                {"source": "Start", "target": "x"},
+                {"source": "x", "target": "Finish"},
+                {"source": "x"},
+            ],
+        },
+    }
+
+    repaired, report = repair_ir(ir)
+
+    ids = [n["id"] for n in repaired["data"]["nodes"]]
+    assert ids == ["Start", "x", "x_2", "Finish"]
+    assert repaired["data"]["edges"] == [
+        {"source": "Start", "target": "x"},
+        {"source": "x", "target": "Finish"},
+    ]
+    assert fixes(report) == [
+        "missing_node_id",
+        "duplicate_node_id",
+        "created_node",
+        "dropped_edge",
+    ]
+
+
+def test_dangling_endpoint_remapped_by_label():
+    ir = {
+        "type": "flowchart",
+        "data": {
+            "nodes": [{"id": "a", "label": "Collect data"}, {"id": "b", "label": "Report"}],
+            "edges": [{"source": "collect  DATA", "target": "b"}],
+        },
+    }
+
+    repaired, report = repair_ir(ir)
+
+    assert repaired["data"]["edges"] == [{"source": "a", "target": "b"}]
+    assert fixes(report) == ["remapped_endpoint"]
+
+
+def test_mind_map_and_table_repairs():
+    mind_map, report = repair_ir(
+        {"type": "mind_map", "data": {"root": "Topic", "nodes": [{"id": "c", "label": "Child"}]}}
+    )
+    assert mind_map["data"]["root"] == {"id": "root", "label": "Topic"}
+    assert mind_map["data"]["children"] == [{"id": "c", "label": "Child"}]
+    assert fixes(report) == ["missing_root_id", "renamed_field"]
+
+    table, report = repair_ir(
+        {"type": "table", "data": {"headers": ["A"], "rows": [[1, 2], [None]]}}
+    )
+    assert table["data"]["headers"] == ["A", "Column 2"]
+    assert table["data"]["rows"] == [["1", "2"], ["", ""]]
+    assert fixes(report) == ["added_headers", "padded_row"]
+
+
+def test_validate_records_repairs_on_the_diagram():
+    diagram = validate(
+        {"type": "timeline", "data": {"events": [{"label": "Launch", "time": 1969}]}}
+    )
+
+    assert diagram.typed_data().events[0].time == "1969"
+    assert fixes(diagram.repairs) == ["missing_event_id"]
+
+
+def test_validate_rejects_what_repair_cannot_fix():
+    with pytest.raises(ValueError):
+        validate({"type": "venn", "data": {"sets": []}})
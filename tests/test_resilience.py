@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server.services import resilience
+from server.services.resilience import (
+    AdaptiveLimiter,
+    BedrockThrottled,
+    CircuitBreaker,
+    CircuitOpen,
+    Guard,
+    deadline,
+)
+
+
+class Throttled(Exception):
+    response = {"Error": {"Code": "ThrottlingException"}}
+
+
+class Unavailable(Exception):
+    response = {"Error": {"Code": "ServiceUnavailableException"}}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff", lambda attempt: 0.0)
+
+
+def test_limiter_grows_on_success_and_halves_on_throttle():
+    limiter = AdaptiveLimiter("m", initial=8, minimum=1, maximum=16)
+    limiter.acquire_sync()
+    limiter.release("ok", 0.1)
+    assert limiter.limit > 8
+
+    limiter.acquire_sync()
+    limiter.release("throttle")
+    assert limiter.limit == pytest.approx((8 + 1 / 8) / 2)
+    # A burst of throttles within one round trip is a single signal
+    limiter.acquire_sync()
+    limiter.release("throttle")
+    assert limiter.limit == pytest.approx((8 + 1 / 8) / 2)
+
+
+def test_limiter_queues_over_the_limit_and_sheds_when_the_queue_is_full():
+    limiter = AdaptiveLimiter("m", initial=1, minimum=1, maximum=1, max_queue=1)
+    limiter.acquire_sync()
+    granted = threading.Event()
+
+    def waiter():
+        limiter.acquire_sync()
+        granted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while not limiter._waiters:
+        time.sleep(0.001)
+    with pytest.raises(BedrockThrottled):
+        limiter.acquire_sync(timeout=0)
+    assert not granted.is_set()
+
+    limiter.release("ok")
+    thread.join(1)
+    assert granted.is_set() and limiter.in_flight == 1
+
+
+def test_breaker_opens_after_threshold_and_probes_once_after_reset():
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_seconds=0.05)
+    breaker.on_failure()
+    breaker.before_call()
+    breaker.on_failure()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.on_success()
+    assert breaker.state == breaker.CLOSED
+
+
+def test_guard_retries_throttling_then_succeeds():
+    guard = Guard("m")
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Throttled()
+        return "ok"
+
+    assert asyncio.run(guard.acall(flaky)) == "ok"
+    assert len(attempts) == 3
+    assert guard.limiter.in_flight == 0
+    assert guard.breaker.state == guard.breaker.CLOSED
+
+
+def test_guard_passes_non_transient_errors_through_without_retry():
+    guard = Guard("m")
+    attempts = []
+
+    def bad():
+        attempts.append(1)
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        asyncio.run(guard.acall(bad))
+    assert len(attempts) == 1 and guard.limiter.in_flight == 0
+
+
+def test_cancelled_call_keeps_its_slot_until_the_thread_returns():
+    guard = Guard("m")
+    release = threading.Event()
+
+    async def main():
+        task = asyncio.ensure_future(guard.acall(lambda: release.wait(5)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The blocking call is still running in its thread
+        assert guard.limiter.in_flight == 1
+        release.set()
+        for _ in range(100):
+            if guard.limiter.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert guard.limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_deadline_timeout_keeps_the_slot_until_the_thread_returns():
+    guard = Guard("m")
+
+    async def main():
+        with deadline(0.05):
+            with pytest.raises(resilience.DeadlineExceeded):
+                await guard.acall(lambda: time.sleep(0.2))
+        assert guard.limiter.in_flight == 1
+        await asyncio.sleep(0.3)
+        assert guard.limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_transient_failures_open_the_circuit():
+    guard = Guard("m")
+    guard.breaker.failure_threshold = 2
+
+    def down():
+        raise Unavailable()
+
+    with pytest.raises(resilience.BedrockUnavailable):
+        asyncio.run(guard.acall(down))
+    with pytest.raises(CircuitOpen):
+        asyncio.run(guard.acall(down))
@@ -0,0 +1,64 @@
+from server.services.segmenter import segment_text
+
+WATER = (
+    "Water evaporates from oceans and lakes. The water vapour rises and cools. "
+    "Cooling water vapour condenses into clouds."
+)
+CPU = (
+    "A CPU fetches an instruction from memory. The CPU decodes the instruction. "
+    "The instruction is executed and results written back."
+)
+
+
+def test_splits_unrelated_paragraphs():
+    assert segment_text(f"{WATER}\n\n{CPU}", min_chars=50) == [WATER, CPU]
+
+
+def test_merges_on_topic_paragraphs():
+    more = "Clouds release the water as rain, and the water flows back to the oceans."
+    assert segment_text(f"{WATER}\n\n{more}", min_chars=50) == [f"{WATER}\n\n{more}"]
+
+
+def test_headings_start_new_segments():
+    text = f"# Water\n{WATER}\n\n# Water again\n{WATER}"
+    segments = segment_text(text, min_chars=10)
+    assert len(segments) == 2 and segments[1].startswith("# Water again")
+
+
+def test_long_paragraph_without_blank_lines_is_split_at_sentences():
+    text = " ".join(f"Sentence {i} is about topic {i // 10} in some detail." for i in range(200))
+    segments = segment_text(text, max_chars=1000, max_segments=50)
+    assert len(segments) > 1
+    assert all(len(s) <= 1000 for s in segments)
+    assert all(s.endswith(".") for s in segments)
+    assert " ".join(segments) == text
+
+
+def test_overlong_sentence_is_split_at_words():
+    segments = segment_text("word " * 1000, max_chars=300, max_segments=50)
+    assert all(len(s) <= 300 for s in segments)
+
+
+def test_segment_count_is_capped():
+    parts = [f"# Part {i}\nDistinct subject number {i} alpha{i} beta{i}." for i in range(10)]
+    text = "\n\n".join(parts)
+    assert len(segment_text(text, min_chars=1, max_segments=3)) == 3
+
+
+def test_empty_input():
+    assert segment_text("  \n\n ") == []
+
+
+def test_segments_endpoint_returns_one_diagram_per_topic(client):
+    # Both paragraphs are longer than SEGMENT_MIN_CHARS, so neither is merged
+    water = f"{WATER} Clouds grow heavy, and the water falls back to the oceans as rain or snow."
+    water += " Rivers carry it home."
+    cpu = f"{CPU} The CPU then fetches the next instruction from memory and the cycle repeats."
+
+    response = client.post("/generate_mermaid/segments", json={"text": f"{water}\n\n{cpu}"})
+
+    assert response.status_code == 200
+    diagrams = response.json()["diagrams"]
+    assert [d["text"] for d in diagrams] == [water, cpu]
+    assert [d["index"] for d in diagrams] == [0, 1]
+    assert all(d["mermaid"] and d["error"] is None for d in diagrams)
@@ -0,0 +1,99 @@
+import pytest
+
+from server.benchmarks.corpus import SEMANTIC_PAIRS
+from server.config.variables import SEMANTIC_CACHE_THRESHOLD
+from server.services.semantic_cache import (
+    SemanticCache,
+    diagram_similarity,
+    embed,
+    key_terms,
+    terms_match,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticCache(directory=str(tmp_path), max_entries=32, enabled=True)
+
+
+def test_roman_numerals_and_acronyms_are_key_terms():
+    assert key_terms("World War II timeline") == key_terms("timeline of WW2")
+    assert key_terms("World War I")[0] == {"1"}
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("World War I", "World War II"),
+        ("history of Apple 1976-2000", "history of Apple 2000-2020"),
+        ("Windows 10 installation steps", "Windows 11 installation steps"),
+    ],
+)
+def test_guard_rejects_changed_numbers(a, b):
+    assert not terms_match(key_terms(a), key_terms(b))
+
+
+def test_guard_rejects_entity_named_on_one_side_only():
+    a = "support approves the refund and emails the customer"
+    b = "support approves the refund and sends the customer an SMS"
+    assert not terms_match(key_terms(a), key_terms(b))
+
+
+def test_calibrated_threshold_has_no_false_matches_on_labelled_pairs():
+    for a, b, same in SEMANTIC_PAIRS:
+        match = float(embed(a) @ embed(b)) >= SEMANTIC_CACHE_THRESHOLD and terms_match(
+            key_terms(a), key_terms(b)
+        )
+        assert not match or same, (a, b)
+
+
+def test_lookup_finds_paraphrase_in_scope(cache):
+    cache.add("World War II timeline", "scope", "key-ww2")
+    key, similarity = cache.lookup("Timeline of World War II", "scope")
+    assert key == "key-ww2" and similarity >= SEMANTIC_CACHE_THRESHOLD
+    assert cache.lookup("Timeline of World War II", "other scope") is None
+
+
+def test_lookup_rejects_different_numbers_even_above_threshold(cache):
+    cache.add("causes of World War I", "scope", "key-ww1")
+    assert cache.lookup("causes of World War II", "scope", threshold=0.5) is None
+
+
+def test_lookup_rejects_one_sided_entity_even_above_threshold(cache):
+    cache.add("refund process with email confirmation", "scope", "key-email")
+    assert cache.lookup("refund process with SMS confirmation", "scope", threshold=0.5) is None
+
+
+def test_lookup_rejects_paragraph_with_a_different_action(cache):
+    text = (
+        "When a customer requests a refund, support looks up the order and checks the "
+        "payment, approves the refund and issues it to the original card."
+    )
+    cache.add(text, "scope", "key-card")
+    assert cache.lookup(text.replace("to the original card", "as store credit"), "scope") is None
+
+
+def test_lookup_records_hits_and_discard_forgets(cache):
+    cache.add("the water cycle", "scope", "key")
+    cache.lookup("water cycle", "scope")
+    assert int(cache.records["hits"].max()) == 1
+    cache.discard("key")
+    assert cache.lookup("water cycle", "scope") is None
+
+
+def test_lru_eviction_when_full(tmp_path):
+    cache = SemanticCache(directory=str(tmp_path), max_entries=2, enabled=True)
+    cache.add("the water cycle", "s", "water")
+    cache.add("the carbon cycle", "s", "carbon")
+    cache.lookup("water cycle", "s")
+    cache.add("git branching workflow", "s", "git")
+    assert cache.lookup("carbon cycle", "s") is None
+    assert cache.lookup("water cycle", "s")[0] == "water"
+
+
+def test_diagram_similarity():
+    a = {"type": "flowchart", "data": {"nodes": [{"label": "A"}, {"label": "B"}]}}
+    b = {"type": "flowchart", "data": {"nodes": [{"label": "a"}, {"label": "C"}]}}
+    assert diagram_similarity(a, a) == 1.0
+    assert diagram_similarity(a, b) == pytest.approx(1 / 3)
+    assert diagram_similarity(a, {"type": "timeline", "data": {}}) == 0.0
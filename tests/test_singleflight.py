@@ -0,0 +1,94 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from server.services.singleflight import SingleFlight
+
+
+class Counted:
+    """Async callable counting how often it actually ran."""
+
+    def __init__(self, delay=0.02, result="done", error=None):
+        self.delay, self.result, self.error = delay, result, error
+        self.started = 0
+        self.finished = 0
+
+    async def __call__(self):
+        self.started += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_calls_share_one_run():
+    flight, fn = SingleFlight("test"), Counted()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert fn.started == 1
+    assert results == [("done", False)] + [("done", True)] * 4
+    assert flight.in_flight() == 0
+
+
+def test_finished_calls_are_forgotten_and_keys_are_separate():
+    flight, fn = SingleFlight("test"), Counted()
+
+    async def main():
+        await flight.do("a", fn)
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+
+    asyncio.run(main())
+
+    assert fn.started == 3
+
+
+def test_errors_reach_every_waiter():
+    flight, fn = SingleFlight("test"), Counted(error=ValueError("bad output"))
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("k", fn), flight.do("k", fn), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert fn.started == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight, fn = SingleFlight("test"), Counted()
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", fn))
+        second = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == ("done", True)
+    assert fn.finished == 1
+
+
+@pytest.mark.parametrize("cancel_orphans, finished", [(True, 0), (False, 1)])
+def test_orphaned_call(cancel_orphans, finished):
+    flight, fn = SingleFlight("test", cancel_orphans=cancel_orphans), Counted()
+
+    async def main():
+        caller = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await caller
+        assert flight.in_flight() == (0 if cancel_orphans else 1)
+        await asyncio.sleep(fn.delay * 2)
+
+    asyncio.run(main())
+
+    assert fn.finished == finished
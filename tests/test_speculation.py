@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+from server.schemas.generation import GenerationOptions
+from server.schemas.intent_output import IntentOutput
+
+# Some local evidence (a provisional guess) but too little for the fast path
+TEXT = "Tickets are triaged, then routed to a team."
+SPECULATIVE = GenerationOptions(mode="pipeline", speculative=True)
+
+
+def generate(workflow, options=SPECULATIVE):
+    start = time.perf_counter()
+    result = asyncio.run(workflow.agenerate(TEXT, options))
+    return result, time.perf_counter() - start
+
+
+def test_agreeing_guess_overlaps_intent_and_structure(workflow, fake_models):
+    models = fake_models(latency=0.1)
+
+    result, elapsed = generate(workflow)
+    _, sequential = generate(workflow, SPECULATIVE.model_copy(update={"speculative": False}))
+
+    assert result.mermaid.startswith("flowchart")
+    assert workflow.speculation.snapshot()["kept"] == 1
+    assert sum(model.llm.calls for model in models()) == 6
+    assert elapsed < sequential - 0.05
+
+
+def test_wrong_guess_reruns_the_structure(workflow, fake_models):
+    models = fake_models(latency=0.05)
+    workflow.intent.provisional = lambda text: IntentOutput(
+        intent="show timeline", diagram_type="timeline"
+    )
+
+    result, _ = generate(workflow)
+
+    stats = workflow.speculation.snapshot()
+    assert (stats["kept"], stats["rerun"]) == (0, 1)
+    assert result.mermaid.startswith("flowchart")
+    # The speculative structure call may or may not have started before it was dropped
+    assert sum(model.llm.calls for model in models()) in (3, 4)
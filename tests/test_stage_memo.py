@@ -0,0 +1,36 @@
+import asyncio
+
+from server.schemas.generation import GenerationOptions
+from server.services.cache import ResultCache
+
+TEXT = "Support tickets arrive by email and chat, get triaged, and are routed to a team."
+
+
+def test_later_stage_changes_reuse_earlier_stages(workflow, fake_models, tmp_path):
+    models = fake_models()
+    path = str(tmp_path / "memo.sqlite3")
+    workflow.intent.memo = ResultCache(namespace="intent", path=path, enabled=True)
+    extractor = workflow.ir_generator.visual_extractor
+    extractor.memo = ResultCache(namespace="structure", path=path, enabled=True)
+    options = GenerationOptions(mode="pipeline", speculative=False)
+
+    def calls():
+        return sum(model.llm.calls for model in models())
+
+    asyncio.run(workflow.agenerate(TEXT, options))
+    first = calls()
+    # A new result key, but the intent and structure inputs are unchanged
+    asyncio.run(workflow.agenerate(TEXT, options.model_copy(update={"partition": "subgraphs"})))
+
+    assert first == 3
+    assert calls() - first == 1
+
+
+def test_structure_memo_is_keyed_on_the_intent_output(workflow):
+    extractor = workflow.ir_generator.visual_extractor
+
+    flowchart = extractor.memo_key(TEXT, {"diagram_type": "flowchart"})
+
+    assert flowchart == extractor.memo_key(" " + TEXT, {"diagram_type": "flowchart"})
+    assert flowchart != extractor.memo_key(TEXT, {"diagram_type": "mind_map"})
+    assert flowchart != extractor.memo_key(TEXT, {"diagram_type": "flowchart"}, "other-model")
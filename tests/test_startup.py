@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from server.apis import mermaid
+
+
+def test_importing_the_app_does_not_build_the_pipeline():
+    code = (
+        "import sys, server.apis.mermaid as m; "
+        "print('server.graphs.workflow' in sys.modules, m._workflow is None)"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.split() == ["False", "True"]
+
+
+def test_ready_only_after_warm_up(workflow, monkeypatch):
+    monkeypatch.setattr(mermaid, "_workflow", workflow)
+    monkeypatch.setattr(
+        mermaid,
+        "startup_state",
+        {"ready": False, "warmup_seconds": None, "first_request_seconds": None},
+    )
+    client = TestClient(mermaid.app)
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
+
+    mermaid.warm_up()
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["warmup_seconds"] is not None
+
+
+def test_ready_without_warm_up(monkeypatch):
+    monkeypatch.setattr(mermaid, "WARMUP_ON_STARTUP", False)
+    monkeypatch.setattr(mermaid, "startup_state", {**mermaid.startup_state, "ready": False})
+
+    with TestClient(mermaid.app) as client:
+        assert client.get("/ready").status_code == 200
@@ -0,0 +1,101 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from server.services.validator import validate
+from server.tools.svg import LayoutCache, layered_layout, layout_diagram, to_svg
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def flowchart(edges, labels=None, direction="TD"):
+    ids = sorted({end for edge in edges for end in edge})
+    labels = labels or {}
+    return validate(
+        {
+            "type": "flowchart",
+            "data": {
+                "nodes": [{"id": i, "label": labels.get(i, i.upper())} for i in ids],
+                "edges": [{"source": s, "target": t} for s, t in edges],
+            },
+            "meta": {"direction": direction},
+        }
+    )
+
+
+def test_flowchart_svg_is_well_formed():
+    diagram = flowchart([("a", "b"), ("b", "c"), ("a", "c")], labels={"a": "<Start> & go"})
+
+    root = ET.fromstring(to_svg(diagram, LayoutCache()))
+
+    assert len(root.findall(f"{SVG}rect[@class='node']")) == 3
+    assert len(root.findall(f"{SVG}path[@class='edge']")) == 3
+    assert "<Start> & go" in "".join(root.itertext())
+
+
+def test_layers_follow_edge_direction():
+    layout = layered_layout(["A", "B", "C", "D"], [(0, 1), (1, 2), (0, 3)], [None] * 3)
+
+    ys = [box[1] for box in layout.boxes]
+    assert ys[0] < ys[1] < ys[2]
+    assert ys[3] == ys[1]
+    # Boxes in one layer don't overlap
+    (x1, _, w1, *_), (x3, _, w3, *_) = layout.boxes[1], layout.boxes[3]
+    assert abs(x1 - x3) >= (w1 + w3) / 2
+
+
+def test_left_to_right_direction():
+    layout = layout_diagram(flowchart([("a", "b")], direction="LR"), LayoutCache())
+
+    (ax, ay, *_), (bx, by, *_) = layout.boxes
+    assert ax < bx and ay == by
+
+
+def test_cycles_are_laid_out():
+    diagram = flowchart([("a", "b"), ("b", "c"), ("c", "a")])
+
+    root = ET.fromstring(to_svg(diagram, LayoutCache()))
+
+    assert len(root.findall(f"{SVG}path[@class='edge']")) == 3
+
+
+def test_layouts_are_cached_by_ir():
+    cache = LayoutCache()
+
+    first = layout_diagram(flowchart([("a", "b")]), cache)
+
+    assert layout_diagram(flowchart([("a", "b")]), cache) is first
+    assert layout_diagram(flowchart([("a", "b")], direction="LR"), cache) is not first
+
+
+def test_timeline_svg():
+    diagram = validate(
+        {
+            "type": "timeline",
+            "data": {
+                "events": [
+                    {"label": "Launch", "time": "1969"},
+                    {"label": "Return", "time": "1972"},
+                ]
+            },
+            "meta": {"title": "Apollo"},
+        }
+    )
+
+    root = ET.fromstring(to_svg(diagram, LayoutCache()))
+
+    assert len(root.findall(f"{SVG}rect[@class='event']")) == 2
+    assert "Apollo" in "".join(root.itertext())
+
+
+def test_unsupported_type_and_endpoint(client):
+    table = validate({"type": "table", "data": {"headers": ["A"], "rows": [["1"]]}})
+    with pytest.raises(ValueError):
+        to_svg(table, LayoutCache())
+
+    ok = client.post("/render_svg", json=flowchart([("a", "b")]).model_dump())
+    rejected = client.post("/render_svg", json=table.model_dump())
+
+    assert ok.status_code == 200
+    assert ok.headers["content-type"] == "image/svg+xml"
+    assert rejected.status_code == 422
@@ -0,0 +1,78 @@
+import asyncio
+
+from server.config.variables import ESCALATION_MODEL_ID
+from server.schemas.generation import GenerationOptions
+from server.utils.metrics import IN_FLIGHT_GENERATIONS
+
+TEXT = "First collect the data, then clean it, finally publish the report."
+PIPELINE = GenerationOptions(mode="pipeline", speculative=False, escalate=True)
+
+
+async def collect(workflow, text=TEXT, options=PIPELINE):
+    return [event async for event in workflow.astream(text, options)]
+
+
+def names(events):
+    return [event["event"] for event in events]
+
+
+def test_stream_events_in_order(workflow):
+    events = asyncio.run(collect(workflow))
+
+    stages = [name for name in names(events) if name != "partial"]
+    assert stages == ["intent", "structure", "ir", "validated", "rendered"]
+    rendered = events[-1]["data"]
+    assert rendered["mermaid"].startswith("flowchart")
+    assert rendered["cached"] is False
+    assert IN_FLIGHT_GENERATIONS._value.get() == 0
+
+
+def test_stream_matches_agenerate(workflow):
+    streamed = asyncio.run(collect(workflow))[-1]["data"]
+    generated = asyncio.run(workflow.agenerate(TEXT + " ", PIPELINE))
+
+    assert streamed["mermaid"] == generated.mermaid
+
+
+def test_concurrent_streams_share_one_generation(workflow, fake_models):
+    models = fake_models(latency=0.05)
+
+    async def both():
+        return await asyncio.gather(collect(workflow), collect(workflow))
+
+    leader, follower = asyncio.run(both())
+
+    assert "validated" in names(leader)
+    assert names(follower) == ["rendered"]
+    assert follower[0]["data"]["coalesced"] is True
+    assert follower[0]["data"]["mermaid"] == leader[-1]["data"]["mermaid"]
+    assert sum(model.llm.calls for model in models()) == 3
+
+
+def test_stream_reports_escalation(workflow):
+    classify = workflow.intent.aclassify
+
+    async def reject_default_model(text, model_id=None):
+        if model_id != ESCALATION_MODEL_ID:
+            raise ValueError("unparseable intent")
+        return await classify(text, model_id)
+
+    workflow.intent.aclassify = reject_default_model
+    events = asyncio.run(collect(workflow))
+
+    assert names(events)[:2] == ["escalated", "intent"]
+    assert events[0]["data"]["stage"] == "intent"
+    assert events[-1]["data"]["escalated"] == ["intent"]
+
+
+def test_concurrent_identical_requests_coalesce(workflow, fake_models):
+    models = fake_models(latency=0.05)
+
+    async def burst():
+        return await asyncio.gather(*(workflow.agenerate(TEXT, PIPELINE) for _ in range(4)))
+
+    results = asyncio.run(burst())
+
+    assert [r.meta.get("coalesced", False) for r in results] == [False, True, True, True]
+    assert len({r.mermaid for r in results}) == 1
+    assert sum(model.llm.calls for model in models()) == 3